@@ -14,7 +14,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('ui', 'ui'), ('engines', 'engines'), ('utils', 'utils')],
+    datas=[('ui', 'ui'), ('engines', 'engines'), ('utils', 'utils'), ('core', 'core')],
     hiddenimports=['customtkinter', 'PIL', 'PIL._tkinter_finder', 'yt_dlp', 'pyperclip'],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for TikTokApiEngine
+Drives _get_video_info and download against the local mock server and reports
+throughput, latency percentiles and CPU usage.
+
+Usage:
+    python -m benchmarks.bench_api_engine --iterations 50 --concurrency 4
+    python -m benchmarks.bench_api_engine --transport http2
+    python -m benchmarks.bench_api_engine --save baseline.json
+    python -m benchmarks.bench_api_engine --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import VARIANTS
+from benchmarks.mock_server import MockServerConfig, MockTikTokServer
+from engines.page_fetch import get_page_stats
+from engines.transport import Http2Transport, get_transport
+from engines.tiktok_api_engine import TikTokApiEngine
+
+FIRST_VIDEO_ID = 7_300_000_000_000_000_000
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def run_phase(name, func, video_ids, concurrency):
+    """Run func(video_id) for every ID and collect timing and CPU figures"""
+    latencies = []
+    failures = 0
+    transferred = 0
+
+    def timed(video_id):
+        started = time.perf_counter()
+        ok, nbytes = func(video_id)
+        return ok, nbytes, time.perf_counter() - started
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for ok, nbytes, elapsed in pool.map(timed, video_ids):
+            latencies.append(elapsed)
+            transferred += nbytes
+            if not ok:
+                failures += 1
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        'phase': name,
+        'operations': len(video_ids),
+        'failures': failures,
+        'wall_s': wall,
+        'ops_per_s': len(video_ids) / wall if wall else 0.0,
+        'throughput_mb_s': transferred / wall / 1024 / 1024 if wall else 0.0,
+        'latency_p50_ms': percentile(latencies, 50) * 1000,
+        'latency_p90_ms': percentile(latencies, 90) * 1000,
+        'latency_p99_ms': percentile(latencies, 99) * 1000,
+        'cpu_s': cpu,
+        'cpu_percent': cpu / wall * 100 if wall else 0.0,
+    }
+
+
+def run_benchmark(args):
+    """Start the mock server, run every phase and return the results"""
+    config = MockServerConfig(
+        variant=args.variant,
+        latency=args.latency_ms / 1000,
+        bandwidth=args.bandwidth_kb * 1024 if args.bandwidth_kb else None,
+        payload_size=args.payload_kb * 1024,
+        range_support=not args.no_range,
+        padding_kb=args.page_kb,
+        compress=not args.no_compress,
+        http2=args.transport == "http2",
+    )
+    video_ids = [str(FIRST_VIDEO_ID + i) for i in range(args.iterations)]
+    output_dir = tempfile.mkdtemp(prefix="ttd-bench-")
+    results = []
+    page_stats = get_page_stats()
+    page_stats.reset()
+
+    try:
+        with MockTikTokServer(config) as server:
+            engine = TikTokApiEngine()
+            engine.base_url = server.base_url
+            # The mock serves cleartext HTTP/2, which needs prior knowledge instead of ALPN
+            if args.transport == "http2":
+                engine.transport = Http2Transport(prior_knowledge=True)
+            else:
+                engine.transport = get_transport("http1")
+
+            def extract(video_id):
+                info = engine._get_video_info(video_id)
+                return info is not None, 0
+
+            def download(video_id):
+                url = f"https://www.tiktok.com/@{config.uploader}/video/{video_id}"
+                target = os.path.join(output_dir, video_id)
+                os.makedirs(target, exist_ok=True)
+                ok, _ = engine.download(url, target)
+                nbytes = sum(
+                    os.path.getsize(os.path.join(target, name))
+                    for name in os.listdir(target) if not name.startswith('.')
+                )
+                return ok, nbytes
+
+            if args.phase in ("all", "extract"):
+                results.append(run_phase("extract", extract, video_ids, args.concurrency))
+            if args.phase in ("all", "download"):
+                results.append(run_phase("download", download, video_ids, args.concurrency))
+            transport_stats = engine.transport.stats()
+            transport_stats['connections'] = server.connection_count
+            transport_stats['requests'] = server.request_count
+            if args.transport == "http2":
+                engine.transport.close()
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return {
+        'config': {
+            'variant': args.variant,
+            'iterations': args.iterations,
+            'concurrency': args.concurrency,
+            'latency_ms': args.latency_ms,
+            'bandwidth_kb': args.bandwidth_kb,
+            'payload_kb': args.payload_kb,
+            'page_kb': args.page_kb,
+            'range_support': not args.no_range,
+            'compress': not args.no_compress,
+            'transport': args.transport,
+        },
+        'results': results,
+        'page_fetch': page_stats.summary(),
+        'transport': transport_stats,
+    }
+
+
+def print_report(report):
+    """Print results as a plain-text table"""
+    header = f"{'phase':<10}{'ops':>6}{'fail':>6}{'ops/s':>9}{'MB/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'cpu %':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in report['results']:
+        print(
+            f"{r['phase']:<10}{r['operations']:>6}{r['failures']:>6}{r['ops_per_s']:>9.1f}"
+            f"{r['throughput_mb_s']:>9.1f}{r['latency_p50_ms']:>9.1f}{r['latency_p90_ms']:>9.1f}"
+            f"{r['latency_p99_ms']:>9.1f}{r['cpu_percent']:>8.1f}"
+        )
+    pages = report.get('page_fetch')
+    if pages and pages['requests']:
+        print(
+            f"\npages: {pages['requests']} fetched, {pages['wire_bytes'] / 1024:.0f} KB on the wire, "
+            f"{pages['decoded_bytes'] / 1024:.0f} KB decoded, {pages['early_stops']} stopped early"
+        )
+    transport = report.get('transport')
+    if transport:
+        print(
+            f"transport: {transport['name']}, {transport['dns']['hits']} DNS cache hits, {transport['dns']['misses']} lookups; "
+            f"{transport['tls']['resumed']} TLS resumed, {transport['tls']['full']} full handshakes; "
+            f"{transport.get('requests', 0)} requests over {transport.get('connections', 0)} connections"
+        )
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """Return a list of regressions relative to a saved baseline"""
+    regressions = []
+    previous = {r['phase']: r for r in baseline.get('results', [])}
+    for r in report['results']:
+        base = previous.get(r['phase'])
+        if not base:
+            continue
+        if base['ops_per_s'] and r['ops_per_s'] < base['ops_per_s'] * (1 - tolerance):
+            regressions.append(f"{r['phase']}: ops/s {r['ops_per_s']:.1f} < baseline {base['ops_per_s']:.1f}")
+        if base['latency_p90_ms'] and r['latency_p90_ms'] > base['latency_p90_ms'] * (1 + tolerance):
+            regressions.append(f"{r['phase']}: p90 {r['latency_p90_ms']:.1f} ms > baseline {base['latency_p90_ms']:.1f} ms")
+        if r['failures'] > base['failures']:
+            regressions.append(f"{r['phase']}: {r['failures']} failures (baseline {base['failures']})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TikTokApiEngine against a local mock server")
+    parser.add_argument("--phase", choices=["all", "extract", "download"], default="all")
+    parser.add_argument("--variant", choices=list(VARIANTS) + ["mixed"], default="mixed",
+                        help="Page markup served by the mock server")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Server delay before each response")
+    parser.add_argument("--bandwidth-kb", type=int, default=0, help="Per-connection bandwidth cap in KB/s (0 = unlimited)")
+    parser.add_argument("--payload-kb", type=int, default=2048, help="Size of each synthetic MP4")
+    parser.add_argument("--page-kb", type=int, default=256, help="Approximate size of each page fixture")
+    parser.add_argument("--no-range", action="store_true", help="Disable Range support on the media host")
+    parser.add_argument("--no-compress", action="store_true", help="Serve pages uncompressed")
+    parser.add_argument("--transport", choices=["http1", "http2"], default="http1",
+                        help="Client transport; http2 needs httpx and h2")
+    parser.add_argument("--save", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a previously saved JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before failing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
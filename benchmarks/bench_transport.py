@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+HTTP/1.1 vs HTTP/2 transport comparison
+Runs the API engine benchmark once per transport against the mock server
+(HTTP/1.1 keep-alive pools vs cleartext HTTP/2 multiplexing) and prints the
+two side by side. Needs httpx and h2 for the HTTP/2 run.
+
+Usage:
+    python -m benchmarks.bench_transport --iterations 100 --concurrency 16 --latency-ms 20
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_api_engine import parse_args, run_benchmark
+from engines.transport import http2_available
+
+
+def print_comparison(reports):
+    """One row per phase and transport, plus the HTTP/2 to HTTP/1.1 ratio"""
+    print(f"{'phase':<10}{'transport':<11}{'ops/s':>9}{'MB/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'cpu %':>8}{'conns':>7}")
+    print("-" * 81)
+    by_phase = {}
+    for name, report in reports.items():
+        connections = report['transport'].get('connections', 0)
+        for r in report['results']:
+            by_phase.setdefault(r['phase'], {})[name] = r
+            print(
+                f"{r['phase']:<10}{name:<11}{r['ops_per_s']:>9.1f}{r['throughput_mb_s']:>9.1f}"
+                f"{r['latency_p50_ms']:>9.1f}{r['latency_p90_ms']:>9.1f}{r['latency_p99_ms']:>9.1f}"
+                f"{r['cpu_percent']:>8.1f}{connections:>7}"
+            )
+    for phase, results in by_phase.items():
+        if 'http1' in results and 'http2' in results and results['http1']['ops_per_s']:
+            ratio = results['http2']['ops_per_s'] / results['http1']['ops_per_s']
+            print(f"\n{phase}: HTTP/2 runs at {ratio:.2f}x the HTTP/1.1 rate")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not http2_available():
+        print("HTTP/2 needs httpx and h2: pip install 'httpx[http2]'")
+        return 1
+
+    reports = {}
+    for transport in ("http1", "http2"):
+        args.transport = transport
+        reports[transport] = run_benchmark(args)
+    print_comparison(reports)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Page and media fixtures for the offline benchmarks
+Mirrors the markup variants TikTokApiEngine._get_video_info knows how to parse
+"""
+
+import json
+import struct
+
+VARIANTS = ("next_data", "sigi_state", "init_props")
+
+# Filler that mimics the bulk of a real TikTok page (inline CSS/JS around the state blob)
+_FILLER_LINE = '<script>window.__tt_filler__&&window.__tt_filler__.push("abcdefghijklmnopqrstuvwxyz0123456789");</script>\n'
+
+
+def build_item(video_id, uploader, media_url):
+    """Build an itemStruct-like dict for a single video"""
+    return {
+        "id": str(video_id),
+        "desc": f"Benchmark video {video_id} #ttd",
+        "author": {
+            "uniqueId": uploader,
+            "nickname": uploader.replace("_", " ").title(),
+        },
+        "video": {
+            "playAddr": media_url,
+            "downloadAddr": media_url,
+            "duration": 15,
+            "height": 1920,
+            "width": 1080,
+            # Alternative streams, as used by the quality tiers
+            "bitrateInfo": [
+                {
+                    "GearName": f"normal_{width}_0",
+                    "Bitrate": bitrate,
+                    "CodecType": codec,
+                    "PlayAddr": {
+                        "UrlList": [f"{media_url}{'&' if '?' in media_url else '?'}br={bitrate}"],
+                        "Width": width,
+                        "Height": width * 16 // 9,
+                        "DataSize": bitrate * 15 // 8,
+                    },
+                }
+                for width, bitrate, codec in ((1080, 2500000, "h264"), (720, 1200000, "h265"), (540, 600000, "h265"))
+            ],
+        },
+    }
+
+
+def _padding(padding_kb):
+    """Return roughly padding_kb kilobytes of page filler"""
+    if padding_kb <= 0:
+        return ""
+    repeat = max(1, (padding_kb * 1024) // len(_FILLER_LINE))
+    return _FILLER_LINE * repeat
+
+
+def build_page(variant, video_id, uploader, media_url, padding_kb=256):
+    """Render a video page in one of the supported markup variants"""
+    item = build_item(video_id, uploader, media_url)
+    head = f"<!DOCTYPE html><html><head><title>TikTok {video_id}</title>\n{_padding(padding_kb // 2)}</head><body>\n"
+    tail = f"{_padding(padding_kb - padding_kb // 2)}</body></html>"
+
+    if variant == "next_data":
+        state = {"props": {"pageProps": {"itemInfo": {"itemStruct": item}}}}
+        blob = f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(state)}</script>\n'
+    elif variant == "sigi_state":
+        state = {
+            "ItemModule": {str(video_id): item},
+            "UserModule": {"users": {uploader: item["author"]}},
+        }
+        blob = f'<script id="SIGI_STATE" type="application/json">{json.dumps(state)}</script>\n'
+    elif variant == "init_props":
+        state = {"initialProps": {"pageProps": {"itemInfo": {"itemStruct": item}}}}
+        blob = f'<script>window.__INIT_PROPS__ = {json.dumps(state)};</script>\n'
+    else:
+        raise ValueError(f"Unknown page variant: {variant}")
+
+    return head + blob + tail
+
+
+def _box(box_type, payload):
+    """Encode a single ISO-BMFF box"""
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def build_mp4(size):
+    """
+    Build a synthetic MP4 payload of exactly `size` bytes.
+    Layout is ftyp + moov + mdat so structural checks see a plausible file.
+    """
+    ftyp = _box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2avc1mp41")
+    moov = _box(b"moov", _box(b"mvhd", bytes(100)))
+    header = ftyp + moov
+    mdat_payload = max(0, size - len(header) - 8)
+    pattern = bytes(range(256))
+    body = (pattern * (mdat_payload // len(pattern) + 1))[:mdat_payload]
+    return header + _box(b"mdat", body)
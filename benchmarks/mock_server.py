@@ -0,0 +1,401 @@
+"""
+Local mock of the TikTok page host and media CDN
+Serves page fixtures and synthetic MP4 payloads with configurable latency,
+bandwidth and Range support so the engines can be exercised offline.
+Speaks HTTP/1.1, or cleartext HTTP/2 (prior knowledge) when the optional h2
+package is installed and the config asks for it.
+"""
+
+import gzip
+import re
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ImportError:
+    h2 = None
+
+from benchmarks.fixtures import VARIANTS, build_mp4, build_page
+
+
+class MockServerConfig:
+    """Tunable behaviour of the mock server"""
+    def __init__(self, variant="next_data", latency=0.0, bandwidth=None,
+                 payload_size=2 * 1024 * 1024, range_support=True, padding_kb=256,
+                 uploader="bench_user", compress=True, http2=False):
+        # "mixed" rotates through every page variant by video ID
+        self.variant = variant
+        # Seconds of delay before each response starts
+        self.latency = latency
+        # Bytes per second per connection, None for unlimited
+        self.bandwidth = bandwidth
+        self.payload_size = payload_size
+        self.range_support = range_support
+        self.padding_kb = padding_kb
+        self.uploader = uploader
+        # gzip pages for clients that send Accept-Encoding: gzip
+        self.compress = compress
+        # Serve cleartext HTTP/2 instead of HTTP/1.1 (needs the h2 package)
+        self.http2 = http2
+
+    def variant_for(self, video_id):
+        """Pick the page variant served for a video"""
+        if self.variant == "mixed":
+            return VARIANTS[int(video_id) % len(VARIANTS)]
+        return self.variant
+
+
+PAGE_RE = re.compile(r'^/@[\w\.-]*/video/(\d+)')
+MEDIA_RE = re.compile(r'^/media/(\d+)\.mp4')
+
+
+def build_response(server, path, headers):
+    """
+    (status, [(name, value)], body) for a GET/HEAD request.
+    headers maps lower-case request header names to values; shared by the
+    HTTP/1.1 handler and the HTTP/2 server.
+    """
+    server.count_request()
+    route = path.split("?", 1)[0]
+
+    page = PAGE_RE.match(route)
+    if page:
+        return _page_response(server, page.group(1), headers)
+    media = MEDIA_RE.match(route)
+    if media:
+        return _media_response(server, path, headers)
+    return 404, [("content-type", "text/plain")], b"Not found"
+
+
+def _page_response(server, video_id, headers):
+    config = server.config
+    media_url = f"{server.base_url}/media/{video_id}.mp4?x-expires={int(time.time()) + 3600}&sig=bench"
+    html = build_page(
+        config.variant_for(video_id),
+        video_id,
+        config.uploader,
+        media_url,
+        padding_kb=config.padding_kb,
+    )
+    body = html.encode("utf-8")
+    response_headers = [("content-type", "text/html; charset=utf-8")]
+    if config.compress and "gzip" in headers.get("accept-encoding", "").lower():
+        body = gzip.compress(body, compresslevel=6)
+        response_headers.append(("content-encoding", "gzip"))
+    return 200, response_headers, body
+
+
+def _media_response(server, path, headers):
+    config = server.config
+    # Like the real CDN, refuse signed URLs past their expiry
+    expires = re.search(r'[?&]x-expires=(\d+)', path)
+    if expires and int(expires.group(1)) < time.time():
+        return 403, [("content-type", "text/plain")], b"Expired"
+
+    payload = server.payload()
+    total = len(payload)
+    start, end = 0, total - 1
+    status = 200
+
+    range_header = headers.get("range")
+    if range_header and config.range_support:
+        m = re.match(r'bytes=(\d*)-(\d*)', range_header)
+        if m:
+            if m.group(1):
+                start = int(m.group(1))
+                if m.group(2):
+                    end = min(int(m.group(2)), total - 1)
+            elif m.group(2):
+                # Suffix range: last N bytes
+                start = max(0, total - int(m.group(2)))
+            if start >= total:
+                return 416, [("content-range", f"bytes */{total}")], b""
+            status = 206
+
+    response_headers = [("content-type", "video/mp4")]
+    if config.range_support:
+        response_headers.append(("accept-ranges", "bytes"))
+    if status == 206:
+        response_headers.append(("content-range", f"bytes {start}-{end}/{total}"))
+    return status, response_headers, memoryview(payload)[start:end + 1]
+
+
+def pace(config, sent, started):
+    """Sleep until the wire time for `sent` bytes at the configured bandwidth has elapsed"""
+    if config.bandwidth:
+        ahead = sent / config.bandwidth - (time.monotonic() - started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def chunk_size_for(config):
+    return max(1024, int(config.bandwidth) // 20) if config.bandwidth else None
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 request handler for pages and media"""
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY a reused
+    # keep-alive connection stalls on delayed ACKs, which real CDNs do not do
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    @property
+    def config(self):
+        return self.server.mock.config
+
+    def setup(self):
+        super().setup()
+        self.server.mock.count_connection()
+
+    def do_HEAD(self):
+        self._dispatch(send_body=False)
+
+    def do_GET(self):
+        self._dispatch(send_body=True)
+
+    def _dispatch(self, send_body):
+        if self.config.latency:
+            time.sleep(self.config.latency)
+
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        status, response_headers, body = build_response(self.server.mock, self.path, headers)
+        self.send_response(status)
+        for name, value in response_headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body and body:
+            self._write_throttled(body)
+
+    def _write_throttled(self, data):
+        """Write a response body, pacing it to the configured bandwidth"""
+        chunk_size = chunk_size_for(self.config)
+        if not chunk_size:
+            self.wfile.write(data)
+            return
+
+        started = time.monotonic()
+        sent = 0
+        try:
+            for offset in range(0, len(data), chunk_size):
+                chunk = data[offset:offset + chunk_size]
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                pace(self.config, sent, started)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """Threaded server that ignores clients hanging up mid-response"""
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class _H2Connection:
+    """One client connection of the HTTP/2 server; each stream is answered on its own thread"""
+
+    def __init__(self, sock, mock, registry):
+        self.sock = sock
+        self.mock = mock
+        # The server's set of open sockets, closed on shutdown
+        self.registry = registry
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        # Guards self.conn and socket writes; streams wait on it for flow-control credit
+        self.lock = threading.Condition()
+        self.reset_streams = set()
+        self.closed = False
+
+    def _flush(self):
+        data = self.conn.data_to_send()
+        if data:
+            self.sock.sendall(data)
+
+    def run(self):
+        try:
+            with self.lock:
+                self.conn.initiate_connection()
+                self._flush()
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                with self.lock:
+                    for event in self.conn.receive_data(data):
+                        self._handle(event)
+                    self._flush()
+                    self.lock.notify_all()
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+        finally:
+            with self.lock:
+                self.closed = True
+                self.lock.notify_all()
+            self.registry.discard(self.sock)
+            self.sock.close()
+
+    def _handle(self, event):
+        if isinstance(event, h2.events.RequestReceived):
+            headers = dict(event.headers)
+            threading.Thread(target=self._respond, args=(event.stream_id, headers), daemon=True).start()
+        elif isinstance(event, h2.events.DataReceived):
+            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+        elif isinstance(event, h2.events.StreamReset):
+            self.reset_streams.add(event.stream_id)
+        elif isinstance(event, h2.events.ConnectionTerminated):
+            self.closed = True
+
+    def _respond(self, stream_id, headers):
+        config = self.mock.config
+        if config.latency:
+            time.sleep(config.latency)
+        status, response_headers, body = build_response(self.mock, headers.get(":path", "/"), headers)
+        send_body = headers.get(":method") != "HEAD" and len(body) > 0
+        try:
+            with self.lock:
+                self.conn.send_headers(
+                    stream_id,
+                    [(":status", str(status)), ("content-length", str(len(body)))] + response_headers,
+                    end_stream=not send_body,
+                )
+                self._flush()
+            if send_body:
+                self._send_body(stream_id, body, config)
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+
+    def _send_body(self, stream_id, body, config):
+        """Send DATA frames as flow control allows, paced to the configured bandwidth"""
+        step = chunk_size_for(config) or len(body)
+        started = time.monotonic()
+        offset = 0
+        while offset < len(body):
+            with self.lock:
+                while True:
+                    if self.closed or stream_id in self.reset_streams:
+                        return
+                    window = self.conn.local_flow_control_window(stream_id)
+                    if window > 0:
+                        break
+                    self.lock.wait(1)
+                size = min(window, self.conn.max_outbound_frame_size, step, len(body) - offset)
+                self.conn.send_data(stream_id, body[offset:offset + size],
+                                    end_stream=offset + size == len(body))
+                self._flush()
+            offset += size
+            pace(config, offset, started)
+
+
+class _H2Server:
+    """Cleartext HTTP/2 listener with the same surface as the HTTP/1.1 server"""
+
+    def __init__(self, address, mock):
+        if h2 is None:
+            raise RuntimeError("HTTP/2 mock server needs the h2 package (pip install h2)")
+        self.mock = mock
+        self.socket = socket.create_server(address)
+        self.server_address = self.socket.getsockname()
+        self._connections = set()
+        self._stopped = threading.Event()
+
+    def serve_forever(self):
+        while not self._stopped.is_set():
+            try:
+                sock, _ = self.socket.accept()
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.mock.count_connection()
+            self._connections.add(sock)
+            threading.Thread(target=_H2Connection(sock, self.mock, self._connections).run, daemon=True).start()
+
+    def shutdown(self):
+        self._stopped.set()
+        self.socket.close()
+        for sock in list(self._connections):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def server_close(self):
+        self.socket.close()
+
+
+class MockTikTokServer:
+    """Threaded local HTTP server standing in for TikTok and its CDN"""
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockServerConfig()
+        if self.config.http2:
+            self.httpd = _H2Server((host, port), self)
+        else:
+            self.httpd = _QuietHTTPServer((host, port), _MockHandler)
+            self.httpd.mock = self
+        self.thread = None
+        self.request_count = 0
+        self.connection_count = 0
+        self._lock = threading.Lock()
+        self._payload_cache = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page_url(self, video_id):
+        """URL of the video page for a given ID"""
+        return f"{self.base_url}/@{self.config.uploader}/video/{video_id}"
+
+    def media_url(self, video_id):
+        """URL of the synthetic media for a given ID"""
+        return f"{self.base_url}/media/{video_id}.mp4"
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def count_connection(self):
+        with self._lock:
+            self.connection_count += 1
+
+    def payload(self):
+        # Built once: every video shares the same synthetic bytes
+        if self._payload_cache is None or len(self._payload_cache) != self.config.payload_size:
+            self._payload_cache = build_mp4(self.config.payload_size)
+        return self._payload_cache
+
+    def start(self):
+        """Start serving in a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server and release the socket"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
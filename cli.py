@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+TTD command line interface
+Headless entry point for batch work that does not need the GUI
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from core.api import load_settings
+from engines.quality import QUALITY_TIERS
+from utils.layout import LAYOUTS
+from utils.logger import Logger
+
+ENGINE_NAMES = ["yt-dlp", "tiktok-api"]
+QUALITY_HELP = f"Quality tier: {', '.join(QUALITY_TIERS)} (or any <N>p cap)"
+
+
+def default_output_dir():
+    """Default download folder, matching the GUI"""
+    return str(Path.home() / "Downloads" / "TTD")
+
+
+def create_layout(scheme):
+    from utils.layout import OutputLayout
+    return OutputLayout(scheme or load_settings().get("layout", "flat"))
+
+
+def create_engine(name, layout=None):
+    """Instantiate a download engine by name"""
+    if name == "tiktok-api":
+        from engines.tiktok_api_engine import TikTokApiEngine
+        return TikTokApiEngine(layout=layout)
+    from engines.yt_dlp_engine import YtDlpEngine
+    return YtDlpEngine(layout=layout)
+
+
+def print_status(status):
+    """Status callback for console output"""
+    print(status)
+
+
+def iter_input_urls(args):
+    """URLs from the command line followed by any --input file, read lazily"""
+    yield from args.urls
+    if args.input:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+
+
+def create_postprocessor(args, logger):
+    """PostProcessor when --postprocess was given and ffmpeg is installed, else None"""
+    if not args.postprocess:
+        return None
+    from core.postprocess import PostProcessor
+    postprocessor = PostProcessor(max_workers=args.postprocess_workers, logger=logger)
+    if not postprocessor.available:
+        print("⚠️ ffmpeg not found; skipping post-processing")
+        return None
+    return postprocessor
+
+
+def select_cli_transport(name):
+    from engines.transport import select_transport
+    try:
+        selected = select_transport(name)
+    except ValueError:
+        selected = select_transport("http1")
+    if selected != name:
+        print(f"⚠️ Transport '{name}' unavailable (HTTP/2 needs httpx and h2); using {selected}")
+
+
+def select_cli_downloader(name):
+    from engines.downloaders import select_downloader
+    try:
+        selected = select_downloader(name)
+    except ValueError:
+        selected = select_downloader("python")
+    if selected != name and name != "auto":
+        print(f"⚠️ Downloader '{name}' not found on PATH; using {selected}")
+
+
+def select_cli_fsync_policy(name):
+    from utils.fileio import select_fsync_policy
+    try:
+        select_fsync_policy(name)
+    except ValueError as e:
+        print(f"⚠️ {e}; not syncing downloads to disk")
+        select_fsync_policy("none")
+
+
+def print_profiles():
+    """Summarize the hotspots of every profile taken in this run"""
+    from utils.profiler import get_profiler
+    for entry in get_profiler().recent_profiles():
+        print(f"\n{entry['name']} ({entry['elapsed']:.2f}s) -> {entry['path']}")
+        for label, own, total in entry['hotspots'][:5]:
+            print(f"  {own:>8.3f}s self {total:>8.3f}s total  {label}")
+
+
+def create_pipeline(args, archive, postprocessor, catalog=None):
+    from core.pipeline import DownloadPipeline
+
+    os.makedirs(args.output, exist_ok=True)
+    return DownloadPipeline(
+        create_engine(args.engine, create_layout(args.layout)),
+        args.output,
+        args.quality,
+        archive=archive,
+        extract_workers=args.extract_workers,
+        transfer_workers=args.transfer_workers,
+        postprocessor=postprocessor,
+        catalog=catalog,
+        skip_existing=args.skip_existing,
+        downloader=args.downloader,
+    )
+
+
+def print_item(item, logger):
+    """Report one finished PipelineItem"""
+    if item.success:
+        print(f"✅ {item.url}")
+        logger.info(f"Downloaded {item.url}")
+    elif item.url is None:
+        # The URL source itself failed
+        print(f"❎ {item.message}")
+        logger.error(item.message)
+    else:
+        print(f"❎ {item.url}: {item.message}")
+        logger.error(f"Download failed for {item.url}: {item.message}")
+
+
+def run_pipeline(args, logger, urls, archive):
+    """Download an iterable of URLs through the staged pipeline; returns the failure count"""
+    from utils.catalog import DownloadCatalog
+
+    postprocessor = create_postprocessor(args, logger)
+    catalog = DownloadCatalog(logger=logger)
+    pipeline = create_pipeline(args, archive, postprocessor, catalog)
+
+    failed = 0
+    try:
+        for item in pipeline.run(urls):
+            print_item(item, logger)
+            if not item.success:
+                failed += 1
+    except KeyboardInterrupt:
+        # Keep .part files so the next run resumes them
+        pipeline.control.pause()
+        raise
+    else:
+        if postprocessor:
+            print("Waiting for post-processing to finish...")
+            postprocessor.shutdown(wait=True)
+    finally:
+        catalog.close()
+    return failed
+
+
+def cmd_download(args, logger):
+    """Download many URLs through the staged pipeline"""
+    from utils.archive import DownloadArchive
+
+    return 1 if run_pipeline(args, logger, iter_input_urls(args), DownloadArchive()) else 0
+
+
+def cmd_watch(args, logger):
+    """Stream URLs from a growing list file or a drop folder into the pipeline"""
+    from core.ingest import UrlIngestor
+    from utils.archive import DownloadArchive
+
+    if not os.path.isdir(os.path.dirname(os.path.abspath(args.path))):
+        print(f"❎ Folder not found: {os.path.dirname(os.path.abspath(args.path))}")
+        return 1
+    archive = DownloadArchive()
+    ingestor = UrlIngestor(args.path, archive=archive, from_end=args.from_end, follow=not args.once,
+                           poll_interval=args.poll_interval, logger=logger)
+    if not args.once:
+        print(f"👀 Watching {args.path} (Ctrl+C to stop)")
+
+    failed = 0
+    try:
+        failed = run_pipeline(args, logger, ingestor, archive)
+    except KeyboardInterrupt:
+        ingestor.stop()
+        print("Stopped")
+    stats = ingestor.stats
+    print(f"{stats['accepted']} queued, {stats['duplicates']} duplicates, {stats['invalid']} invalid")
+    return 1 if failed else 0
+
+
+def cmd_enqueue(args, logger):
+    """Add URLs to a shared job store for workers to pick up"""
+    from core.jobstore import SQLiteJobStore
+    from utils.validator import URLValidator
+
+    validator = URLValidator()
+    invalid = []
+
+    def valid_urls():
+        for url in iter_input_urls(args):
+            is_valid, message = validator.is_valid_tiktok_url(url)
+            if is_valid:
+                yield url
+            else:
+                invalid.append(url)
+                print(f"❎ {url}: {message}")
+
+    store = SQLiteJobStore(args.store)
+    try:
+        added = store.enqueue(valid_urls())
+    finally:
+        store.close()
+    print(f"✅ {added} new job(s) queued in {args.store}")
+    return 1 if invalid else 0
+
+
+def cmd_worker(args, logger):
+    """Download jobs leased from a shared job store until stopped"""
+    from core.jobstore import SQLiteJobStore, StoreWorker
+    from utils.catalog import DownloadCatalog
+
+    store = SQLiteJobStore(args.store)
+    postprocessor = create_postprocessor(args, logger)
+    catalog = DownloadCatalog(logger=logger)
+    worker = StoreWorker(
+        store,
+        lambda archive: create_pipeline(args, archive, postprocessor, catalog),
+        worker_id=args.worker_id,
+        lease_seconds=args.lease,
+        exit_when_empty=args.exit_when_empty,
+        logger=logger,
+    )
+    print(f"👷 Worker {worker.worker_id} pulling from {args.store} (Ctrl+C to stop)")
+    try:
+        worker.run(on_item=lambda item: print_item(item, logger))
+    except KeyboardInterrupt:
+        print("Stopped; unfinished jobs were returned to the queue")
+    finally:
+        store.close()
+    if postprocessor:
+        postprocessor.shutdown(wait=True)
+    catalog.close()
+    stats = worker.stats
+    print(f"{stats['completed']} completed, {stats['failed']} failed, {stats['skipped']} already archived")
+    return 1 if stats['failed'] else 0
+
+
+def cmd_queue_status(args, logger):
+    """Show job counts of a shared job store"""
+    from core.jobstore import SQLiteJobStore
+
+    store = SQLiteJobStore(args.store)
+    try:
+        counts = store.counts()
+        archived = store.archive_count()
+    finally:
+        store.close()
+    for state in ("queued", "leased", "completed", "failed"):
+        print(f"{state:<10} {counts.get(state, 0)}")
+    print(f"{'archived':<10} {archived}")
+    return 0
+
+
+def cmd_catalog(args, logger):
+    """Query the download catalog"""
+    from utils.catalog import DownloadCatalog
+
+    if not os.path.exists(args.db):
+        print(f"❎ No catalog at {args.db}")
+        return 1
+    with DownloadCatalog(args.db) as catalog:
+        if args.stats:
+            summary = catalog.summary()
+            if args.json:
+                print(json.dumps(summary, indent=2))
+                return 0
+            print(f"{summary['count']} downloads, {summary['bytes'] / (1024 ** 3):.2f} GB, "
+                  f"{summary['duration'] / 3600:.1f} h of video")
+            if summary['avg_transfer_seconds'] is not None:
+                print(f"Average extract {summary['avg_extract_seconds'] or 0:.2f}s, "
+                      f"transfer {summary['avg_transfer_seconds']:.2f}s")
+            print("Engines: " + ", ".join(f"{name} {count}" for name, count in summary['engines'].items()))
+            for uploader, count in summary['top_uploaders']:
+                print(f"  @{uploader or 'unknown'}: {count}")
+            return 0
+
+        if args.video_id:
+            entry = catalog.get(args.video_id)
+            entries = [entry] if entry else []
+        else:
+            since = time.time() - args.days * 86400 if args.days else None
+            entries = catalog.search(args.uploader, args.search, args.engine, since, args.limit)
+
+    if args.json:
+        print(json.dumps(entries, indent=2, ensure_ascii=False))
+        return 0 if entries else 1
+    for entry in entries:
+        finished = datetime.fromtimestamp(entry['finished']).strftime('%Y-%m-%d %H:%M')
+        size = f"{entry['size'] / (1024 * 1024):.1f} MB" if entry['size'] else "?"
+        print(f"{entry['video_id']}  {finished}  @{entry['uploader'] or 'unknown'}  {size}  "
+              f"{entry['engine'] or ''}  {entry['title'] or ''}")
+        print(f"    {entry['path']}")
+    if not entries:
+        print("No matching downloads")
+    return 0 if entries else 1
+
+
+def cmd_sync(args, logger):
+    """Incrementally sync one or more @username profiles"""
+    from engines.profile_sync import ProfileSync
+
+    from utils.catalog import DownloadCatalog
+
+    os.makedirs(args.output, exist_ok=True)
+    catalog = DownloadCatalog(logger=logger)
+    syncer = ProfileSync(create_engine(args.engine, create_layout(args.layout)), logger=logger, catalog=catalog)
+
+    exit_code = 0
+    try:
+        for profile in args.profiles:
+            summary = syncer.sync(profile, args.output, args.quality, status_callback=print_status)
+            if summary['error']:
+                print(f"❎ {profile}: {summary['error']}")
+                exit_code = 1
+            else:
+                print(f"✅ @{summary['username']}: {summary['downloaded']} downloaded, {summary['failed']} failed")
+                if summary['failed']:
+                    exit_code = 1
+    finally:
+        catalog.close()
+    return exit_code
+
+
+def cmd_daemon(args, logger):
+    """Run the job-submission daemon in the foreground"""
+    from core.daemon import TTDDaemon
+    from core.jobs import JobManager
+    from utils.governor import get_governor
+
+    get_governor().configure(load_settings())
+    manager = JobManager(
+        max_workers=args.workers,
+        default_output_path=args.output,
+        layout=create_layout(args.layout),
+        postprocessor=create_postprocessor(args, logger),
+        logger=logger,
+    )
+    daemon = TTDDaemon(
+        manager,
+        host=args.host,
+        port=None if args.no_http else args.port,
+        socket_path=None if args.no_socket else args.socket,
+        logger=logger,
+    )
+    try:
+        daemon.serve_forever()
+    except (OSError, RuntimeError) as e:
+        print(f"❎ Could not start daemon: {e}")
+        return 1
+    return 0
+
+
+def cmd_submit(args, logger):
+    """Queue URLs on a running daemon, optionally following them to completion"""
+    from core.client import DaemonClient, DaemonError
+
+    client = DaemonClient(socket_path=args.socket, host=args.host, port=args.port)
+    output = os.path.abspath(args.output) if args.output else None
+
+    exit_code = 0
+    job_ids = []
+    for url in iter_input_urls(args):
+        try:
+            job = client.submit(url, engine=args.engine, output_path=output, quality=args.quality,
+                                downloader=args.downloader)
+        except DaemonError as e:
+            print(f"❎ {url}: {e}")
+            exit_code = 1
+            continue
+        print(f"{job['id']} {url}")
+        job_ids.append((job['id'], url))
+
+    if args.wait:
+        for job_id, url in job_ids:
+            try:
+                success, message = client.wait(job_id, status_callback=print_status)
+            except DaemonError as e:
+                success, message = False, str(e)
+            print(f"{'✅' if success else '❎'} {url}: {message}")
+            if not success:
+                exit_code = 1
+    return exit_code
+
+
+def cmd_control(args, logger):
+    """Cancel, pause or resume jobs on a running daemon"""
+    from core.client import DaemonClient, DaemonError
+
+    client = DaemonClient(socket_path=args.socket, host=args.host, port=args.port)
+    exit_code = 0
+    for job_id in args.job_ids:
+        try:
+            getattr(client, args.action)(job_id)
+            print(f"✅ {job_id}: {args.action} requested")
+        except DaemonError as e:
+            print(f"❎ {job_id}: {e}")
+            exit_code = 1
+    return exit_code
+
+
+def add_postprocess_arguments(parser):
+    parser.add_argument("--postprocess", action="store_true",
+                        help="Remux finished files with faststart and embed metadata (needs ffmpeg)")
+    parser.add_argument("--postprocess-workers", type=int, default=None,
+                        help="Post-processing processes (default: CPU count)")
+
+
+def add_skip_existing_argument(parser):
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="Skip videos whose cataloged file is still on disk")
+
+
+def add_daemon_address_arguments(parser):
+    from core.daemon import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_SOCKET_PATH
+    parser.add_argument("--host", default=DEFAULT_HOST, help="HTTP listen address")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="HTTP port")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ttd", description="TTD - TikTok videos Downloader (command line)")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "sample"],
+                        help="Profile each job and write the results to ~/.ttd/profiles")
+    parser.add_argument("--transport", choices=["http1", "http2"],
+                        help="HTTP transport for the API engine (default from settings, else http1)")
+    parser.add_argument("--downloader", choices=["python", "aria2c", "curl", "auto"],
+                        help="Transfer backend for media files (default from settings, else python; "
+                             "auto uses aria2c when installed)")
+    parser.add_argument("--fsync", choices=["none", "at-end", "periodic"],
+                        help="When downloads are forced to disk (default from settings, else none)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    download = subparsers.add_parser("download", help="Download one or more video URLs")
+    download.add_argument("urls", nargs="*", help="TikTok video URLs")
+    download.add_argument("-i", "--input", help="Text file with one URL per line")
+    download.add_argument("-o", "--output", default=default_output_dir(), help="Output folder")
+    download.add_argument("-e", "--engine", choices=ENGINE_NAMES, default="yt-dlp", help="Download engine")
+    download.add_argument("-q", "--quality", default="best", help=QUALITY_HELP)
+    download.add_argument("--extract-workers", type=int, default=4, help="Parallel metadata extractions")
+    download.add_argument("--transfer-workers", type=int, default=2, help="Parallel media transfers")
+    download.add_argument("--layout", choices=LAYOUTS, help="Subfolder layout (default from settings, else flat)")
+    add_postprocess_arguments(download)
+    add_skip_existing_argument(download)
+    download.set_defaults(func=cmd_download)
+
+    watch = subparsers.add_parser("watch", help="Download URLs as they are appended to a list file or dropped into a folder")
+    watch.add_argument("path", help="Text/JSONL file to tail, or a folder to watch for .txt/.jsonl lists")
+    watch.add_argument("--from-end", action="store_true", help="Skip lines already in the file at startup")
+    watch.add_argument("--once", action="store_true", help="Process what is there now, then exit")
+    watch.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between re-scans")
+    watch.add_argument("-o", "--output", default=default_output_dir(), help="Output folder")
+    watch.add_argument("-e", "--engine", choices=ENGINE_NAMES, default="yt-dlp", help="Download engine")
+    watch.add_argument("-q", "--quality", default="best", help=QUALITY_HELP)
+    watch.add_argument("--extract-workers", type=int, default=4, help="Parallel metadata extractions")
+    watch.add_argument("--transfer-workers", type=int, default=2, help="Parallel media transfers")
+    watch.add_argument("--layout", choices=LAYOUTS, help="Subfolder layout (default from settings, else flat)")
+    add_postprocess_arguments(watch)
+    add_skip_existing_argument(watch)
+    watch.set_defaults(func=cmd_watch)
+
+    enqueue = subparsers.add_parser("enqueue", help="Add URLs to a shared job store")
+    enqueue.add_argument("store", help="Job store file (SQLite), e.g. on shared storage")
+    enqueue.add_argument("urls", nargs="*", help="TikTok video URLs")
+    enqueue.add_argument("-i", "--input", help="Text file with one URL per line")
+    enqueue.set_defaults(func=cmd_enqueue)
+
+    worker = subparsers.add_parser("worker", help="Download jobs from a shared job store alongside other workers")
+    worker.add_argument("store", help="Job store file (SQLite)")
+    worker.add_argument("--worker-id", help="Name recorded on leased jobs (default: host-pid)")
+    worker.add_argument("--lease", type=int, default=120, help="Seconds a job stays leased without a heartbeat")
+    worker.add_argument("--exit-when-empty", action="store_true", help="Stop once the store has no jobs left")
+    worker.add_argument("-o", "--output", default=default_output_dir(), help="Output folder")
+    worker.add_argument("-e", "--engine", choices=ENGINE_NAMES, default="yt-dlp", help="Download engine")
+    worker.add_argument("-q", "--quality", default="best", help=QUALITY_HELP)
+    worker.add_argument("--extract-workers", type=int, default=4, help="Parallel metadata extractions")
+    worker.add_argument("--transfer-workers", type=int, default=2, help="Parallel media transfers")
+    worker.add_argument("--layout", choices=LAYOUTS, help="Subfolder layout (default from settings, else flat)")
+    add_postprocess_arguments(worker)
+    add_skip_existing_argument(worker)
+    worker.set_defaults(func=cmd_worker)
+
+    queue_status = subparsers.add_parser("queue-status", help="Show job counts of a shared job store")
+    queue_status.add_argument("store", help="Job store file (SQLite)")
+    queue_status.set_defaults(func=cmd_queue_status)
+
+    catalog = subparsers.add_parser("catalog", help="Query the catalog of finished downloads")
+    catalog.add_argument("video_id", nargs="?", help="Show one video")
+    catalog.add_argument("-u", "--uploader", help="Only this @uploader")
+    catalog.add_argument("-s", "--search", help="Text in the title or channel name")
+    catalog.add_argument("-e", "--engine", choices=ENGINE_NAMES, help="Only downloads made by this engine")
+    catalog.add_argument("--days", type=float, help="Only downloads finished in the last N days")
+    catalog.add_argument("-n", "--limit", type=int, default=50, help="Maximum entries listed")
+    catalog.add_argument("--stats", action="store_true", help="Show totals instead of entries")
+    catalog.add_argument("--json", action="store_true", help="Print JSON")
+    catalog.add_argument("--db", default=str(Path.home() / ".ttd" / "catalog.db"), help="Catalog file")
+    catalog.set_defaults(func=cmd_catalog)
+
+    sync = subparsers.add_parser("sync", help="Download new videos from @username profiles")
+    sync.add_argument("profiles", nargs="+", help="Profile URLs or @usernames")
+    sync.add_argument("-o", "--output", default=default_output_dir(), help="Output folder")
+    sync.add_argument("-e", "--engine", choices=ENGINE_NAMES, default="yt-dlp", help="Download engine")
+    sync.add_argument("-q", "--quality", default="best", help=QUALITY_HELP)
+    sync.add_argument("--layout", choices=LAYOUTS, help="Subfolder layout (default from settings, else flat)")
+    sync.set_defaults(func=cmd_sync)
+
+    daemon = subparsers.add_parser("daemon", help="Run a local daemon that keeps engines warm and accepts jobs")
+    add_daemon_address_arguments(daemon)
+    daemon.add_argument("--no-http", action="store_true", help="Listen on the Unix socket only")
+    daemon.add_argument("--no-socket", action="store_true", help="Listen on localhost HTTP only")
+    daemon.add_argument("-w", "--workers", type=int, default=2, help="Concurrent jobs")
+    daemon.add_argument("-o", "--output", default=default_output_dir(), help="Default output folder")
+    daemon.add_argument("--layout", choices=LAYOUTS, help="Subfolder layout (default from settings, else flat)")
+    add_postprocess_arguments(daemon)
+    daemon.set_defaults(func=cmd_daemon)
+
+    submit = subparsers.add_parser("submit", help="Queue URLs on a running daemon")
+    submit.add_argument("urls", nargs="*", help="TikTok video or profile URLs")
+    submit.add_argument("-i", "--input", help="Text file with one URL per line")
+    submit.add_argument("-o", "--output", help="Output folder (defaults to the daemon's)")
+    submit.add_argument("-e", "--engine", choices=ENGINE_NAMES, default="yt-dlp", help="Download engine")
+    submit.add_argument("-q", "--quality", default="best", help=QUALITY_HELP)
+    submit.add_argument("-w", "--wait", action="store_true", help="Follow jobs until they finish")
+    add_daemon_address_arguments(submit)
+    submit.set_defaults(func=cmd_submit)
+
+    for action, help_text in (("cancel", "Cancel daemon jobs, removing partial files"),
+                              ("pause", "Pause daemon jobs, keeping partial files for resume"),
+                              ("resume", "Resume paused daemon jobs")):
+        control = subparsers.add_parser(action, help=help_text)
+        control.add_argument("job_ids", nargs="+", help="Job IDs printed by submit")
+        add_daemon_address_arguments(control)
+        control.set_defaults(func=cmd_control, action=action)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logger = Logger()
+    settings = load_settings()
+    select_cli_transport(args.transport or settings.get("transport", "http1"))
+    select_cli_downloader(args.downloader or settings.get("downloader", "python"))
+    select_cli_fsync_policy(args.fsync or settings.get("fsync_policy", "none"))
+    if args.profile:
+        from utils.profiler import get_profiler
+        get_profiler().configure(True, args.profile)
+    try:
+        return args.func(args, logger)
+    finally:
+        if args.profile:
+            print_profiles()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3 @@
+"""
+Download orchestration for TTD
+"""
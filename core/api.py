@@ -0,0 +1,223 @@
+"""
+Library API
+DownloadCore is the embeddable entry point: it owns the engines, caches,
+post-processor and worker pool, and exposes downloads as job IDs with
+plain-dict status, cancel/pause/resume and progress streams (blocking or async).
+The GUI drives every local download through it, and nothing here needs Tk.
+
+    from core.api import DownloadCore
+
+    with DownloadCore(output_path="/data/tiktok") as core:
+        job_id = core.submit("https://www.tiktok.com/@user/video/123")
+        success, message = core.wait(job_id)
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+from engines.downloaders import select_downloader
+from engines.transport import select_transport
+from utils.fileio import select_fsync_policy
+from utils.governor import get_governor
+from utils.layout import OutputLayout
+
+# Seconds a blocking event wait lasts before re-checking (keeps async consumers responsive)
+POLL_INTERVAL = 1.0
+
+
+def load_settings(path=None):
+    """Settings shared with the GUI (~/.ttd/settings.json), or {} if missing"""
+    try:
+        with open(path or Path.home() / ".ttd" / "settings.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class DownloadCore:
+    """Headless download service: submit, status, cancel and progress by job ID"""
+
+    def __init__(self, output_path=None, max_workers=2, layout=None, postprocessor=None, logger=None):
+        # Imported here so the CLI can share load_settings without loading the engines
+        from core.jobs import JobManager
+
+        self.logger = logger
+        self.manager = JobManager(
+            max_workers=max_workers,
+            default_output_path=output_path,
+            layout=layout,
+            postprocessor=postprocessor,
+            logger=logger,
+        )
+
+    @classmethod
+    def from_settings(cls, settings=None, output_path=None, max_workers=2, logger=None):
+        """Build a core configured like the GUI: limits, layout and post-processing"""
+        settings = load_settings() if settings is None else settings
+        get_governor().configure(settings)
+
+        # Engines pick up the selected transport when the job manager creates them
+        transport = settings.get("transport", "http1")
+        try:
+            selected = select_transport(transport)
+        except ValueError:
+            selected = select_transport("http1")
+        if selected != transport and logger:
+            logger.warning(f"Transport '{transport}' unavailable; using {selected}")
+
+        # Jobs that do not name a downloader use this one
+        downloader = settings.get("downloader", "python")
+        try:
+            selected = select_downloader(downloader)
+        except ValueError:
+            selected = select_downloader("python")
+        if selected != downloader and downloader != "auto" and logger:
+            logger.warning(f"Downloader '{downloader}' not found; using {selected}")
+
+        try:
+            select_fsync_policy(settings.get("fsync_policy", "none"))
+        except ValueError as e:
+            if logger:
+                logger.warning(f"{e}; not syncing downloads to disk")
+            select_fsync_policy("none")
+
+        try:
+            layout = OutputLayout(settings.get("layout", "flat"))
+        except ValueError as e:
+            if logger:
+                logger.warning(f"{e}; using flat layout")
+            layout = OutputLayout()
+
+        postprocessor = None
+        if settings.get("postprocess", False):
+            from core.postprocess import PostProcessor
+            postprocessor = PostProcessor(logger=logger)
+            if not postprocessor.available:
+                if logger:
+                    logger.warning("Post-processing enabled but ffmpeg was not found")
+                postprocessor = None
+
+        return cls(output_path or settings.get("last_output_dir"), max_workers, layout, postprocessor, logger)
+
+    # Shared components, for consumers that need more than jobs
+
+    @property
+    def engines(self):
+        return self.manager.engines
+
+    @property
+    def governor(self):
+        return self.manager.governor
+
+    @property
+    def layout(self):
+        return self.manager.layout
+
+    @property
+    def info_cache(self):
+        return self.manager.info_cache
+
+    @property
+    def archive(self):
+        return self.manager.archive
+
+    @property
+    def catalog(self):
+        return self.manager.catalog
+
+    @property
+    def postprocessor(self):
+        return self.manager.postprocessor
+
+    # Jobs
+
+    def submit(self, url, engine="yt-dlp", output_path=None, quality="best", filename=None, downloader=None):
+        """
+        Queue a video or profile URL and return its job ID (ValueError for bad input).
+        downloader picks the transfer backend for this job: python, aria2c, curl or auto.
+        """
+        return self.manager.submit(url, engine, output_path, quality, filename, downloader).id
+
+    def status(self, job_id):
+        """Job state as a dict, or None for an unknown ID"""
+        job = self.manager.get(job_id)
+        return job.to_dict() if job else None
+
+    def jobs(self):
+        return [job.to_dict() for job in self.manager.list_jobs()]
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; False if it is unknown or already finished"""
+        return self.manager.cancel(job_id)
+
+    def pause(self, job_id):
+        """Pause a queued or running job, keeping its partial file for resume()"""
+        return self.manager.pause(job_id)
+
+    def resume(self, job_id):
+        """Queue a paused job again; the transfer continues where it stopped"""
+        return self.manager.resume(job_id)
+
+    def events(self, job_id, after=0):
+        """Blocking generator of a job's events, ending after its final state event"""
+        job = self._job(job_id)
+        while True:
+            events = job.wait_events(after, POLL_INTERVAL)
+            # A finished job returns its remaining events at once, then nothing
+            if not events and job.done:
+                return
+            for event in events:
+                after = event['seq']
+                yield event
+
+    async def progress(self, job_id, after=0):
+        """Async iterator over a job's events; waits run in the default executor"""
+        job = self._job(job_id)
+        loop = asyncio.get_running_loop()
+        while True:
+            events = await loop.run_in_executor(None, job.wait_events, after, POLL_INTERVAL)
+            if not events and job.done:
+                return
+            for event in events:
+                after = event['seq']
+                yield event
+
+    def wait(self, job_id, progress_callback=None, status_callback=None, state_callback=None):
+        """Follow a job to the end (through any pauses), forwarding events; returns (success, message)"""
+        for event in self.events(job_id):
+            if event['type'] == 'progress' and progress_callback:
+                progress_callback(event['percent'])
+            elif event['type'] == 'status' and status_callback:
+                status_callback(event['status'])
+            elif event['type'] == 'state' and state_callback:
+                state_callback(event['state'])
+        job = self._job(job_id)
+        return job.state == "completed", job.message or job.state
+
+    # Metadata
+
+    def video_info(self, url, engine="yt-dlp"):
+        """VideoInfo for a video URL, served from the on-disk cache when possible"""
+        video_id = self.manager.validator.extract_video_id(url)
+        video_info = self.info_cache.get(video_id) if video_id and video_id.isdigit() else None
+        if video_info is None:
+            video_info = self.engines[engine].get_video_info(url)
+            if video_info is not None:
+                self.info_cache.put(video_info)
+        return video_info
+
+    def _job(self, job_id):
+        job = self.manager.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        return job
+
+    def shutdown(self, wait=False):
+        self.manager.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(wait=exc_type is None)
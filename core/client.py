@@ -0,0 +1,161 @@
+"""
+Client for the local TTD daemon
+Stdlib only, so submitting a job never pays for Tk or yt-dlp imports.
+"""
+
+import http.client
+import json
+import os
+import socket
+
+from core.daemon import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_SOCKET_PATH, DEFAULT_TOKEN_PATH, read_token
+
+
+class DaemonError(Exception):
+    """Raised when the daemon rejects a request or cannot be reached"""
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket"""
+
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DaemonClient:
+    """Submits jobs to and follows progress from a running daemon"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=10,
+                 token_path=DEFAULT_TOKEN_PATH):
+        # The Unix socket is preferred when it exists; otherwise fall back to localhost HTTP
+        self.socket_path = socket_path if socket_path and hasattr(socket, "AF_UNIX") else None
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        # Localhost HTTP needs the token the daemon wrote there
+        self.token_path = token_path
+
+    def _use_socket(self):
+        return bool(self.socket_path and os.path.exists(self.socket_path))
+
+    def _connection(self, timeout):
+        if self._use_socket():
+            return _UnixHTTPConnection(self.socket_path, timeout=timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def _headers(self, method):
+        headers = {"Content-Type": "application/json"} if method == "POST" else {}
+        if not self._use_socket():
+            token = read_token(self.token_path)
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = self._headers(method)
+        conn = self._connection(self.timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = json.loads(response.read().decode('utf-8') or "{}")
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            raise DaemonError(f"Daemon not reachable: {e}")
+        finally:
+            conn.close()
+        if response.status >= 400:
+            raise DaemonError(data.get('error') or f"HTTP {response.status}")
+        return data
+
+    def is_available(self):
+        """True if a daemon answers the health check"""
+        try:
+            return self._request("GET", "/health").get('status') == 'ok'
+        except DaemonError:
+            return False
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def submit(self, url, engine="yt-dlp", output_path=None, quality="best", filename=None, downloader=None):
+        """Queue a download; returns the job dict including its 'id'"""
+        return self._request("POST", "/jobs", {
+            'url': url,
+            'engine': engine,
+            'output_path': output_path,
+            'quality': quality,
+            'filename': filename,
+            'downloader': downloader,
+        })
+
+    def status(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def jobs(self):
+        return self._request("GET", "/jobs").get('jobs', [])
+
+    def cancel(self, job_id):
+        """Cancel a queued, running or paused job; DaemonError if it is unknown or finished"""
+        return self._request("POST", f"/jobs/{job_id}/cancel")
+
+    def pause(self, job_id):
+        """Pause a queued or running job; its partial file is kept for resume()"""
+        return self._request("POST", f"/jobs/{job_id}/pause")
+
+    def resume(self, job_id):
+        """Queue a paused job again"""
+        return self._request("POST", f"/jobs/{job_id}/resume")
+
+    def governor(self):
+        """The daemon's shared bandwidth and connection limits"""
+        return self._request("GET", "/governor")
+
+    def set_limits(self, bandwidth_limit_kbps=None, max_connections=None):
+        """Change the daemon's limits (None leaves one unchanged, 0 KB/s is unlimited); returns the new limits"""
+        payload = {}
+        if bandwidth_limit_kbps is not None:
+            payload['bandwidth_limit_kbps'] = int(bandwidth_limit_kbps)
+        if max_connections is not None:
+            payload['max_connections'] = int(max_connections)
+        return self._request("POST", "/governor", payload)
+
+    def events(self, job_id, after=0):
+        """Yield event dicts for a job as they happen, ending when the job finishes"""
+        # No timeout: the daemon sends a blank keep-alive line while a job is idle
+        conn = self._connection(None)
+        try:
+            conn.request("GET", f"/jobs/{job_id}/events?after={int(after)}", headers=self._headers("GET"))
+            response = conn.getresponse()
+            if response.status >= 400:
+                data = json.loads(response.read().decode('utf-8') or "{}")
+                raise DaemonError(data.get('error') or f"HTTP {response.status}")
+            for line in response:
+                line = line.strip()
+                if line:
+                    yield json.loads(line.decode('utf-8'))
+        except (OSError, http.client.HTTPException) as e:
+            raise DaemonError(f"Lost connection to daemon: {e}")
+        finally:
+            conn.close()
+
+    def wait(self, job_id, progress_callback=None, status_callback=None, state_callback=None):
+        """Follow a job to completion, forwarding events to engine-style callbacks; returns (success, message)"""
+        for event in self.events(job_id):
+            if event['type'] == 'progress' and progress_callback:
+                progress_callback(event['percent'])
+            elif event['type'] == 'status' and status_callback:
+                status_callback(event['status'])
+            elif event['type'] == 'state' and state_callback:
+                state_callback(event['state'])
+            if event['type'] == 'state' and event['state'] in ("completed", "failed", "cancelled"):
+                return event['state'] == "completed", event.get('message') or ""
+        job = self.status(job_id)
+        return job['state'] == "completed", job.get('message') or ""
@@ -0,0 +1,366 @@
+"""
+Local job-submission daemon
+Keeps a JobManager (and so its engines and their HTTP state) warm and serves
+a small JSON API over localhost HTTP and, where supported, a Unix socket.
+
+    GET  /health               daemon status
+    GET  /jobs                 all known jobs
+    POST /jobs                 {"url", "engine", "output_path", "quality", "filename", "downloader"}
+    GET  /jobs/<id>            one job
+    POST /jobs/<id>/cancel     cancel a queued, running or paused job
+    POST /jobs/<id>/pause      pause a queued or running job (keeps its partial file)
+    POST /jobs/<id>/resume     queue a paused job again
+    GET  /jobs/<id>/events     newline-delimited JSON events until the job ends
+                               (?after=<seq> skips events already seen)
+    GET  /governor             shared bandwidth and connection limits
+    POST /governor             {"bandwidth_limit_kbps", "max_connections"} (either may be omitted;
+                               0 KB/s is unlimited), applied to running transfers
+
+The Unix socket is limited to the owning user by its file mode. Any local
+process (or web page) can reach the TCP port, so requests there must carry
+"Authorization: Bearer <token>" with the token from ~/.ttd/daemon.token,
+which is created 0600 on first start. Requests with an Origin header (sent
+by browsers) are refused on both, as are POSTs that are not application/json.
+"""
+
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 47480
+DEFAULT_SOCKET_PATH = str(Path.home() / ".ttd" / "ttd.sock")
+DEFAULT_TOKEN_PATH = str(Path.home() / ".ttd" / "daemon.token")
+
+# Largest accepted request body
+MAX_BODY_BYTES = 64 * 1024
+
+
+def read_token(path=DEFAULT_TOKEN_PATH):
+    """The daemon's TCP access token, or None if it has not been created"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def ensure_token(path=DEFAULT_TOKEN_PATH):
+    """Return the access token, creating the token file (mode 0600) if needed"""
+    token = read_token(path)
+    if token:
+        return token
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with open(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    return token
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """JSON API handler shared by the TCP and Unix socket servers"""
+    server_version = "TTD-Daemon"
+
+    @property
+    def manager(self):
+        return self.server.manager
+
+    def log_message(self, format, *args):
+        # Unix socket peers have no address, and per-request lines would drown the log
+        logger = self.server.logger
+        if logger:
+            logger.debug(f"Daemon: {format % args}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {'error': message})
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        raw = self.rfile.read(length) if length else b"{}"
+        data = json.loads(raw.decode('utf-8'))
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        return data
+
+    def _authorized(self):
+        """Refuse browser requests, and TCP requests without the access token"""
+        if self.headers.get("Origin") is not None:
+            self._send_error(403, "Cross-origin requests are not allowed")
+            return False
+        token = self.server.token
+        if token:
+            scheme, _, supplied = (self.headers.get("Authorization") or "").partition(" ")
+            if scheme.lower() != "bearer" or not hmac.compare_digest(supplied.strip(), token):
+                self._send_error(401, "Missing or invalid access token")
+                return False
+        return True
+
+    def _path_parts(self):
+        parsed = urlparse(self.path)
+        return [p for p in parsed.path.split('/') if p], parse_qs(parsed.query)
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts, query = self._path_parts()
+
+        if parts == ["health"]:
+            jobs = self.manager.list_jobs()
+            self._send_json(200, {
+                'status': 'ok',
+                'pid': os.getpid(),
+                'jobs': len(jobs),
+                'active': sum(1 for job in jobs if not job.done),
+            })
+        elif parts == ["jobs"]:
+            self._send_json(200, {'jobs': [job.to_dict() for job in self.manager.list_jobs()]})
+        elif parts == ["governor"]:
+            self._send_json(200, self.manager.governor.get_status())
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.manager.get(parts[1])
+            if not job:
+                self._send_error(404, f"No such job: {parts[1]}")
+            elif len(parts) == 2:
+                self._send_json(200, job.to_dict())
+            elif parts[2] == "events":
+                try:
+                    after = int((query.get('after') or ['0'])[0] or 0)
+                except ValueError:
+                    self._send_error(400, "'after' must be an event sequence number")
+                    return
+                self._stream_events(job, after)
+            else:
+                self._send_error(404, "Not found")
+        else:
+            self._send_error(404, "Not found")
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            # Browsers can send text/plain and form posts without a preflight
+            self._send_error(415, "Content-Type must be application/json")
+            return
+        parts, _ = self._path_parts()
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] in ("cancel", "pause", "resume"):
+            self._control(parts[1], parts[2])
+            return
+        if parts == ["governor"]:
+            self._set_limits()
+            return
+        if parts != ["jobs"]:
+            self._send_error(404, "Not found")
+            return
+
+        try:
+            data = self._read_json()
+            job = self.manager.submit(
+                data.get('url'),
+                engine=data.get('engine') or "yt-dlp",
+                output_path=data.get('output_path'),
+                quality=data.get('quality') or "best",
+                custom_filename=data.get('filename'),
+                downloader=data.get('downloader'),
+            )
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+        except Exception as e:
+            self._send_error(500, f"Could not submit job: {e}")
+            return
+        self._send_json(201, job.to_dict())
+
+    def _control(self, job_id, action):
+        job = self.manager.get(job_id)
+        if not job:
+            self._send_error(404, f"No such job: {job_id}")
+        elif not getattr(self.manager, action)(job_id):
+            self._send_error(409, f"Cannot {action} job {job_id}: it is {job.state}")
+        else:
+            self._send_json(202, job.to_dict())
+
+    def _set_limits(self):
+        """Change the shared governor's limits; running transfers pick them up immediately"""
+        try:
+            data = self._read_json()
+            kbps = data.get('bandwidth_limit_kbps')
+            connections = data.get('max_connections')
+            kbps = None if kbps is None else int(kbps)
+            connections = None if connections is None else int(connections)
+            if (kbps is not None and kbps < 0) or (connections is not None and connections < 1):
+                raise ValueError("Limits must be bandwidth_limit_kbps >= 0 and max_connections >= 1")
+        except (TypeError, ValueError) as e:
+            self._send_error(400, str(e))
+            return
+        governor = self.manager.governor
+        if kbps is not None:
+            governor.set_bandwidth_limit(kbps * 1024)
+        if connections is not None:
+            governor.set_max_connections(connections)
+        logger = self.server.logger
+        if logger:
+            logger.info(f"Daemon: limits set to {governor.max_bytes_per_sec or 'unlimited'} B/s, "
+                        f"{governor.max_connections} connections")
+        self._send_json(200, governor.get_status())
+
+    def _stream_events(self, job, after):
+        """Write events as NDJSON lines until the job reaches a terminal state"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            while True:
+                events = job.wait_events(after, timeout=15)
+                if events:
+                    for event in events:
+                        self.wfile.write(json.dumps(event).encode('utf-8') + b"\n")
+                    after = events[-1]['seq']
+                else:
+                    # Keep-alive so idle clients can tell the daemon is still there
+                    self.wfile.write(b"\n")
+                self.wfile.flush()
+                if job.done and not job.wait_events(after, timeout=0):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, manager, logger, token):
+        self.manager = manager
+        self.logger = logger
+        # Required as a bearer token on every request
+        self.token = token
+        super().__init__(address, _RequestHandler)
+
+
+if hasattr(socket, "AF_UNIX"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        # Access is limited by the socket's file mode instead
+        token = None
+
+        def __init__(self, path, manager, logger):
+            self.manager = manager
+            self.logger = logger
+            super().__init__(path, _RequestHandler)
+
+        def get_request(self):
+            request, _ = super().get_request()
+            # BaseHTTPRequestHandler expects a (host, port) style client address
+            return request, ("unix", 0)
+else:
+    _UnixServer = None
+
+
+class TTDDaemon:
+    """Serves a JobManager over localhost HTTP and a Unix socket"""
+
+    def __init__(self, manager=None, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 socket_path=DEFAULT_SOCKET_PATH, token_path=DEFAULT_TOKEN_PATH, max_workers=2, logger=None):
+        if manager is None:
+            # Imported here so core.client can share this module's defaults without loading the engines
+            from core.jobs import JobManager
+            manager = JobManager(max_workers=max_workers, logger=logger)
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path if _UnixServer else None
+        self.token_path = token_path
+        self.logger = logger
+        self.servers = []
+        self.threads = []
+
+    def start(self):
+        """Bind all listeners and serve them on background threads"""
+        if self.port is not None:
+            token = ensure_token(self.token_path)
+            self.servers.append(_TCPServer((self.host, self.port), self.manager, self.logger, token))
+            self.port = self.servers[-1].server_address[1]
+            self._log('info', f"Daemon listening on http://{self.host}:{self.port} (token in {self.token_path})")
+
+        if self.socket_path:
+            self._remove_stale_socket()
+            os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+            # Only the owning user may submit jobs; bind with that mode so the
+            # socket is never connectable by others, even briefly
+            old_umask = os.umask(0o077)
+            try:
+                server = _UnixServer(self.socket_path, self.manager, self.logger)
+            finally:
+                os.umask(old_umask)
+            os.chmod(self.socket_path, 0o600)
+            self.servers.append(server)
+            self._log('info', f"Daemon listening on {self.socket_path}")
+
+        for server in self.servers:
+            thread = threading.Thread(target=server.serve_forever, name="ttd-daemon", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def serve_forever(self):
+        """Start and block until interrupted"""
+        self.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.servers = []
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.manager.shutdown()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def _remove_stale_socket(self):
+        """Remove a socket file left by a crashed daemon, refusing if one is still running"""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise RuntimeError(f"Another daemon is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    def _log(self, level, message):
+        if self.logger:
+            self.logger.log(level, message)
@@ -0,0 +1,282 @@
+"""
+Streaming URL ingestion
+Tails a text/JSONL file or watches a drop folder and yields validated,
+de-duplicated video URLs one at a time, so DownloadPipeline.run() can consume
+a list that never ends. Files are read line by line as they grow; only a
+bounded window of recent video IDs is kept, and the download archive covers
+anything older. Changes wake the reader through inotify on Linux, with
+polling everywhere else.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from utils.validator import URLValidator
+
+# Seconds between re-scans (also the longest a stop() request waits)
+POLL_INTERVAL = 1.0
+# A dropped file must be unchanged this long before it is read
+SETTLE_SECONDS = 1.0
+# Video IDs remembered for de-duplication beyond the archive
+RECENT_IDS = 100000
+# Longer lines are skipped rather than buffered
+MAX_LINE = 64 * 1024
+DROP_SUFFIXES = (".txt", ".jsonl", ".ndjson", ".list")
+PROCESSED_DIR = "processed"
+
+# linux/inotify.h
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+
+
+class _InotifyWatch:
+    """Wakes on changes inside one directory (Linux inotify via libc)"""
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"Cannot watch {directory}")
+
+    def wait(self, timeout):
+        """Block until something in the directory changes or the timeout passes"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            # Events only wake the reader, which re-reads the source itself
+            try:
+                while os.read(self.fd, 64 * 1024):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingWatch:
+    """Fallback that simply sleeps between scans"""
+
+    def __init__(self, stop_event):
+        self._stop = stop_event
+
+    def wait(self, timeout):
+        self._stop.wait(timeout)
+
+    def close(self):
+        pass
+
+
+class FileTailer:
+    """Follows a growing file like tail -F: picks up appends, truncation and rotation"""
+
+    def __init__(self, path, from_end=False):
+        self.path = path
+        self.from_end = from_end
+        self._file = None
+        self._identity = None
+        self._skipping = False
+
+    def _open(self):
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(f.fileno())
+        self._file = f
+        self._identity = (stat.st_dev, stat.st_ino)
+        if self.from_end:
+            f.seek(0, os.SEEK_END)
+            # Only the file present at startup is skipped; rotated-in files are read whole
+            self.from_end = False
+        return True
+
+    def read_lines(self):
+        """Yield the complete lines appended since the last call"""
+        if self._file is None and not self._open():
+            return
+        while True:
+            position = self._file.tell()
+            line = self._file.readline(MAX_LINE)
+            if not line:
+                break
+            if not line.endswith(b"\n"):
+                if len(line) < MAX_LINE:
+                    # A line still being written; re-read it once it is complete
+                    self._file.seek(position)
+                    break
+                self._skipping = True
+                continue
+            if self._skipping:
+                # Tail end of an overlong line
+                self._skipping = False
+                continue
+            yield line.decode('utf-8', errors='replace')
+        self._check_rotation()
+
+    def _check_rotation(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if (stat.st_dev, stat.st_ino) != self._identity:
+            self.close()
+            self._open()
+        elif stat.st_size < self._file.tell():
+            self._file.seek(0)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class DropFolder:
+    """Reads list files dropped into a folder, then moves them to processed/"""
+
+    def __init__(self, path, settle=SETTLE_SECONDS):
+        self.path = path
+        self.settle = settle
+
+    def ready_files(self):
+        """List files that have stopped changing, oldest first"""
+        now = time.time()
+        ready = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.name.lower().endswith(DROP_SUFFIXES):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if now - mtime >= self.settle:
+                    ready.append((mtime, entry.path))
+        return [path for _, path in sorted(ready)]
+
+    def read_lines(self):
+        """Yield every line of each ready file, retiring a file once it is read"""
+        for path in self.ready_files():
+            try:
+                with open(path, 'rb') as f:
+                    for line in f:
+                        yield line.decode('utf-8', errors='replace')
+            except OSError:
+                continue
+            self._retire(path)
+
+    def _retire(self, path):
+        done_dir = os.path.join(self.path, PROCESSED_DIR)
+        os.makedirs(done_dir, exist_ok=True)
+        target = os.path.join(done_dir, os.path.basename(path))
+        if os.path.exists(target):
+            target = os.path.join(done_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.path.basename(path)}")
+        try:
+            os.replace(path, target)
+        except OSError:
+            pass
+
+    def close(self):
+        pass
+
+
+class UrlIngestor:
+    """Iterable of new, valid video URLs from a tailed file or a drop folder"""
+
+    def __init__(self, path, archive=None, from_end=False, follow=True,
+                 poll_interval=POLL_INTERVAL, logger=None):
+        self.path = path
+        self.archive = archive
+        # follow=False reads what is there now and stops
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.logger = logger
+        self.validator = URLValidator()
+        if os.path.isdir(path):
+            self.source = DropFolder(path, SETTLE_SECONDS if follow else 0)
+            self.watch_dir = path
+        else:
+            self.source = FileTailer(path, from_end)
+            self.watch_dir = os.path.dirname(os.path.abspath(path))
+        self.stats = {'accepted': 0, 'duplicates': 0, 'invalid': 0}
+        self._recent = OrderedDict()
+        self._stop = threading.Event()
+
+    def stop(self):
+        """End iteration at the next line or wake-up"""
+        self._stop.set()
+
+    def _watch(self):
+        if sys.platform.startswith("linux"):
+            try:
+                return _InotifyWatch(self.watch_dir)
+            except (OSError, AttributeError) as e:
+                self._log('warning', f"inotify unavailable ({e}); polling {self.watch_dir}")
+        return _PollingWatch(self._stop)
+
+    def __iter__(self):
+        watch = self._watch()
+        try:
+            while not self._stop.is_set():
+                for line in self.source.read_lines():
+                    url = self._accept(line)
+                    if url:
+                        yield url
+                    if self._stop.is_set():
+                        return
+                if not self.follow:
+                    return
+                watch.wait(self.poll_interval)
+        finally:
+            watch.close()
+            self.source.close()
+
+    def _accept(self, line):
+        """The line's URL if it is a valid, unseen video URL, else None"""
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return None
+        url = line
+        if line.startswith('{'):
+            # JSONL: {"url": "...", ...}
+            try:
+                url = json.loads(line).get('url')
+            except (ValueError, AttributeError):
+                url = None
+        url = url.strip() if isinstance(url, str) else ""
+
+        is_valid, message = self.validator.is_valid_tiktok_url(url)
+        if not is_valid:
+            self.stats['invalid'] += 1
+            self._log('warning', f"Skipping ingested line ({message}): {line[:200]}")
+            return None
+
+        key = self.validator.extract_video_id(url) or url
+        if key in self._recent or (key.isdigit() and self.archive is not None and key in self.archive):
+            self.stats['duplicates'] += 1
+            return None
+        self._recent[key] = None
+        if len(self._recent) > RECENT_IDS:
+            self._recent.popitem(last=False)
+        self.stats['accepted'] += 1
+        return url
+
+    def _log(self, level, message):
+        if self.logger:
+            self.logger.log(level, message)
@@ -0,0 +1,352 @@
+"""
+Job manager
+Owns warm engines, the download archive and worker threads, and tracks every submitted
+download as a Job with a stream of progress events.
+"""
+
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from engines.downloaders import DOWNLOADERS
+from engines.info_cache import InfoCache
+from engines.profile_sync import ProfileSync
+from engines.tiktok_api_engine import TikTokApiEngine
+from engines.yt_dlp_engine import YtDlpEngine
+from utils.archive import DownloadArchive
+from utils.catalog import DownloadCatalog, catalog_entry
+from utils.control import TransferCancelled, TransferControl, TransferPaused
+from utils.governor import get_governor
+from utils.layout import OutputLayout
+from utils.profiler import get_profiler
+from utils.validator import URLValidator
+
+TERMINAL_STATES = ("completed", "failed", "cancelled")
+
+
+class Job:
+    """A single submitted download and its event history"""
+
+    # Events kept per job for late subscribers
+    MAX_EVENTS = 500
+
+    def __init__(self, url, engine, output_path, quality="best", custom_filename=None, downloader=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.engine = engine
+        self.output_path = output_path
+        self.quality = quality
+        self.custom_filename = custom_filename
+        # Transfer backend for this job; None uses the selected default
+        self.downloader = downloader
+        self.state = "queued"
+        self.progress = 0.0
+        self.status = "Queued"
+        self.message = ""
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = deque(maxlen=self.MAX_EVENTS)
+        # Cancel/pause token handed to the engine; see JobManager.cancel/pause/resume
+        self.control = TransferControl()
+        self.future = None
+        self._seq = itertools.count(1)
+        self._changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.state in TERMINAL_STATES
+
+    def emit(self, event_type, **data):
+        """Append an event and wake any waiting subscribers"""
+        with self._changed:
+            event = {'seq': next(self._seq), 'job': self.id, 'type': event_type, 'time': time.time()}
+            event.update(data)
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def report_progress(self, percent):
+        """Engine progress callback; doubles as a cancellation checkpoint"""
+        self.control.check_cancelled()
+        self.set_progress(percent)
+
+    def report_status(self, status):
+        """Engine status callback; doubles as a cancellation checkpoint"""
+        self.control.check_cancelled()
+        self.set_status(status)
+
+    def set_progress(self, percent):
+        # Only whole-percent changes become events; chunk-level updates would flood subscribers
+        if int(percent) != int(self.progress) or percent >= 100:
+            self.progress = percent
+            self.emit('progress', percent=round(percent, 1))
+        else:
+            self.progress = percent
+
+    def set_status(self, status):
+        self.status = status
+        self.emit('status', status=status)
+
+    def set_state(self, state, message=""):
+        self.state = state
+        if message:
+            self.message = message
+        if state == "running":
+            self.started = time.time()
+        elif state in TERMINAL_STATES:
+            self.finished = time.time()
+        self.emit('state', state=state, message=message)
+
+    def wait_until_stopped(self, timeout=None):
+        """Block until the job is no longer running"""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.state != "running", timeout)
+
+    def wait_events(self, after=0, timeout=None):
+        """Return events with seq > after, blocking until one arrives, the job ends or timeout"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._changed:
+            while True:
+                events = [e for e in self.events if e['seq'] > after]
+                if events or self.done:
+                    return events
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._changed.wait(remaining)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'engine': self.engine,
+            'output_path': self.output_path,
+            'quality': self.quality,
+            'downloader': self.downloader,
+            'state': self.state,
+            'progress': round(self.progress, 1),
+            'status': self.status,
+            'message': self.message,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobManager:
+    """Runs jobs on a bounded worker pool with long-lived engines"""
+
+    # Finished jobs kept for status queries
+    MAX_FINISHED_JOBS = 1000
+    # Seconds shutdown() gives running jobs to stop at their next checkpoint
+    SHUTDOWN_GRACE = 5
+
+    def __init__(self, max_workers=2, default_output_path=None, layout=None, postprocessor=None, logger=None):
+        self.logger = logger
+        self.governor = get_governor()
+        self.profiler = get_profiler()
+        self.layout = layout or OutputLayout()
+        # Optional PostProcessor for finished single-video jobs
+        self.postprocessor = postprocessor
+        # Engines and their HTTP state stay warm for every job
+        self.engines = {
+            "yt-dlp": YtDlpEngine(self.governor, self.layout),
+            "tiktok-api": TikTokApiEngine(self.governor, self.layout),
+        }
+        self.archive = DownloadArchive()
+        # Queryable record of finished downloads
+        self.catalog = DownloadCatalog(logger=logger)
+        self.info_cache = InfoCache()
+        self.validator = URLValidator()
+        self.default_output_path = default_output_path or str(Path.home() / "Downloads" / "TTD")
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ttd-job")
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, url, engine="yt-dlp", output_path=None, quality="best", custom_filename=None, downloader=None):
+        """Queue a download and return its Job"""
+        if engine not in self.engines:
+            raise ValueError(f"Unknown engine: {engine}")
+        if downloader and downloader not in DOWNLOADERS:
+            raise ValueError(f"Unknown downloader: {downloader}")
+        url = (url or "").strip()
+        if not self.validator.is_profile_url(url):
+            is_valid, message = self.validator.is_valid_tiktok_url(url)
+            if not is_valid:
+                raise ValueError(message)
+
+        job = Job(url, engine, output_path or self.default_output_path, quality, custom_filename, downloader)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        job.emit('state', state=job.state, message="")
+        job.future = self.executor.submit(self._run, job)
+        self._log('info', f"Job {job.id} queued: {url}")
+        return job
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Queued and paused jobs end at once (dropping any partial
+        file); running jobs stop at their engine's next chunk.
+        Returns False if the job is unknown or already finished.
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.control.cancel()
+        if job.state == "paused" or (job.future is not None and job.future.cancel()):
+            job.control.discard_partials()
+            job.set_state("cancelled", "Cancelled")
+        else:
+            job.emit('status', status="Cancelling...")
+        self._log('info', f"Job {job.id} cancel requested")
+        return True
+
+    def pause(self, job_id):
+        """
+        Pause a queued or running job. A running transfer stops at its next chunk
+        and keeps its partial file; resume() continues it with a Range request.
+        """
+        job = self.get(job_id)
+        if job is None or job.done or job.state == "paused":
+            return False
+        job.control.pause()
+        if job.future is not None and job.future.cancel():
+            job.set_state("paused", "Paused")
+        else:
+            job.emit('status', status="Pausing...")
+        self._log('info', f"Job {job.id} pause requested")
+        return True
+
+    def resume(self, job_id):
+        """Queue a paused job again"""
+        job = self.get(job_id)
+        if job is None or job.state != "paused":
+            return False
+        job.control.resume()
+        job.set_state("queued")
+        job.future = self.executor.submit(self._run, job)
+        self._log('info', f"Job {job.id} resumed")
+        return True
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def shutdown(self, wait=False):
+        """
+        Stop accepting work. With wait=False, running jobs are paused rather than
+        killed mid-write, so their partial files can be resumed later.
+        """
+        if not wait:
+            running = [job for job in self.list_jobs() if job.state == "running"]
+            for job in running:
+                job.control.pause()
+            deadline = time.monotonic() + self.SHUTDOWN_GRACE
+            for job in running:
+                job.wait_until_stopped(max(0.0, deadline - time.monotonic()))
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        if self.postprocessor is not None:
+            self.postprocessor.shutdown(wait=wait)
+        self.catalog.close()
+
+    def _run(self, job):
+        """Worker body: run one job until it finishes, fails, or is paused or cancelled"""
+        if job.control.cancelled:
+            job.set_state("cancelled", "Cancelled")
+            return
+        if job.control.paused:
+            job.set_state("paused", "Paused")
+            return
+        job.set_state("running")
+        engine = self.engines[job.engine]
+        # The record the engine resolved; short links only reveal the real ID here
+        resolved = []
+        try:
+            os.makedirs(job.output_path, exist_ok=True)
+            with self.profiler.profile(f"job-{job.id}"):
+                if self.validator.is_profile_url(job.url):
+                    syncer = ProfileSync(engine, archive=self.archive, lister=self.engines["yt-dlp"], logger=self.logger,
+                                         catalog=self.catalog)
+                    summary = syncer.sync(job.url, job.output_path, job.quality,
+                                          job.report_progress, job.report_status, control=job.control,
+                                          downloader=job.downloader)
+                    success = not summary['error'] and not summary['failed']
+                    message = summary['error'] or f"{summary['downloaded']} downloaded, {summary['failed']} failed"
+                else:
+                    success, message = engine.download(
+                        job.url, job.output_path, job.quality,
+                        job.report_progress, job.report_status,
+                        custom_filename=job.custom_filename,
+                        control=job.control,
+                        downloader=job.downloader,
+                        info_callback=resolved.append
+                    )
+        except TransferPaused:
+            job.set_state("paused", "Paused; resuming continues from the partial file")
+            self._log('info', f"Job {job.id} paused")
+            return
+        except TransferCancelled:
+            job.control.discard_partials()
+            job.set_state("cancelled", "Cancelled")
+            self._log('info', f"Job {job.id} cancelled")
+            return
+        except Exception as e:
+            success, message = False, f"Download failed: {e}"
+
+        if success:
+            job.set_progress(100)
+            if resolved:
+                entry = self._catalog(job, resolved[-1])
+                if self.postprocessor is not None:
+                    self._postprocess(job, resolved[-1], entry)
+            job.set_state("completed", message)
+        else:
+            job.set_state("failed", message)
+        self._log('info' if success else 'error', f"Job {job.id} {job.state}: {message}")
+
+    def _catalog(self, job, video_info):
+        """Add a finished single-video job to the catalog from the record it downloaded; returns the entry"""
+        video_id = str(video_info.id)
+        index = self.layout.index(job.output_path)
+        entry = catalog_entry(video_info, index.get(video_id), job.engine, job.quality,
+                              index.checksum(video_id), job.started)
+        self.catalog.add(entry)
+        return entry
+
+    def _postprocess(self, job, video_info, entry=None):
+        """Hand a finished file to the post-processor; the job does not wait for it"""
+        video_id = str(video_info.id)
+        filepath = self.layout.find(job.output_path, video_id)
+        if not filepath:
+            return
+
+        def on_done(path, success, message, checksum):
+            job.emit('postprocess', success=success, message=message)
+            if success and checksum:
+                self.layout.record(job.output_path, video_id, path, checksum)
+                if entry is not None:
+                    self.catalog.record_file(entry, path, checksum)
+
+        # The downloaded record supplies the title/uploader tags
+        self.postprocessor.submit(filepath, video_info, on_done)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        finished = sorted((j for j in self.jobs.values() if j.done), key=lambda j: j.finished)
+        excess = len(finished) - self.MAX_FINISHED_JOBS
+        for job in finished[:max(0, excess)]:
+            del self.jobs[job.id]
+
+    def _log(self, level, message):
+        if self.logger:
+            self.logger.log(level, message)
@@ -0,0 +1,489 @@
+"""
+Shared job store for multi-node work sharing
+Several TTD workers, on one box or many, pull URLs from the same store. A
+worker leases a job for a limited time and renews the lease with heartbeats
+while it runs; a crashed worker's lease expires and another worker picks the
+job up. Finished video IDs go into the store's archive table, which every
+worker checks before downloading, so no video is fetched twice.
+
+SQLiteJobStore keeps everything in one SQLite file, which can sit on shared
+storage. MemoryJobStore is the in-process stand-in with the same interface.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from utils.validator import URLValidator
+
+# Seconds a lease lasts without a heartbeat
+DEFAULT_LEASE = 120
+# Leases granted before a job is marked failed
+MAX_ATTEMPTS = 3
+# Seconds a failed job waits before its next lease, doubling per attempt up to RETRY_DELAY_MAX,
+# so a transient CDN error does not use up every attempt within seconds
+RETRY_DELAY = 30
+RETRY_DELAY_MAX = 15 * 60
+# Rows per INSERT batch when enqueueing
+ENQUEUE_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL DEFAULT 'queued',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL,
+    message TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires);
+CREATE TABLE IF NOT EXISTS archive (
+    video_id TEXT PRIMARY KEY,
+    owner TEXT,
+    added REAL NOT NULL
+);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def retry_delay(attempts, base=RETRY_DELAY):
+    """Seconds before a job that has failed `attempts` times may be leased again"""
+    return min(RETRY_DELAY_MAX, base * 2 ** max(0, attempts - 1))
+
+
+class JobStore:
+    """
+    Interface shared by the store backends. Jobs move queued -> leased ->
+    completed | failed; an expired lease makes a job leasable again.
+    """
+
+    def enqueue(self, urls):
+        """Add URLs not already in the store; returns how many were new"""
+        raise NotImplementedError
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE):
+        """Claim the oldest available job as (job_id, url), or None if there is none"""
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id, job_ids, lease_seconds=DEFAULT_LEASE):
+        """Extend this worker's leases; returns the IDs it still holds"""
+        raise NotImplementedError
+
+    def complete(self, job_id, worker_id, message=""):
+        raise NotImplementedError
+
+    def fail(self, job_id, worker_id, message="", retry=True):
+        """
+        Give a job back for another attempt after retry_delay(), or mark it
+        failed once attempts run out
+        """
+        raise NotImplementedError
+
+    def release(self, job_id, worker_id):
+        """Return an unstarted or interrupted job to the queue without counting the attempt"""
+        raise NotImplementedError
+
+    def archive_contains(self, video_id):
+        raise NotImplementedError
+
+    def archive_add(self, video_id, worker_id=None):
+        """Record a downloaded video ID; returns False if it was already archived"""
+        raise NotImplementedError
+
+    def archive_count(self):
+        raise NotImplementedError
+
+    def counts(self):
+        """Jobs per state, with expired leases counted as queued"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore(JobStore):
+    """Job store in a single SQLite file, safe for concurrent processes"""
+
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY):
+        self.path = str(path)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # Autocommit; writes that must be atomic open their own BEGIN IMMEDIATE
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.executescript(SCHEMA)
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+            if 'not_before' not in columns:
+                # Stores created before retries were delayed
+                self._db.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+
+    def _write(self, func):
+        """Run func(cursor) inside one IMMEDIATE transaction"""
+        with self._lock:
+            cursor = self._db.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(cursor)
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            return result
+
+    def enqueue(self, urls):
+        added = 0
+        batch = []
+        for url in urls:
+            batch.append(url)
+            if len(batch) >= ENQUEUE_BATCH:
+                added += self._insert(batch)
+                batch = []
+        if batch:
+            added += self._insert(batch)
+        return added
+
+    def _insert(self, urls):
+        now = time.time()
+
+        def insert(cursor):
+            before = self._db.total_changes
+            cursor.executemany(
+                "INSERT OR IGNORE INTO jobs (url, created, updated) VALUES (?, ?, ?)",
+                [(url, now, now) for url in urls]
+            )
+            return self._db.total_changes - before
+
+        return self._write(insert)
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE):
+        def claim(cursor):
+            now = time.time()
+            row = cursor.execute(
+                "SELECT id, url FROM jobs WHERE (state = 'queued' AND (not_before IS NULL OR not_before <= ?)) "
+                "OR (state = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            cursor.execute(
+                "UPDATE jobs SET state = 'leased', owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row[0])
+            )
+            return row[0], row[1]
+
+        return self._write(claim)
+
+    def heartbeat(self, worker_id, job_ids, lease_seconds=DEFAULT_LEASE):
+        job_ids = list(job_ids)
+        if not job_ids:
+            return []
+
+        def renew(cursor):
+            now = time.time()
+            held = []
+            for job_id in job_ids:
+                cursor.execute(
+                    "UPDATE jobs SET lease_expires = ?, updated = ? "
+                    "WHERE id = ? AND owner = ? AND state = 'leased'",
+                    (now + lease_seconds, now, job_id, worker_id)
+                )
+                if cursor.rowcount:
+                    held.append(job_id)
+            return held
+
+        return self._write(renew)
+
+    def complete(self, job_id, worker_id, message=""):
+        self._finish(job_id, worker_id, "completed", message)
+
+    def fail(self, job_id, worker_id, message="", retry=True):
+        def give_back(cursor):
+            row = cursor.execute("SELECT attempts FROM jobs WHERE id = ? AND owner = ?",
+                                 (job_id, worker_id)).fetchone()
+            if row is None:
+                return
+            now = time.time()
+            retrying = retry and row[0] < self.max_attempts
+            cursor.execute(
+                "UPDATE jobs SET state = ?, owner = NULL, lease_expires = NULL, not_before = ?, "
+                "message = ?, updated = ? WHERE id = ?",
+                ("queued" if retrying else "failed", now + retry_delay(row[0], self.retry_delay) if retrying else None,
+                 message, now, job_id)
+            )
+
+        self._write(give_back)
+
+    def release(self, job_id, worker_id):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = 'queued', owner = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0), updated = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                (time.time(), job_id, worker_id)
+            )
+
+    def _finish(self, job_id, worker_id, state, message):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, lease_expires = NULL, message = ?, updated = ? "
+                "WHERE id = ? AND owner = ?",
+                (state, message, time.time(), job_id, worker_id)
+            )
+
+    def archive_contains(self, video_id):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM archive WHERE video_id = ?",
+                                    (str(video_id),)).fetchone() is not None
+
+    def archive_add(self, video_id, worker_id=None):
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO archive (video_id, owner, added) VALUES (?, ?, ?)",
+                (str(video_id), worker_id, time.time())
+            )
+            return cursor.rowcount > 0
+
+    def archive_count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT CASE WHEN state = 'leased' AND lease_expires < ? THEN 'queued' ELSE state END, "
+                "COUNT(*) FROM jobs GROUP BY 1",
+                (time.time(),)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class MemoryJobStore(JobStore):
+    """In-process stand-in for a shared store, for single-box runs and tests"""
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.jobs = {}
+        self.urls = set()
+        self.archive = set()
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self, urls):
+        added = 0
+        with self._lock:
+            for url in urls:
+                if url in self.urls:
+                    continue
+                self._ids += 1
+                self.urls.add(url)
+                self.jobs[self._ids] = {'id': self._ids, 'url': url, 'state': "queued", 'owner': None,
+                                        'lease_expires': None, 'attempts': 0, 'not_before': None,
+                                        'message': ""}
+                added += 1
+        return added
+
+    def _available(self, job, now):
+        if job['state'] == "queued":
+            return (job['not_before'] or 0) <= now
+        return job['state'] == "leased" and job['lease_expires'] < now
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE):
+        now = time.time()
+        with self._lock:
+            for job in self.jobs.values():
+                if self._available(job, now):
+                    job.update(state="leased", owner=worker_id, lease_expires=now + lease_seconds,
+                               attempts=job['attempts'] + 1)
+                    return job['id'], job['url']
+        return None
+
+    def heartbeat(self, worker_id, job_ids, lease_seconds=DEFAULT_LEASE):
+        now = time.time()
+        held = []
+        with self._lock:
+            for job_id in job_ids:
+                job = self.jobs.get(job_id)
+                if job and job['owner'] == worker_id and job['state'] == "leased":
+                    job['lease_expires'] = now + lease_seconds
+                    held.append(job_id)
+        return held
+
+    def complete(self, job_id, worker_id, message=""):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job and job['owner'] == worker_id:
+                job.update(state="completed", lease_expires=None, message=message)
+
+    def fail(self, job_id, worker_id, message="", retry=True):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job and job['owner'] == worker_id:
+                retrying = retry and job['attempts'] < self.max_attempts
+                job.update(state="queued" if retrying else "failed", owner=None, lease_expires=None,
+                           not_before=time.time() + retry_delay(job['attempts'], self.retry_delay) if retrying else None,
+                           message=message)
+
+    def release(self, job_id, worker_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job and job['owner'] == worker_id and job['state'] == "leased":
+                job.update(state="queued", owner=None, lease_expires=None, attempts=max(job['attempts'] - 1, 0))
+
+    def archive_contains(self, video_id):
+        with self._lock:
+            return str(video_id) in self.archive
+
+    def archive_add(self, video_id, worker_id=None):
+        with self._lock:
+            if str(video_id) in self.archive:
+                return False
+            self.archive.add(str(video_id))
+            return True
+
+    def archive_count(self):
+        with self._lock:
+            return len(self.archive)
+
+    def counts(self):
+        now = time.time()
+        counts = {}
+        with self._lock:
+            for job in self.jobs.values():
+                state = "queued" if self._available(job, now) else job['state']
+                counts[state] = counts.get(state, 0) + 1
+        return counts
+
+
+class SharedArchive:
+    """DownloadArchive-compatible view of a store's archive table"""
+
+    def __init__(self, store, worker_id=None):
+        self.store = store
+        self.worker_id = worker_id
+
+    def __contains__(self, video_id):
+        return self.store.archive_contains(video_id)
+
+    def __len__(self):
+        return self.store.archive_count()
+
+    def add(self, video):
+        return self.store.archive_add(str(getattr(video, 'id', video)), self.worker_id)
+
+
+class StoreWorker:
+    """
+    Pulls jobs from a JobStore into a DownloadPipeline until stopped (or until
+    the store runs dry, with exit_when_empty), renewing leases while they run.
+    """
+
+    def __init__(self, store, pipeline_factory, worker_id=None, lease_seconds=DEFAULT_LEASE,
+                 poll_interval=2.0, exit_when_empty=False, logger=None):
+        self.store = store
+        # Called with the SharedArchive; returns a DownloadPipeline writing to it
+        self.pipeline_factory = pipeline_factory
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.exit_when_empty = exit_when_empty
+        self.logger = logger
+        self.archive = SharedArchive(store, self.worker_id)
+        self.validator = URLValidator()
+        self.stats = {'completed': 0, 'failed': 0, 'skipped': 0}
+        # Pipeline item index -> store job ID, for every job this worker holds
+        self._held = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _leased_urls(self):
+        """Lease jobs one at a time as the pipeline asks for input"""
+        index = 0
+        while not self._stop.is_set():
+            claimed = self.store.lease(self.worker_id, self.lease_seconds)
+            if claimed is None:
+                with self._lock:
+                    busy = bool(self._held)
+                # Jobs waiting out a retry delay still count as work left
+                if self.exit_when_empty and not busy and not self.store.counts().get('queued'):
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            job_id, url = claimed
+            video_id = self.validator.extract_video_id(url)
+            if video_id and video_id.isdigit() and video_id in self.archive:
+                # Another worker already downloaded it
+                self.store.complete(job_id, self.worker_id, "Already archived")
+                self.stats['skipped'] += 1
+                continue
+            with self._lock:
+                self._held[index] = job_id
+            index += 1
+            yield url
+
+    def _heartbeat(self):
+        interval = max(1.0, self.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            with self._lock:
+                job_ids = list(self._held.values())
+            try:
+                held = set(self.store.heartbeat(self.worker_id, job_ids, self.lease_seconds))
+            except Exception as e:
+                self._log('warning', f"Heartbeat failed: {e}")
+                continue
+            for job_id in job_ids:
+                if job_id not in held:
+                    self._log('warning', f"Lost the lease on job {job_id}")
+
+    def run(self, on_item=None):
+        """Process jobs; on_item(item) is called for each finished PipelineItem"""
+        heartbeat = threading.Thread(target=self._heartbeat, name="ttd-heartbeat", daemon=True)
+        heartbeat.start()
+        pipeline = self.pipeline_factory(self.archive)
+        try:
+            for item in pipeline.run(self._leased_urls()):
+                with self._lock:
+                    job_id = self._held.pop(item.index, None)
+                if job_id is None:
+                    if not item.success:
+                        # Not a leased job: the store itself failed
+                        self._log('error', item.message)
+                    continue
+                if item.success:
+                    self.store.complete(job_id, self.worker_id, item.message or "")
+                    self.stats['completed'] += 1
+                else:
+                    self.store.fail(job_id, self.worker_id, item.message or "")
+                    self.stats['failed'] += 1
+                if on_item:
+                    on_item(item)
+        finally:
+            self._stop.set()
+            # Hand back anything still leased so other workers need not wait for expiry
+            with self._lock:
+                held, self._held = list(self._held.values()), {}
+            for job_id in held:
+                self.store.release(job_id, self.worker_id)
+
+    def _log(self, level, message):
+        if self.logger:
+            self.logger.log(level, message)
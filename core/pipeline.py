@@ -0,0 +1,285 @@
+"""
+Staged download pipeline for multi-URL jobs
+resolver -> metadata extractor -> transfer -> finalize, each stage with its
+own worker threads and a bounded queue in front of it, so item N+1's page
+fetch overlaps item N's media transfer.
+"""
+
+import queue
+import threading
+import time
+
+from engines.transport import get_transport
+from utils.catalog import catalog_entry
+from utils.control import TransferControl, TransferInterrupted
+from utils.profiler import get_profiler
+from utils.validator import URLValidator
+
+# Marks the end of input for a stage worker
+_DONE = object()
+
+
+class PipelineItem:
+    """One URL moving through the pipeline"""
+    __slots__ = ('index', 'url', 'video_id', 'video_info', 'filepath', 'checksum', 'success', 'message',
+                 'started', 'timings')
+
+    def __init__(self, index, url):
+        self.index = index
+        self.url = url
+        self.video_id = None
+        self.video_info = None
+        self.filepath = None
+        self.checksum = None
+        self.success = False
+        self.started = time.time()
+        # Seconds spent in each stage, for the catalog
+        self.timings = {}
+        # Set as soon as a stage fails; later stages pass the item straight through
+        self.message = None
+
+    def __repr__(self):
+        return f"PipelineItem(index={self.index}, video_id={self.video_id!r}, success={self.success})"
+
+
+class _Stage:
+    """A pool of worker threads reading from one bounded queue"""
+    def __init__(self, name, func, workers, queue_size, profiled=False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.next_stage = None
+        # Profiled stages get one profile per item when profiling is enabled
+        self.profiler = get_profiler() if profiled else None
+        self.threads = []
+        self._finished = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ttd-{self.name}-{n}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                break
+            # Failed items skip the work but still flow on so they get finalized
+            if item.message is None:
+                start = time.monotonic()
+                try:
+                    if self.profiler is not None:
+                        with self.profiler.profile(f"{self.name}-{item.video_id or item.index}"):
+                            self.func(item)
+                    else:
+                        self.func(item)
+                except TransferInterrupted as e:
+                    item.message = str(e)
+                except Exception as e:
+                    item.message = f"{self.name} failed: {e}"
+                item.timings[self.name] = time.monotonic() - start
+            self.next_stage.put(item)
+
+        # The last worker out closes the next stage
+        with self._lock:
+            self._finished += 1
+            last = self._finished == self.workers
+        if last:
+            self.next_stage.close()
+
+    def put(self, item):
+        self.queue.put(item)
+
+    def close(self):
+        for _ in range(self.workers):
+            self.queue.put(_DONE)
+
+
+class _ResultSink:
+    """Terminal 'stage' collecting finished items for the consumer"""
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=max(1, int(queue_size)))
+
+    def put(self, item):
+        self.queue.put(item)
+
+    def close(self):
+        self.queue.put(_DONE)
+
+
+class DownloadPipeline:
+    """Runs many URLs through overlapping resolve/extract/transfer/finalize stages"""
+
+    # Stages worth a per-item profile; resolve and finalize are trivial
+    PROFILED_STAGES = ("extract", "transfer")
+
+    def __init__(self, engine, output_path, quality="best", archive=None,
+                 resolve_workers=2, extract_workers=4, transfer_workers=2,
+                 finalize_workers=1, queue_size=8,
+                 progress_callback=None, status_callback=None, on_complete=None,
+                 postprocessor=None, catalog=None, skip_existing=False,
+                 control=None, downloader=None):
+        self.engine = engine
+        self.output_path = output_path
+        self.quality = quality
+        # Shared by every transfer; pausing or cancelling it stops the items in flight
+        self.control = control or TransferControl()
+        # Transfer backend name (see engines.downloaders; default: the selected one)
+        self.downloader = downloader
+        self.archive = archive
+        # Optional DownloadCatalog; finalize adds an entry per finished item
+        self.catalog = catalog
+        # Items whose cataloged file is still on disk finish at once without a download
+        self.skip_existing = skip_existing and catalog is not None
+        # Optional PostProcessor; finished files are handed off without waiting for it
+        self.postprocessor = postprocessor
+        self.queue_size = queue_size
+        # Callbacks receive the PipelineItem as their first argument
+        self.progress_callback = progress_callback
+        self.status_callback = status_callback
+        self.on_complete = on_complete
+        self.validator = URLValidator()
+        # Worker threads per stage, in pipeline order
+        self.workers = {
+            'resolve': resolve_workers,
+            'extract': extract_workers,
+            'transfer': transfer_workers,
+            'finalize': finalize_workers,
+        }
+
+    # Stage functions
+
+    def _resolve(self, item):
+        """Turn a URL into a numeric video ID, following short-link redirects"""
+        video_id = self._extract_video_id(item.url)
+        if not (video_id and video_id.isdigit()):
+            # vm./vt./t/ short links only reveal the ID after redirecting
+            response = get_transport().head(item.url, allow_redirects=True, timeout=15)
+            item.url = response.url
+            video_id = self._extract_video_id(item.url)
+        if not video_id:
+            raise Exception("Could not extract video ID from URL")
+        item.video_id = video_id
+        if self.skip_existing:
+            filepath = self.catalog.find(video_id)
+            if filepath:
+                # A set message makes the remaining stages pass the item through
+                item.filepath = filepath
+                item.success = True
+                item.message = "Already downloaded"
+
+    def _extract(self, item):
+        """Fetch metadata for the resolved item"""
+        self._status(item, "Extracting video information...")
+        video_info = self.engine.resolve_video_info(item.video_id, self.quality)
+        if not video_info:
+            raise Exception("Could not retrieve video information")
+        item.video_info = video_info
+
+    def _transfer(self, item):
+        """Download the media for an extracted item"""
+        video_info = item.video_info
+        progress = (lambda percent: self.progress_callback(item, percent)) if self.progress_callback else None
+        status = (lambda text: self.status_callback(item, text)) if self.status_callback else None
+
+        success, message = self.engine.download_info(
+            video_info, self.output_path, self.quality, progress, status,
+            control=self.control, downloader=self.downloader
+        )
+        if not success:
+            raise Exception(message)
+        # The engine picked the file name; its index entry has the path and checksum
+        index = self.engine.layout.index(self.output_path)
+        item.filepath = index.get(video_info.id)
+        item.checksum = index.checksum(video_info.id)
+
+    def _finalize(self, item):
+        """Record a finished item"""
+        item.success = True
+        item.message = "Download completed successfully"
+        if self.archive is not None:
+            self.archive.add(item.video_info)
+        entry = None
+        if self.catalog is not None:
+            entry = catalog_entry(item.video_info, item.filepath, self.engine.name, self.quality,
+                                  item.checksum, item.started, item.timings)
+            self.catalog.add(entry)
+        if self.postprocessor is not None:
+            self._postprocess(item, entry)
+        self._status(item, "Download completed successfully!")
+
+    def _postprocess(self, item, entry=None):
+        """Queue a finished file for post-processing and re-record its checksum afterwards"""
+        layout = self.engine.layout
+        video_id = item.video_info.id
+        filepath = item.filepath or layout.find(self.output_path, video_id)
+        if not filepath:
+            return
+
+        def on_done(path, success, message, checksum):
+            if success and checksum:
+                layout.record(self.output_path, video_id, path, checksum)
+                if entry is not None:
+                    self.catalog.record_file(entry, path, checksum)
+
+        self.postprocessor.submit(filepath, item.video_info, on_done)
+
+    # Helpers
+
+    def _extract_video_id(self, url):
+        if hasattr(self.engine, '_extract_video_id'):
+            return self.engine._extract_video_id(url)
+        return self.validator.extract_video_id(url)
+
+    def _status(self, item, text):
+        if self.status_callback:
+            self.status_callback(item, text)
+
+    # Driving the pipeline
+
+    def run(self, urls):
+        """
+        Feed an iterable of URLs through the pipeline.
+        A generator yielding each PipelineItem as it is finalized (in completion
+        order). URLs are pulled lazily, so bounded queues keep memory flat.
+        """
+        stages = [
+            _Stage(name, getattr(self, f"_{name}"), workers, self.queue_size,
+                   profiled=name in self.PROFILED_STAGES)
+            for name, workers in self.workers.items()
+        ]
+        sink = _ResultSink(self.queue_size)
+        for stage, next_stage in zip(stages, stages[1:] + [sink]):
+            stage.next_stage = next_stage
+        for stage in stages:
+            stage.start()
+
+        first = stages[0]
+
+        def feed():
+            index = 0
+            try:
+                for url in urls:
+                    first.put(PipelineItem(index, url))
+                    index += 1
+            except Exception as e:
+                # A broken URL source (watch folder, job store) ends the run as a failed item
+                item = PipelineItem(index, None)
+                item.message = f"Reading input failed: {e}"
+                first.put(item)
+            finally:
+                first.close()
+
+        feeder = threading.Thread(target=feed, name="ttd-feeder", daemon=True)
+        feeder.start()
+
+        while True:
+            item = sink.queue.get()
+            if item is _DONE:
+                break
+            if self.on_complete:
+                self.on_complete(item)
+            yield item
@@ -0,0 +1,165 @@
+"""
+Post-processing stage for finished downloads
+Remuxes MP4s with the moov box up front (faststart) and embeds title,
+uploader and source URL through ffmpeg. Work runs on a bounded process pool
+with its own queue, so ffmpeg and the re-hash of the output never hold a
+transfer thread or network slot.
+"""
+
+import hashlib
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.integrity import IntegrityError, MP4_EXTENSIONS, verify_mp4
+
+# Seconds before a single ffmpeg run is abandoned
+FFMPEG_TIMEOUT = 600
+
+
+def find_ffmpeg():
+    """Path of the ffmpeg executable, or None if it is not installed"""
+    return shutil.which("ffmpeg")
+
+
+def build_metadata(video_info):
+    """ffmpeg metadata tags for a VideoInfo record"""
+    tags = {
+        'title': video_info.title,
+        'artist': video_info.channel or video_info.uploader,
+        'comment': video_info.webpage_url,
+    }
+    return {key: value for key, value in tags.items() if value}
+
+
+def postprocess_file(filepath, ffmpeg, faststart=True, metadata=None):
+    """
+    Remux one file in place (runs inside a pool worker process).
+    Returns (success, message, sha256 of the new file or None).
+    """
+    if not filepath.lower().endswith(MP4_EXTENSIONS):
+        return True, "Skipped (not an MP4 file)", None
+    if not faststart and not metadata:
+        return True, "Nothing to do", None
+
+    root, ext = os.path.splitext(filepath)
+    tmp_path = f"{root}.post{ext}"
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", filepath, "-map", "0", "-c", "copy"]
+    if faststart:
+        cmd += ["-movflags", "+faststart"]
+    for key, value in (metadata or {}).items():
+        cmd += ["-metadata", f"{key}={value}"]
+    cmd.append(tmp_path)
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=FFMPEG_TIMEOUT)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"ffmpeg exited with {result.returncode}")
+        verify_mp4(tmp_path)
+
+        # The remux changes every byte offset, so the recorded checksum must be redone
+        digest = hashlib.sha256()
+        with open(tmp_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        os.replace(tmp_path, filepath)
+        return True, "Post-processed", digest.hexdigest()
+    except (OSError, RuntimeError, IntegrityError, subprocess.TimeoutExpired) as e:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False, f"Post-processing failed: {e}", None
+
+
+class PostProcessor:
+    """Bounded queue feeding a process pool of post-processing workers"""
+
+    def __init__(self, max_workers=None, queue_size=16, faststart=True, embed_metadata=True,
+                 ffmpeg=None, logger=None):
+        self.ffmpeg = ffmpeg or find_ffmpeg()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.faststart = faststart
+        self.embed_metadata = embed_metadata
+        self.logger = logger
+        # Completed downloads wait here; submit() blocks only when it is full
+        self.queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._slots = threading.Semaphore(self.max_workers)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._executor = None
+        self._dispatcher = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return bool(self.ffmpeg)
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._dispatcher = threading.Thread(target=self._dispatch, name="ttd-postprocess", daemon=True)
+                self._dispatcher.start()
+
+    def submit(self, filepath, video_info=None, on_done=None):
+        """
+        Queue a finished file. on_done(filepath, success, message, checksum) is
+        called from a pool callback thread when the work completes.
+        Returns False if ffmpeg is not available.
+        """
+        if not self.available:
+            return False
+        self._start()
+        metadata = build_metadata(video_info) if video_info is not None and self.embed_metadata else None
+        with self._idle:
+            self._pending += 1
+        self.queue.put((filepath, metadata, on_done))
+        return True
+
+    def _dispatch(self):
+        """Move queued files into the pool, at most one per free worker"""
+        while True:
+            filepath, metadata, on_done = self.queue.get()
+            self._slots.acquire()
+            try:
+                future = self._executor.submit(postprocess_file, filepath, self.ffmpeg, self.faststart, metadata)
+            except RuntimeError as e:
+                # Pool shut down underneath us
+                self._finish(filepath, on_done, (False, f"Post-processing failed: {e}", None))
+                continue
+            future.add_done_callback(lambda f, path=filepath, cb=on_done: self._finish(path, cb, self._result(f)))
+
+    def _result(self, future):
+        try:
+            return future.result()
+        except Exception as e:
+            return False, f"Post-processing failed: {e}", None
+
+    def _finish(self, filepath, on_done, result):
+        success, message, checksum = result
+        self._slots.release()
+        if self.logger:
+            self.logger.log('info' if success else 'warning', f"{message}: {os.path.basename(filepath)}")
+        try:
+            if on_done:
+                on_done(filepath, success, message, checksum)
+        finally:
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until every submitted file has been processed"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self, wait=True):
+        if wait:
+            self.wait()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=not wait)
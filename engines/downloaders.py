@@ -0,0 +1,359 @@
+"""
+Transfer backends
+How a media URL becomes bytes on disk, independent of the engine that found
+it. "python" streams through the shared transport inside the process; the
+others hand the transfer to a downloader binary already on the host:
+- "aria2c" splits one file across several connections, which is faster
+  whenever the CDN caps per-connection throughput.
+- "curl" uses a single connection but spends no Python CPU per chunk.
+"auto" takes aria2c when it is installed and python otherwise.
+
+External transfers write the same .part file as the native one, so pause,
+resume and cancel work the same way: the control token is polled while the
+binary runs, and its progress output is parsed back into the callbacks.
+Request headers (which can carry cookies) are written to the binary's stdin,
+never its command line, where any local user could read them with ps.
+"""
+
+import os
+import queue
+import re
+import shutil
+import signal
+import subprocess
+import threading
+from collections import deque
+
+DOWNLOADERS = ("python", "aria2c", "curl", "auto")
+
+# Connections aria2c opens per file
+ARIA2C_CONNECTIONS = 4
+# Seconds between control checks while an external downloader runs
+POLL_INTERVAL = 0.2
+# Seconds a stopped downloader gets to save its state before it is killed
+STOP_GRACE = 5
+
+
+class DownloaderError(Exception):
+    """An external downloader exited with an error"""
+
+    def __init__(self, message, status_code=None, retryable=False):
+        super().__init__(message)
+        # HTTP status reported by the downloader, if any
+        self.status_code = status_code
+        # True for network errors the next attempt can resume from
+        self.retryable = retryable
+
+
+def rate_share(governor):
+    """
+    Per-transfer byte rate for downloaders outside the governor's token bucket:
+    the shared limit split across the connection slots, or None when unlimited.
+    """
+    if not governor.max_bytes_per_sec:
+        return None
+    return max(1024, int(governor.max_bytes_per_sec / governor.max_connections))
+
+
+class PythonDownloader:
+    """In-process transfers; the engines stream through the shared transport themselves"""
+
+    name = "python"
+    external = False
+
+    def available(self):
+        return True
+
+    def ytdlp_options(self, governor):
+        # yt-dlp's own HTTP downloader, throttled by the governor hook
+        return {}
+
+
+class ExternalDownloader:
+    """Runs a downloader binary into a .part file; subclasses build the command line"""
+
+    name = None
+    binary = None
+    # Exit codes worth another attempt on the same .part file
+    RETRYABLE_CODES = ()
+    PROGRESS_PATTERN = None
+    STATUS_PATTERN = None
+
+    external = True
+
+    def __init__(self):
+        self.path = shutil.which(self.binary)
+
+    def available(self):
+        return self.path is not None
+
+    def command(self, url, part_path, headers, rate_limit):
+        raise NotImplementedError
+
+    def stdin_config(self, url, part_path, headers):
+        """Text fed to the binary's stdin: the headers, plus whatever else the binary reads with them"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _header_lines(headers):
+        # A CR or LF in a value would start a new header (or config line)
+        return ["%s: %s" % (name, re.sub(r"[\r\n]", " ", str(value))) for name, value in headers.items()]
+
+    def ytdlp_options(self, governor):
+        """
+        yt-dlp options handing its downloads to this binary.
+        yt-dlp reports external transfers only when they start and finish, so
+        the governor hook cannot pace them; each gets a fixed rate share instead.
+        """
+        options = {'external_downloader': {'default': self.name}}
+        rate_limit = rate_share(governor)
+        if rate_limit:
+            options['ratelimit'] = rate_limit
+        return options
+
+    def fetch(self, url, part_path, headers=None, progress_callback=None, control=None, rate_limit=None):
+        """
+        Download url into part_path, continuing an existing partial file.
+        progress_callback(percent) receives parsed progress; control is checked
+        every POLL_INTERVAL and stops the process when cancelled or paused.
+        Raises DownloaderError when the binary fails.
+        """
+        command = self.command(url, part_path, headers or {}, rate_limit)
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        try:
+            process.stdin.write(self.stdin_config(url, part_path, headers or {}).encode('utf-8'))
+            process.stdin.close()
+        except OSError:
+            # The binary exited early; its output says why
+            pass
+        lines = queue.Queue()
+        reader = threading.Thread(target=self._read_lines, args=(process.stdout, lines), daemon=True)
+        reader.start()
+        # The last lines carry the error message when the binary fails
+        tail = deque(maxlen=20)
+        try:
+            while True:
+                try:
+                    line = lines.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    line = ""
+                if control:
+                    control.checkpoint()
+                if line is None:
+                    break
+                if not line:
+                    continue
+                tail.append(line)
+                percent = self.parse_progress(line)
+                if percent is not None and progress_callback:
+                    progress_callback(percent)
+        except BaseException:
+            self._stop(process)
+            raise
+        finally:
+            reader.join(1)
+        returncode = process.wait()
+        if returncode != 0:
+            raise self._error(returncode, list(tail))
+
+    def parse_progress(self, line):
+        """Percent complete from one line of output, or None"""
+        match = self.PROGRESS_PATTERN.search(line)
+        return min(100.0, float(match.group(1))) if match else None
+
+    def _read_lines(self, stream, lines):
+        """Split output on \\r as well as \\n; progress bars redraw with \\r"""
+        buffer = b""
+        try:
+            for chunk in iter(lambda: stream.read1(4096), b""):
+                buffer += chunk
+                *complete, buffer = re.split(rb"[\r\n]", buffer)
+                for line in complete:
+                    lines.put(line.decode('utf-8', errors='replace').strip())
+            if buffer:
+                lines.put(buffer.decode('utf-8', errors='replace').strip())
+        finally:
+            stream.close()
+            lines.put(None)
+
+    def _stop(self, process):
+        """Ask the binary to stop (both save their progress on SIGTERM), then kill it"""
+        if process.poll() is not None:
+            return
+        try:
+            process.send_signal(signal.SIGTERM)
+            process.wait(STOP_GRACE)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        except OSError:
+            pass
+
+    def _error(self, returncode, tail):
+        status_code = None
+        for line in reversed(tail):
+            match = self.STATUS_PATTERN.search(line)
+            if match:
+                status_code = int(match.group(1))
+                break
+        message = next((line for line in reversed(tail) if line and self.parse_progress(line) is None),
+                       f"exit code {returncode}")
+        retryable = returncode in self.RETRYABLE_CODES or (status_code is not None and status_code >= 500)
+        if not message.startswith(self.name):
+            message = f"{self.name}: {message}"
+        return DownloaderError(message, status_code, retryable)
+
+
+class Aria2cDownloader(ExternalDownloader):
+    """aria2c with several connections per file"""
+
+    name = "aria2c"
+    binary = "aria2c"
+    # 2 timeout, 6 network problem, 19 name resolution failed
+    RETRYABLE_CODES = (2, 6, 19)
+    # [#2089b0 400KiB/33MiB(1%) CN:4 DL:1.2MiB ETA:25s]
+    PROGRESS_PATTERN = re.compile(r"\((\d+)%\)")
+    STATUS_PATTERN = re.compile(r"status=(\d{3})")
+
+    def __init__(self, connections=ARIA2C_CONNECTIONS):
+        super().__init__()
+        self.connections = connections
+
+    def command(self, url, part_path, headers, rate_limit):
+        command = [
+            self.path,
+            "--continue=true",
+            "--auto-file-renaming=false",
+            f"--max-connection-per-server={self.connections}",
+            f"--split={self.connections}",
+            "--min-split-size=1M",
+            # Preallocating would make a paused .part file look complete
+            "--file-allocation=none",
+            "--max-tries=1",
+            "--summary-interval=1",
+            "--console-log-level=error",
+            "--download-result=hide",
+            "--enable-color=false",
+            # The URL, its headers and the output file come from stdin; see stdin_config
+            "--input-file=-",
+        ]
+        if rate_limit:
+            command.append(f"--max-download-limit={rate_limit}")
+        return command
+
+    def stdin_config(self, url, part_path, headers):
+        # aria2c input file: the URI, then its options on indented lines
+        lines = [
+            re.sub(r"[\r\n]", "", url),
+            f" dir={os.path.dirname(os.path.abspath(part_path))}",
+            f" out={os.path.basename(part_path)}",
+        ]
+        lines += [f" header={line}" for line in self._header_lines(headers)]
+        return "\n".join(lines) + "\n"
+
+    def ytdlp_options(self, governor):
+        options = super().ytdlp_options(governor)
+        options['external_downloader_args'] = {
+            'aria2c': ["-x", str(self.connections), "-s", str(self.connections), "-k", "1M"],
+        }
+        return options
+
+    def fetch(self, url, part_path, headers=None, progress_callback=None, control=None, rate_limit=None):
+        # aria2c records finished segments in a control file beside the download
+        control_file = part_path + ".aria2"
+        if os.path.exists(control_file) and not os.path.exists(part_path):
+            # Left behind by a discarded .part; it would describe the wrong file
+            os.remove(control_file)
+        if control:
+            control.track(control_file)
+        super().fetch(url, part_path, headers, progress_callback, control, rate_limit)
+        # aria2c deletes the control file itself once the download completes
+        if control:
+            control.untrack(control_file)
+
+
+class CurlDownloader(ExternalDownloader):
+    """curl, resuming with -C -"""
+
+    name = "curl"
+    binary = "curl"
+    # 6/7 resolve/connect, 18 partial file, 28 timeout, 35 TLS connect, 52 empty reply, 55/56 send/receive
+    RETRYABLE_CODES = (6, 7, 18, 28, 35, 52, 55, 56)
+    # ###########                      15.6%
+    PROGRESS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)%\s*$")
+    # curl: (22) The requested URL returned error: 403
+    STATUS_PATTERN = re.compile(r"returned error: (\d{3})")
+
+    def command(self, url, part_path, headers, rate_limit):
+        command = [
+            self.path,
+            "--location",
+            "--fail",
+            "--show-error",
+            "--progress-bar",
+            "--connect-timeout", "30",
+            "--continue-at", "-",
+            "--output", part_path,
+            # Headers are read from stdin; see stdin_config
+            "--config", "-",
+        ]
+        if rate_limit:
+            command += ["--limit-rate", str(rate_limit)]
+        command += ["--", url]
+        return command
+
+    def stdin_config(self, url, part_path, headers):
+        # curl config file: one quoted option per line
+        def quote(text):
+            return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        return "".join(f"header = {quote(line)}\n" for line in self._header_lines(headers))
+
+
+_downloaders = {}
+_default_downloader = "python"
+_downloader_lock = threading.Lock()
+_DOWNLOADER_CLASSES = {
+    "python": PythonDownloader,
+    "aria2c": Aria2cDownloader,
+    "curl": CurlDownloader,
+}
+
+
+def _instance(name):
+    with _downloader_lock:
+        if name not in _downloaders:
+            _downloaders[name] = _DOWNLOADER_CLASSES[name]()
+        return _downloaders[name]
+
+
+def resolve_downloader(name):
+    """
+    The downloader that would run for `name`: auto becomes aria2c when it is
+    installed, and a missing binary falls back to python.
+    """
+    if name not in DOWNLOADERS:
+        raise ValueError(f"Unknown downloader: {name}")
+    if name == "auto":
+        name = "aria2c" if _instance("aria2c").available() else "python"
+    return name if _instance(name).available() else "python"
+
+
+def available_downloaders():
+    return [name for name in _DOWNLOADER_CLASSES if _instance(name).available()]
+
+
+def select_downloader(name):
+    """
+    Make `name` the downloader used by jobs that do not pick their own.
+    Returns the downloader actually selected (python if the binary is missing).
+    """
+    global _default_downloader
+    resolve_downloader(name)
+    _default_downloader = name
+    return resolve_downloader(name)
+
+
+def get_downloader(name=None):
+    """Return the downloader for a job (default: the selected one)"""
+    return _instance(resolve_downloader(name or _default_downloader))
@@ -0,0 +1,61 @@
+"""
+On-disk cache of VideoInfo records
+One small JSON file per video ID, so lookups never parse a big index.
+Session credentials (cookies, request headers) are never written; the
+signed media URL is, so entries are readable by the owning user only.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from engines.video_info import VideoInfo
+
+# Fields holding session credentials, which stay in memory only
+PRIVATE_FIELDS = ('cookies', 'http_headers')
+
+
+class InfoCache:
+    """Cache of extracted metadata keyed by video ID"""
+
+    def __init__(self, cache_dir=None, max_age=24 * 3600):
+        self.cache_dir = str(cache_dir or Path.home() / ".ttd" / "cache" / "info")
+        # Seconds before an entry is considered stale (None keeps entries forever)
+        self.max_age = max_age
+
+    def _path(self, video_id):
+        return os.path.join(self.cache_dir, f"{video_id}.json")
+
+    def get(self, video_id, max_age=None):
+        """Return the cached VideoInfo for an ID, or None if missing or stale"""
+        if not video_id:
+            return None
+        path = self._path(video_id)
+        max_age = self.max_age if max_age is None else max_age
+        try:
+            if max_age and time.time() - os.path.getmtime(path) > max_age:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return VideoInfo.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def put(self, video_info):
+        """Store a record; failures are ignored since the cache is only an optimization"""
+        if not video_info or not video_info.id:
+            return
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            path = self._path(video_info.id)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            data = video_info.to_dict()
+            for name in PRIVATE_FIELDS:
+                data.pop(name, None)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
@@ -0,0 +1,229 @@
+"""
+Compressed page fetching
+Negotiates gzip (and brotli when a brotli module is installed), decompresses
+the body incrementally, and stops reading once the embedded state JSON has
+been received. What is left of a stopped body is drained when it is small,
+so the keep-alive connection goes back to the pool instead of being dropped.
+Wire and decoded byte counts are kept per request for the diagnostics window.
+"""
+
+import threading
+import time
+import zlib
+from collections import deque
+
+from engines.transport import get_transport
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+ACCEPT_ENCODING = "br, gzip, deflate" if brotli else "gzip, deflate"
+
+# Raw bytes read from the socket per step
+CHUNK_SIZE = 16 * 1024
+# Most wire bytes read after an early stop to keep the connection reusable;
+# past this, dropping the connection is cheaper than reading on
+DRAIN_LIMIT = 64 * 1024
+
+
+class _Identity:
+    """Pass-through 'decompressor' for uncompressed bodies"""
+    def process(self, data):
+        return data
+
+
+class _Zlib:
+    def __init__(self, encoding):
+        # gzip carries a header; deflate is normally zlib-wrapped, occasionally raw
+        self._wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+        self._obj = zlib.decompressobj(self._wbits)
+        self._first = True
+
+    def process(self, data):
+        try:
+            return self._obj.decompress(data)
+        except zlib.error:
+            if not (self._first and self._wbits == zlib.MAX_WBITS):
+                raise
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._obj.decompress(data)
+        finally:
+            self._first = False
+
+
+class _Brotli:
+    def __init__(self):
+        self._obj = brotli.Decompressor()
+
+    def process(self, data):
+        # brotli exposes process(); brotlicffi exposes decompress()
+        if hasattr(self._obj, 'process'):
+            return self._obj.process(data)
+        return self._obj.decompress(data)
+
+
+def _decoder(encoding):
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return _Zlib("gzip")
+    if encoding == "deflate":
+        return _Zlib("deflate")
+    if encoding == "br" and brotli:
+        return _Brotli()
+    if encoding in ("", "identity"):
+        return _Identity()
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+class PageFetchStats:
+    """Running totals and a short history of page fetches"""
+
+    def __init__(self, history=100):
+        self.requests = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.early_stops = 0
+        self.recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def record(self, entry):
+        with self._lock:
+            self.requests += 1
+            self.wire_bytes += entry['wire_bytes']
+            self.decoded_bytes += entry['decoded_bytes']
+            self.early_stops += 1 if entry['early_stop'] else 0
+            self.recent.append(entry)
+
+    def summary(self):
+        with self._lock:
+            saved = 1 - self.wire_bytes / self.decoded_bytes if self.decoded_bytes else 0.0
+            return {
+                'requests': self.requests,
+                'wire_bytes': self.wire_bytes,
+                'decoded_bytes': self.decoded_bytes,
+                'early_stops': self.early_stops,
+                'saved_ratio': saved,
+            }
+
+    def recent_entries(self):
+        with self._lock:
+            return list(self.recent)
+
+    def reset(self):
+        with self._lock:
+            self.requests = self.wire_bytes = self.decoded_bytes = self.early_stops = 0
+            self.recent.clear()
+
+
+_stats = PageFetchStats()
+
+
+def get_page_stats():
+    """Process-wide page fetch statistics"""
+    return _stats
+
+
+class _MarkerScanner:
+    """
+    Watches a growing buffer for any (start, end) marker pair, end after start.
+    Each call only searches the bytes added since the last one (plus a marker's
+    length of overlap), so scanning a whole page stays linear in its size.
+    """
+
+    def __init__(self, markers):
+        self.markers = list(markers)
+        # Per pair: where the end search begins once the start is found (None until then),
+        # and how far the buffer has already been searched
+        self._end_from = [None] * len(self.markers)
+        self._scanned = [0] * len(self.markers)
+
+    def complete(self, buffer):
+        for i, (start, end) in enumerate(self.markers):
+            if self._end_from[i] is None:
+                pos = buffer.find(start, max(0, self._scanned[i] - len(start) + 1))
+                if pos == -1:
+                    self._scanned[i] = len(buffer)
+                    continue
+                self._end_from[i] = self._scanned[i] = pos + len(start)
+            if buffer.find(end, max(self._end_from[i], self._scanned[i] - len(end) + 1)) != -1:
+                return True
+            self._scanned[i] = len(buffer)
+        return False
+
+
+def _drain(response, limit=DRAIN_LIMIT):
+    """
+    Read what is left of an abandoned body so its connection can be reused.
+    Returns the wire bytes read; when more than `limit` are left the response
+    is closed instead, which drops the connection.
+    """
+    raw = response.raw
+    if getattr(raw, 'multiplexed', False):
+        # Abandoning an HTTP/2 body only resets its stream
+        return 0
+    remaining = getattr(raw, 'length_remaining', None)
+    if remaining is not None and remaining > limit:
+        response.close()
+        return 0
+    drained = 0
+    for chunk in raw.stream(CHUNK_SIZE, decode_content=False):
+        drained += len(chunk)
+        if drained > limit:
+            response.close()
+            break
+    return drained
+
+
+def fetch_page(url, headers=None, timeout=15, stop_markers=None, transport=None):
+    """
+    GET a page and return its decoded text.
+    stop_markers is a sequence of (start, end) byte strings; reading stops as
+    soon as an end marker has arrived after its start marker, so the rest of
+    the page is never transferred. Raises requests exceptions like requests.get.
+    Goes through the shared transport unless another one is given.
+    """
+    headers = dict(headers or {})
+    headers['Accept-Encoding'] = ACCEPT_ENCODING
+    started = time.perf_counter()
+    scanner = _MarkerScanner(stop_markers) if stop_markers else None
+
+    transport = transport or get_transport()
+    with transport.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        content_encoding = response.headers.get('Content-Encoding', '')
+        decoder = _decoder(content_encoding)
+        wire_bytes = 0
+        drained_bytes = 0
+        decoded = bytearray()
+        early_stop = False
+
+        # decode_content=False hands back the bytes exactly as they came off the wire
+        for chunk in response.raw.stream(CHUNK_SIZE, decode_content=False):
+            wire_bytes += len(chunk)
+            decoded += decoder.process(chunk)
+            if scanner and scanner.complete(decoded):
+                early_stop = True
+                break
+
+        if early_stop:
+            drained_bytes = _drain(response)
+
+        text = bytes(decoded).decode(response.encoding or 'utf-8', errors='replace')
+
+    _stats.record({
+        'url': url,
+        'encoding': content_encoding or 'identity',
+        'wire_bytes': wire_bytes,
+        'decoded_bytes': len(decoded),
+        # Read after the early stop only to keep the connection
+        'drained_bytes': drained_bytes,
+        'early_stop': early_stop,
+        'elapsed': time.perf_counter() - started,
+        'time': time.time(),
+    })
+    return text
@@ -0,0 +1,208 @@
+"""
+Incremental profile sync
+Mirrors the videos of @username profiles, downloading only items newer than
+the stored per-profile watermark that are not already in the download archive.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from engines.yt_dlp_engine import YtDlpEngine
+from utils.archive import DownloadArchive
+from utils.catalog import catalog_entry
+from utils.control import TransferInterrupted
+from utils.validator import URLValidator
+
+# One lock per state file, shared by every ProfileSync in the process (the job
+# manager creates one per profile job), so their read-modify-writes do not interleave
+_state_locks = {}
+_state_locks_guard = threading.Lock()
+
+
+def _state_lock(path):
+    path = os.path.abspath(path)
+    with _state_locks_guard:
+        if path not in _state_locks:
+            _state_locks[path] = threading.Lock()
+        return _state_locks[path]
+
+
+class ProfileSync:
+    """Incremental downloader for TikTok profiles"""
+
+    # Profiles can pin up to three older videos above new ones, so only stop
+    # listing after a longer run of already-synced items
+    STOP_AFTER_KNOWN = 5
+
+    def __init__(self, engine, archive=None, state_file=None, lister=None, logger=None, catalog=None):
+        # Engine used for the actual downloads (either yt-dlp or tiktok-api)
+        self.engine = engine
+        self.archive = archive if archive is not None else DownloadArchive()
+        self.state_file = str(state_file or Path.home() / ".ttd" / "profiles.json")
+        # Profile listing always goes through yt-dlp, which knows TikTok's paging API
+        self.lister = lister or (engine if isinstance(engine, YtDlpEngine) else YtDlpEngine())
+        self.logger = logger
+        # Optional DownloadCatalog that gets an entry per downloaded video
+        self.catalog = catalog
+        self.validator = URLValidator()
+        self._lock = _state_lock(self.state_file)
+
+    def load_state(self):
+        """Load per-profile watermarks"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self._log('warning', f"Could not load profile state: {e}")
+            return {}
+
+    def save_state(self, state):
+        """Persist per-profile watermarks"""
+        directory = os.path.dirname(os.path.abspath(self.state_file))
+        os.makedirs(directory, exist_ok=True)
+        # A unique temp file, so writers in other processes never rename each other's
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".profiles-", suffix=".tmp")
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def get_watermark(self, username):
+        """Newest video ID already synced for a profile (0 if never synced)"""
+        profile = self.load_state().get(username.lower()) or {}
+        return int(profile.get('watermark') or 0)
+
+    def iter_new_videos(self, profile_url, watermark=0, archived=None):
+        """
+        Yield (video_id, url) for videos that still need downloading.
+        Video IDs are time-ordered, so listing stops after a run of items at or
+        below the watermark instead of walking the whole profile. IDs above the
+        watermark that are already archived are appended to `archived`.
+        """
+        known_streak = 0
+        for video_id, url in self.lister.iter_profile_entries(profile_url):
+            if int(video_id) <= watermark:
+                known_streak += 1
+                if known_streak >= self.STOP_AFTER_KNOWN:
+                    return
+                continue
+
+            known_streak = 0
+            if video_id in self.archive:
+                if archived is not None:
+                    archived.append(int(video_id))
+                continue
+            yield video_id, url
+
+    def sync(self, profile_url, output_path, quality="best", progress_callback=None, status_callback=None, control=None, downloader=None):
+        """
+        Download every new video of a profile.
+        Returns a summary dict with downloaded/failed counts. A cancelled or paused
+        control raises out; the archive and watermark make the next sync pick up
+        where this one stopped.
+        """
+        username = self.validator.extract_username(profile_url)
+        if not username:
+            return {'username': None, 'downloaded': 0, 'failed': 0, 'error': "Not a TikTok profile URL"}
+
+        profile_url = self.validator.normalize_profile_url(profile_url)
+        watermark = self.get_watermark(username)
+        downloaded, failed, archived = [], [], []
+
+        if status_callback:
+            status_callback(f"Listing @{username}...")
+
+        def on_error(url, error):
+            video_id = self.validator.extract_video_id(url)
+            if video_id and video_id.isdigit():
+                failed.append(int(video_id))
+            self._log('error', f"@{username}: could not extract {url}: {error}")
+
+        try:
+            # Stream compact records: listing, extraction and download advance
+            # one item at a time, so memory stays flat for any profile size
+            new_videos = self.iter_new_videos(profile_url, watermark, archived)
+            for video_info in self.engine.iter_video_info((url for _, url in new_videos), quality, on_error=on_error):
+                video_id = video_info.id
+                if control:
+                    control.checkpoint()
+                if status_callback:
+                    status_callback(f"@{username}: downloading {video_id}")
+                started = time.time()
+                success, message = self.engine.download_info(
+                    video_info, output_path, quality, progress_callback, status_callback, control=control,
+                    downloader=downloader
+                )
+
+                if success:
+                    self.archive.add(video_info)
+                    if self.catalog is not None:
+                        self._catalog(video_info, output_path, quality, started)
+                    downloaded.append(int(video_id))
+                    self._log('info', f"@{username}: downloaded {video_id}")
+                else:
+                    failed.append(int(video_id))
+                    self._log('error', f"@{username}: {video_id} failed: {message}")
+        except TransferInterrupted:
+            raise
+        except Exception as e:
+            # Older unlisted items may still be missing, so the watermark stays put;
+            # what was downloaded is already in the archive
+            self._log('error', f"@{username}: listing failed: {e}")
+            return {'username': username, 'downloaded': len(downloaded), 'failed': len(failed), 'error': str(e)}
+
+        self._advance_watermark(username, watermark, downloaded + archived, failed)
+
+        summary = {'username': username, 'downloaded': len(downloaded), 'failed': len(failed), 'error': None}
+        if status_callback:
+            status_callback(f"@{username}: {len(downloaded)} new, {len(failed)} failed")
+        return summary
+
+    def _advance_watermark(self, username, watermark, completed, failed):
+        """
+        Move the watermark forward without skipping failures: it never passes
+        the oldest failed item, so that item is retried on the next sync while
+        newer successes are skipped through the archive.
+        """
+        if not completed:
+            return
+        newest = max(completed)
+        if failed:
+            newest = min(newest, min(failed) - 1)
+        if newest <= watermark:
+            return
+
+        with self._lock:
+            state = self.load_state()
+            state[username.lower()] = {
+                'watermark': str(newest),
+                'last_sync': datetime.now().isoformat(timespec='seconds'),
+            }
+            try:
+                self.save_state(state)
+            except OSError as e:
+                # The downloads succeeded; the next sync just lists a little further
+                self._log('warning', f"Could not save profile state: {e}")
+
+    def _catalog(self, video_info, output_path, quality, started):
+        """Catalog a finished video, taking its path and checksum from the output index"""
+        index = self.engine.layout.index(output_path)
+        self.catalog.add(catalog_entry(video_info, index.get(video_info.id), self.engine.name, quality,
+                                       index.checksum(video_info.id), started))
+
+    def _log(self, level, message):
+        if self.logger:
+            self.logger.log(level, message)
@@ -0,0 +1,90 @@
+"""
+Quality tiers shared by both engines
+A tier caps resolution, or asks for the smallest stream above a floor, so
+archival-lite jobs can transfer a fraction of the bytes of 'best'.
+Resolution means the shorter side, as most TikTok videos are portrait
+(a '720p' video is 720x1280).
+"""
+
+import re
+
+QUALITY_TIERS = ("best", "1080p", "720p", "540p", "360p", "lite", "smallest")
+
+QUALITY_DESCRIPTIONS = {
+    "best": "Highest available quality",
+    "1080p": "Best quality up to 1080p",
+    "720p": "Best quality up to 720p",
+    "540p": "Best quality up to 540p",
+    "360p": "Best quality up to 360p",
+    "lite": "Smallest file that is still at least 540p",
+    "smallest": "Smallest file available",
+}
+
+# Minimum resolution (shorter side) for the 'lite' tier
+LITE_MIN_RES = 540
+
+
+def parse_quality(quality):
+    """
+    Turn a tier name into (max_res, min_res, prefer_smallest).
+    Any '<N>p' caps the resolution at N; unknown values mean 'best'.
+    """
+    quality = (quality or "best").strip().lower()
+    if quality == "smallest":
+        return None, None, True
+    if quality == "lite":
+        return None, LITE_MIN_RES, True
+    match = re.fullmatch(r'(\d+)p', quality)
+    if match:
+        return int(match.group(1)), None, False
+    return None, None, False
+
+
+def ytdlp_format(quality):
+    """yt-dlp (format, format_sort) for a tier; format_sort is None when the default order fits"""
+    max_res, min_res, smallest = parse_quality(quality)
+    if smallest:
+        # Rank by size/bitrate ascending so 'best' picks the smallest match
+        if min_res:
+            floor = f"[height>={min_res}][width>={min_res}]"
+            # 'worst' under this order is the largest stream, for videos that never reach the floor
+            return f"best{floor}[ext=mp4]/best{floor}/worst", ["+size", "+br", "+res"]
+        return "best[ext=mp4]/best", ["+size", "+br", "+res"]
+    if max_res:
+        # res:N prefers the largest stream not above N (by shorter side), else the smallest one
+        return "best[ext=mp4]/best", [f"res:{max_res}"]
+    return "best[ext=mp4]/best", None
+
+
+def _variant_size(variant):
+    return variant.get('size') or variant.get('bitrate') or 0
+
+
+def _variant_res(variant):
+    """Shorter side of a stream, or whichever dimension is known"""
+    sides = [side for side in (variant.get('width'), variant.get('height')) if side]
+    return min(sides) if sides else 0
+
+
+def _variant_rank(variant):
+    return (_variant_res(variant), variant.get('bitrate') or 0)
+
+
+def select_variant(variants, quality):
+    """Pick the stream dict (url, height, bitrate, size, ...) matching a tier, or None"""
+    variants = [v for v in variants or [] if v.get('url')]
+    if not variants:
+        return None
+    max_res, min_res, smallest = parse_quality(quality)
+
+    if smallest:
+        eligible = [v for v in variants if _variant_res(v) >= (min_res or 0)]
+        if eligible:
+            return min(eligible, key=lambda v: (_variant_size(v), _variant_rank(v)))
+        return max(variants, key=_variant_rank)
+    if max_res:
+        eligible = [v for v in variants if _variant_res(v) <= max_res]
+        if eligible:
+            return max(eligible, key=_variant_rank)
+        return min(variants, key=lambda v: (_variant_rank(v), _variant_size(v)))
+    return max(variants, key=_variant_rank)
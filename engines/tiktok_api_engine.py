@@ -11,10 +11,37 @@ import json
 from html import unescape
 from urllib.parse import unquote
 
+from engines.downloaders import DownloaderError, get_downloader, rate_share
+from engines.page_fetch import fetch_page
+from engines.quality import select_variant
+from engines.transport import get_transport
+from engines.url_cache import SignedUrlCache, SignedUrlExpired, is_expired
+from engines.video_info import VideoInfo
+from utils.governor import get_governor
+from utils.control import TransferCancelled, TransferInterrupted, TransferPaused
+from utils.fileio import MediaWriter, publish_file
+from utils.integrity import IntegrityError, MP4_EXTENSIONS, StreamingDigest, verify_download, verify_mp4
+from utils.layout import OutputLayout
+
 class TikTokApiEngine:
     DEFAULT_FILENAME_TEMPLATE = '【%(channel)s | tt@%(uploader)s】%(title)s'
+    BASE_URL = "https://www.tiktok.com"
+    # Attempts per file when a transfer is cut off or fails verification
+    MAX_ATTEMPTS = 3
+    # Bytes per read/write while streaming media; fewer, larger writes keep disk I/O sequential
+    CHUNK_SIZE = 64 * 1024
+    # (connect, read) seconds for media requests. A stalled CDN connection raises a
+    # Timeout, which frees the governor slot and is retried from the .part file.
+    TRANSFER_TIMEOUT = (15, 30)
+    # (start, end) pairs after which a page's state JSON is complete; see _get_video_info
+    PAGE_STATE_MARKERS = (
+        (b'<script id="__NEXT_DATA__"', b'</script>'),
+        (b'"ItemModule"', b'"UserModule"'),
+        (b'"ItemModule"', b'"VideoModule"'),
+        (b'window.__INIT_PROPS__', b'</script>'),
+    )
 
-    def __init__(self):
+    def __init__(self, governor=None, layout=None):
         self.name = "tiktok-api"
         self.description = "Direct API access for faster downloads"
         self.advantages = [
@@ -24,9 +51,22 @@ class TikTokApiEngine:
             "Lightweight"
         ]
         self.recommended = False
+        # Page host used when only a video ID is known (benchmarks point this at a mock server)
+        self.base_url = self.BASE_URL
+        # Shared bandwidth/connection limits
+        self.governor = governor or get_governor()
+        # Subfolder scheme and ID -> path index for the output folder
+        self.layout = layout or OutputLayout()
+        # Extracted records reused until their signed media URLs near expiry
+        self.url_cache = SignedUrlCache()
+        # Pooled connections with DNS and TLS session caching, shared by every engine
+        self.transport = get_transport()
         
-    def download(self, url, output_path, quality="best", progress_callback=None, status_callback=None):
-        """Download TikTok content using direct API"""
+    def download(self, url, output_path, quality="best", progress_callback=None, status_callback=None, custom_filename=None, control=None, downloader=None, info_callback=None):
+        """
+        Download TikTok content using direct API.
+        info_callback, if given, receives the resolved VideoInfo before the download starts.
+        """
         try:
             if status_callback:
                 status_callback("Extracting video information...")
@@ -36,38 +76,110 @@ class TikTokApiEngine:
             if not video_id:
                 return False, "Could not extract video ID from URL"
             
-            # Get video info
-            video_info = self._get_video_info(video_id)
+            # Get video info (a retry within the URL's lifetime skips the page fetch)
+            video_info = self.resolve_video_info(video_id)
             if not video_info:
                 return False, "Could not retrieve video information"
+            if info_callback:
+                info_callback(video_info)
             
-            # Get download URL
-            download_url = self._get_download_url(video_info, quality)
-            if not download_url:
-                return False, "Could not get download URL"
-            
+            return self.download_info(video_info, output_path, quality, progress_callback, status_callback, custom_filename, control, downloader)
+                
+        except TransferInterrupted:
+            raise
+        except Exception as e:
+            error_msg = f"Download failed: {str(e)}"
+            if status_callback:
+                status_callback(error_msg)
+            return False, error_msg
+    
+    def iter_video_info(self, urls, quality="best", on_error=None):
+        """
+        Extract VideoInfo records for an iterable of URLs, one at a time.
+        Failures are reported to on_error(url, exc) and skipped.
+        """
+        for url in urls:
+            video_id = self._extract_video_id(url)
+            video_info = self.resolve_video_info(video_id) if video_id else None
+            if video_info is None:
+                if on_error:
+                    on_error(url, Exception("Could not retrieve video information"))
+                continue
+            yield video_info
+    
+    def get_video_info(self, url, quality="best"):
+        """Extract a single VideoInfo record, or None on failure"""
+        return next(self.iter_video_info([url], quality), None)
+    
+    def download_info(self, video_info, output_path, quality="best", progress_callback=None, status_callback=None, custom_filename=None, control=None, downloader=None):
+        """
+        Download a previously extracted VideoInfo record.
+        control is an optional TransferControl; cancelling or pausing it raises
+        TransferCancelled/TransferPaused out of this call. downloader names the
+        transfer backend (see engines.downloaders; default: the selected one).
+        """
+        try:
             # Download the file
-            filename = self._generate_filename(video_info)
-            filepath = os.path.join(output_path, filename)
+            filename = self._generate_filename(video_info, custom_filename)
+            filepath = os.path.join(self.layout.directory_for(output_path, video_info), filename)
             
             if status_callback:
-                status_callback(f"Downloading: {video_info.get('title', 'Unknown')}")
+                status_callback(f"Downloading: {video_info.title or 'Unknown'}")
             
-            success = self._download_file(download_url, filepath, progress_callback, status_callback)
+            digest = self._download_media(video_info, filepath, quality, progress_callback, status_callback, control, downloader)
             
-            if success:
+            if digest:
+                self.layout.record(output_path, video_info.id, filepath, digest.hexdigest())
                 if status_callback:
                     status_callback("Download completed successfully!")
-                return True, "Download completed successfully"
+                return True, f"Download completed successfully: {filename}"
             else:
                 return False, "Download failed"
                 
+        except TransferInterrupted:
+            raise
         except Exception as e:
             error_msg = f"Download failed: {str(e)}"
             if status_callback:
                 status_callback(error_msg)
             return False, error_msg
     
+    def resolve_video_info(self, video_id, quality="best", refresh=False):
+        """
+        VideoInfo for an ID, reusing a cached record while its signed URLs are still valid.
+        quality is accepted for parity with YtDlpEngine; the record carries every tier.
+        """
+        if not refresh:
+            video_info = self.url_cache.get(video_id)
+            if video_info is not None:
+                return video_info
+        video_info = self._get_video_info(video_id)
+        if video_info is not None:
+            self.url_cache.put(video_id, video_info)
+        return video_info
+    
+    def _download_media(self, video_info, filepath, quality="best", progress_callback=None, status_callback=None, control=None, downloader=None):
+        """
+        Download the stream for a quality tier into filepath.
+        Re-extracts once if the signed URL has expired or the CDN refuses it.
+        Returns the StreamingDigest, or None on failure.
+        """
+        for attempt in range(2):
+            if attempt or is_expired(self._get_download_url(video_info, quality), self.url_cache.safety_margin):
+                if status_callback:
+                    status_callback("Media link expired, refreshing...")
+                video_info = self.resolve_video_info(video_info.id, refresh=True)
+                if video_info is None:
+                    return None
+            download_url = self._get_download_url(video_info, quality)
+            if not download_url:
+                return None
+            try:
+                return self._download_file(download_url, filepath, progress_callback, status_callback, video_info.http_headers, control, downloader)
+            except SignedUrlExpired:
+                self.url_cache.invalidate(video_info.id)
+        return None
+    
     def _extract_video_id(self, url):
         """Extract TikTok video ID from URL"""
         patterns = [
@@ -99,19 +211,14 @@ class TikTokApiEngine:
         """
         Try to fetch real video metadata from TikTok page.
         Accepts a video_id (digits) or a full tiktok url.
-        Returns a dict like:
-        {
-            'id': '7557...',
-            'title': 'The one and only...',
-            'uploader': 'beefy_dan',
-            'channel': 'BeefyDan',
-            'download_urls': {'best': 'https://...mp4'}
-        }
+        Returns a VideoInfo like:
+        VideoInfo(id='7557...', title='The one and only...', uploader='beefy_dan',
+                  channel='BeefyDan', url='https://...mp4')
         Or returns None on failure.
         """
         # normalize: if passed only id, build a url guess (this may not always be correct)
         if re.fullmatch(r"\d+", str(video_id_or_url)):
-            url = f"https://www.tiktok.com/@/video/{video_id_or_url}"
+            url = f"{self.base_url}/@/video/{video_id_or_url}"
         else:
             url = video_id_or_url
 
@@ -123,9 +230,9 @@ class TikTokApiEngine:
         }
 
         try:
-            resp = requests.get(url, headers=headers, timeout=15)
-            resp.raise_for_status()
-            html = resp.text
+            # Only the embedded state JSON is parsed, so the page can be cut off after it
+            html = fetch_page(url, headers=headers, timeout=15, stop_markers=self.PAGE_STATE_MARKERS,
+                              transport=self.transport)
         except Exception as e:
             # could not fetch page
             return None
@@ -154,12 +261,12 @@ class TikTokApiEngine:
             # ItemModule often appears as "ItemModule":{...}
             m2 = re.search(r'"ItemModule":\s*({.+?})\s*,\s*"UserModule"', html, re.S)
             if m2:
-                sigi = safe_json_load("{" + m2.group(1) + "}")
+                sigi = safe_json_load(m2.group(1))
             else:
                 # try a looser match: "ItemModule":{...}}
                 m3 = re.search(r'"ItemModule":\s*({.+?})\s*}\s*,\s*"VideoModule"', html, re.S)
                 if m3:
-                    sigi = safe_json_load("{" + m3.group(1) + "}")
+                    sigi = safe_json_load(m3.group(1))
 
         # Strategy C: legacy window['SIGI_STATE'] or window['__INIT_PROPS__'] patterns
         if not next_data and not sigi:
@@ -252,6 +359,9 @@ class TikTokApiEngine:
                         # try unquote if escaped
                         chosen = unquote(chosen) if isinstance(chosen, str) else chosen
                         info['download_urls'] = {'best': chosen}
+                    info['variants'] = self._extract_variants(video_obj)
+                    info['thumbnail'] = self._extract_cover(video_obj)
+                    info['duration'] = self._extract_duration(video_obj)
 
             except Exception:
                 pass
@@ -283,6 +393,9 @@ class TikTokApiEngine:
                         if dl:
                             dl = unquote(dl)
                             info['download_urls'] = {'best': dl}
+                        info['variants'] = self._extract_variants(vobj)
+                        info['thumbnail'] = self._extract_cover(vobj)
+                        info['duration'] = self._extract_duration(vobj)
                         break
             except Exception:
                 pass
@@ -321,57 +434,191 @@ class TikTokApiEngine:
             # no usable video url found
             return None
 
-        return info
+        return VideoInfo(
+            id=info.get('id'),
+            title=info.get('title'),
+            uploader=info.get('uploader'),
+            channel=info.get('channel'),
+            url=info['download_urls']['best'],
+            http_headers=headers,
+            webpage_url=url,
+            variants=info.get('variants') or [],
+            thumbnail=info.get('thumbnail'),
+            duration=info.get('duration'),
+        )
     
-    def _get_download_url(self, video_info, quality):
-        """Get highest quality download URL available"""
-        download_urls = video_info.get('download_urls', {})
-        
-        # Always return the best available quality
-        if 'best' in download_urls:
-            return download_urls['best']
-        else:
+    def _extract_cover(self, video_obj):
+        """Cover image URL of a video object, or None"""
+        if not isinstance(video_obj, dict):
+            return None
+        cover = video_obj.get('cover') or video_obj.get('originCover') or video_obj.get('dynamicCover')
+        return unquote(cover) if isinstance(cover, str) and cover else None
+    
+    def _extract_duration(self, video_obj):
+        """Length in seconds of a video object, or None"""
+        if not isinstance(video_obj, dict):
+            return None
+        try:
+            duration = float(video_obj.get('duration'))
+        except (TypeError, ValueError):
             return None
+        return duration if duration > 0 else None
+    
+    def _extract_variants(self, video_obj):
+        """
+        Collect the alternative streams listed in a video object's bitrateInfo.
+        Each entry carries a PlayAddr with its own UrlList, size and dimensions.
+        """
+        variants = []
+        if not isinstance(video_obj, dict):
+            return variants
+        for entry in video_obj.get('bitrateInfo') or []:
+            if not isinstance(entry, dict):
+                continue
+            play_addr = entry.get('PlayAddr') or {}
+            urls = play_addr.get('UrlList') or []
+            if not urls:
+                continue
+            variants.append({
+                'url': unquote(urls[0]),
+                'width': play_addr.get('Width'),
+                'height': play_addr.get('Height'),
+                'bitrate': entry.get('Bitrate'),
+                'size': play_addr.get('DataSize'),
+                'codec': entry.get('CodecType'),
+            })
+        return variants
+    
+    def _get_download_url(self, video_info, quality):
+        """Get the download URL of the stream matching the quality tier"""
+        variant = select_variant(video_info.variants, quality)
+        # Pages without bitrateInfo only offer the default stream
+        return variant['url'] if variant else video_info.url
     
-    def _generate_filename(self, video_info):
+    def _generate_filename(self, video_info, custom_filename=None):
         """
         Generate filename in format:【 channel | tt@uploader】title.mp4
         """
 
-        channel = video_info.get('channel', None)
-        uploader = video_info.get('uploader', None)
-        title = video_info.get('title', 'TikTok_Video')
+        if custom_filename and custom_filename.strip():
+            return re.sub(r'[\\/*?:"<>\x00-\x1f\x7f]', "", custom_filename.strip()) + ".mp4"
 
-        if not channel:
-            channel = uploader or "UnknownUser"
-        if not uploader:
-            uploader = "unknown_id"
-
-        # Clean illegal filename characters
+        # Clean illegal filename characters; descriptions can contain newlines and tabs
         def safe(text):
-            return re.sub(r'[<>:"/\\|?*]', '_', text)
-
-        channel_safe = safe(channel)
-        uploader_safe = safe(uploader)
-        title_safe = safe(title)
+            return re.sub(r'[<>:"/\\|?*\x00-\x1f\x7f]', '_', text)
 
-        filename = f"【{channel_safe} | tt@{uploader_safe}】{title_safe}.mp4"
-        return filename
+        return video_info.format_name(self.DEFAULT_FILENAME_TEMPLATE, sanitize=safe) + ".mp4"
     
-    def _download_file(self, url, filepath, progress_callback=None, status_callback=None):
-        """Download file with progress tracking"""
-        try:
-            response = requests.get(url, stream=True)
+    def _download_file(self, url, filepath, progress_callback=None, status_callback=None, headers=None, control=None, downloader=None):
+        """
+        Download and verify a file with progress tracking; returns its StreamingDigest or None.
+        Raises SignedUrlExpired when the CDN answers 403/410, and TransferCancelled or
+        TransferPaused when control asks for it (a paused transfer keeps its .part file).
+        """
+        downloader = get_downloader(downloader)
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            try:
+                with self.governor.connection():
+                    if downloader.external:
+                        return self._transfer_external(downloader, url, filepath, progress_callback, status_callback, headers, control)
+                    return self._transfer(url, filepath, progress_callback, status_callback, headers, control)
+            except TransferPaused:
+                raise
+            except TransferCancelled:
+                self._discard(filepath)
+                raise
+            except IntegrityError as e:
+                self._discard(filepath)
+                if attempt == self.MAX_ATTEMPTS:
+                    break
+                if status_callback:
+                    status_callback(f"{e} - retrying ({attempt + 1}/{self.MAX_ATTEMPTS})...")
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                # The .part file stays, so the next attempt resumes where this one stopped
+                if attempt == self.MAX_ATTEMPTS:
+                    self._discard(filepath)
+                    break
+                if status_callback:
+                    status_callback(f"{e} - retrying ({attempt + 1}/{self.MAX_ATTEMPTS})...")
+            except requests.HTTPError as e:
+                self._discard(filepath)
+                if e.response is not None and e.response.status_code in (403, 410):
+                    raise SignedUrlExpired(str(e))
+                break
+            except DownloaderError as e:
+                if e.retryable and attempt < self.MAX_ATTEMPTS:
+                    if status_callback:
+                        status_callback(f"{e} - retrying ({attempt + 1}/{self.MAX_ATTEMPTS})...")
+                    continue
+                self._discard(filepath)
+                if e.status_code in (403, 410):
+                    raise SignedUrlExpired(str(e))
+                break
+            except Exception:
+                self._discard(filepath)
+                break
+        return None
+    
+    def _discard(self, filepath):
+        """Remove a corrupt file and its partial download"""
+        for path in (filepath, self._part_path(filepath)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _part_path(self, filepath):
+        return filepath + ".part"
+
+    def _transfer(self, url, filepath, progress_callback=None, status_callback=None, headers=None, control=None):
+        """
+        Stream url into filepath.part while holding a governor connection slot, then
+        rename it into place. An existing .part file is resumed with a Range request.
+        Hashes each chunk as it is written and verifies the result; raises IntegrityError.
+        The MediaWriter reserves the file's blocks up front and applies the fsync policy.
+        """
+        part_path = self._part_path(filepath)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request_headers = dict(headers or {})
+        if offset:
+            request_headers['Range'] = f"bytes={offset}-"
+        if control:
+            control.track(part_path)
+        
+        with self.transport.get(url, headers=request_headers, timeout=self.TRANSFER_TIMEOUT, stream=True) as response:
+            if offset and response.status_code == 416:
+                raise IntegrityError("Partial download does not match the remote file")
             response.raise_for_status()
             
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
+            # Servers without Range support answer 200 with the whole file
+            resumed = bool(offset) and response.status_code == 206
+            if not resumed:
+                offset = 0
+            length = int(response.headers.get('content-length', 0))
+            total_size = offset + length if length else 0
+            # Content-Length counts encoded bytes, so it only bounds identity-encoded bodies
+            expected_size = total_size if not response.headers.get('content-encoding') else None
+            downloaded = offset
+            digest = StreamingDigest()
+            if resumed:
+                # The checksum covers the whole file, including the bytes kept from before
+                with open(part_path, 'rb') as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(block)
+                if status_callback:
+                    status_callback(f"Resuming at {offset / (1024 * 1024):.1f} MB...")
             
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
+            with MediaWriter(part_path, resume=resumed, total_size=expected_size) as writer:
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    # Checked before writing, so a paused file never ends with a half-handled chunk
+                    if control:
+                        control.checkpoint()
                     if chunk:
-                        f.write(chunk)
+                        writer.write(chunk)
+                        digest.update(chunk)
                         downloaded += len(chunk)
+                        self.governor.throttle(len(chunk))
                         
                         if progress_callback and total_size > 0:
                             percent = (downloaded / total_size) * 100
@@ -380,11 +627,53 @@ class TikTokApiEngine:
                         if status_callback and total_size > 0:
                             percent = (downloaded / total_size) * 100
                             status_callback(f"Downloading... {percent:.1f}%")
-            
-            return True
-            
-        except Exception:
-            return False
+        
+        if status_callback:
+            status_callback("Verifying download...")
+        verify_download(part_path, expected_size, digest)
+        if filepath.lower().endswith(MP4_EXTENSIONS):
+            verify_mp4(part_path)
+        writer.publish(filepath)
+        if control:
+            control.untrack(part_path)
+        return digest
+    
+    def _transfer_external(self, downloader, url, filepath, progress_callback=None, status_callback=None, headers=None, control=None):
+        """
+        Like _transfer, but an external downloader binary writes the .part file.
+        It runs outside the governor's token bucket, so it gets a fixed share of
+        the bandwidth limit; the file is hashed once it is complete.
+        """
+        part_path = self._part_path(filepath)
+        if control:
+            control.track(part_path)
+        if status_callback:
+            if os.path.exists(part_path):
+                status_callback(f"Resuming at {os.path.getsize(part_path) / (1024 * 1024):.1f} MB with {downloader.name}...")
+            else:
+                status_callback(f"Downloading with {downloader.name}...")
+        
+        def on_progress(percent):
+            if progress_callback:
+                progress_callback(percent)
+            if status_callback:
+                status_callback(f"Downloading... {percent:.1f}%")
+        
+        downloader.fetch(url, part_path, headers, on_progress, control, rate_share(self.governor))
+        
+        if status_callback:
+            status_callback("Verifying download...")
+        digest = StreamingDigest()
+        with open(part_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        verify_download(part_path, None, digest)
+        if filepath.lower().endswith(MP4_EXTENSIONS):
+            verify_mp4(part_path)
+        publish_file(part_path, filepath)
+        if control:
+            control.untrack(part_path)
+        return digest
     
     def validate_url(self, url):
         """Validate if URL is supported"""
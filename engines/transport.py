@@ -0,0 +1,431 @@
+"""
+Shared HTTP transport
+One pooled client for every engine request, plus two caches that cut
+per-connection setup against the handful of TikTok and CDN hosts:
+- DNS: getaddrinfo results are cached in-process for DNS_TTL seconds. The
+  cache wraps socket.getaddrinfo, so yt-dlp's own connections use it too.
+- TLS: client sessions are kept per host and offered on the next handshake
+  through SSLContext.wrap_socket(session=...), so new connections resume
+  instead of running a full handshake.
+Both caches are bounded LRUs, so a long-running daemon does not grow them
+with every host it has ever contacted.
+
+Two transports share that interface: "http1" (requests, a keep-alive pool
+per host) and "http2" (httpx with h2, many requests multiplexed over one
+connection per host). The HTTP/2 one needs the optional httpx and h2
+packages and answers with requests-style responses and exceptions, so the
+engines do not care which one they were given.
+"""
+
+import socket
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import certifi
+except ImportError:
+    certifi = None
+
+try:
+    import httpx
+    import h2  # noqa: F401 - httpx only speaks HTTP/2 when h2 is installed
+except ImportError:
+    httpx = None
+
+TRANSPORTS = ("http1", "http2")
+
+# Seconds a resolved address is reused. The stdlib resolver does not expose
+# record TTLs, so a short fixed lifetime bounds how stale an answer can get.
+DNS_TTL = 60
+# Most resolved (host, port, ...) lookups kept
+MAX_DNS_ENTRIES = 256
+# Most hosts with a cached TLS session, per SSL context
+MAX_TLS_HOSTS = 256
+# Pooled connections kept per host
+POOL_SIZE = 32
+
+
+class DnsCache:
+    """TTL-bounded LRU cache in front of socket.getaddrinfo"""
+
+    def __init__(self, ttl=DNS_TTL, max_entries=MAX_DNS_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._resolve = None
+
+    def install(self):
+        """Route socket.getaddrinfo through the cache (process-wide, once)"""
+        with self._lock:
+            if self._resolve is not None:
+                return
+            self._resolve = socket.getaddrinfo
+            socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self):
+        with self._lock:
+            if self._resolve is not None:
+                socket.getaddrinfo = self._resolve
+                self._resolve = None
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return list(entry[1])
+                del self._entries[key]
+            resolve = self._resolve or socket.getaddrinfo
+        # Failures are not cached; the next call simply asks the resolver again
+        result = resolve(host, port, family, type, proto, flags)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (now + self.ttl, tuple(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self, host=None):
+        """Forget one host (e.g. after a connection error) or everything"""
+        with self._lock:
+            if host is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == host]:
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class TlsSessionCache:
+    """
+    Most recent TLS session per host, for resumption (LRU-bounded).
+    A session only resumes through the context that created it, so every
+    ResumingSSLContext owns one of these.
+    """
+
+    def __init__(self, max_hosts=MAX_TLS_HOSTS):
+        self.max_hosts = max_hosts
+        self.full = 0
+        self.resumed = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is not None:
+                self._sessions.move_to_end(host)
+            return session
+
+    def put(self, host, session):
+        if session is not None and host:
+            with self._lock:
+                self._sessions[host] = session
+                self._sessions.move_to_end(host)
+                while len(self._sessions) > self.max_hosts:
+                    self._sessions.popitem(last=False)
+
+    def record_handshake(self, resumed):
+        with self._lock:
+            if resumed:
+                self.resumed += 1
+            else:
+                self.full += 1
+
+    def stats(self):
+        with self._lock:
+            return {'hosts': len(self._sessions), 'full': self.full, 'resumed': self.resumed}
+
+
+class _SessionSavingSSLSocket(ssl.SSLSocket):
+    """SSLSocket that hands its session back to the context's cache when closed"""
+
+    def close(self):
+        # TLS 1.3 tickets arrive after the handshake, so the session is saved again here
+        if not self.server_side:
+            try:
+                self.context.sessions.put(self.server_hostname, self.session)
+            except (AttributeError, ValueError, OSError):
+                pass
+        super().close()
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """Client SSLContext whose wrap_socket offers each host's last session"""
+
+    sslsocket_class = _SessionSavingSSLSocket
+
+    def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        self.sessions = TlsSessionCache()
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True,
+                    suppress_ragged_eofs=True, server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.sessions.get(server_hostname)
+        wrapped = super().wrap_socket(
+            sock, server_side=server_side, do_handshake_on_connect=do_handshake_on_connect,
+            suppress_ragged_eofs=suppress_ragged_eofs, server_hostname=server_hostname, session=session,
+        )
+        if not server_side and wrapped.session is not None:
+            # The handshake has run when the socket was already connected
+            self.sessions.record_handshake(wrapped.session_reused)
+            self.sessions.put(server_hostname, wrapped.session)
+        return wrapped
+
+
+def create_ssl_context():
+    """A client context set up like urllib3's default, with session resumption"""
+    # PROTOCOL_TLS_CLIENT already verifies certificates and host names and refuses SSLv2/3
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.options |= ssl.OP_NO_COMPRESSION
+    if getattr(context, 'post_handshake_auth', None) is not None:
+        context.post_handshake_auth = True
+    context.load_default_certs()
+    if certifi is not None:
+        context.load_verify_locations(certifi.where())
+    return context
+
+
+class _TransportAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools share one resuming SSL context"""
+
+    def __init__(self, ssl_context, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        super().init_poolmanager(*args, **kwargs)
+
+
+_dns_cache = DnsCache()
+
+
+class Transport:
+    """HTTP/1.1 keep-alive pools used by the engines, backed by the DNS and TLS caches"""
+
+    name = "http1"
+
+    def __init__(self, pool_size=POOL_SIZE):
+        self.dns = _dns_cache
+        self.dns.install()
+        self.ssl_context = create_ssl_context()
+        self.tls = self.ssl_context.sessions
+        self.session = requests.Session()
+        adapter = _TransportAdapter(self.ssl_context, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+
+    def request(self, method, url, **kwargs):
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.ConnectionError:
+            # The cached address may be the reason; resolve afresh next time
+            self.dns.invalidate(requests.utils.urlparse(url).hostname)
+            raise
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def stats(self):
+        return {'name': self.name, 'dns': self.dns.stats(), 'tls': self.tls.stats()}
+
+    def close(self):
+        self.session.close()
+
+
+class _Http2Raw:
+    """Stands in for urllib3's response.raw, for callers that read undecoded bytes"""
+
+    # Streams share the connection, so closing one mid-body costs nothing
+    multiplexed = True
+
+    def __init__(self, response):
+        self._response = response
+
+    def stream(self, amt=65536, decode_content=True):
+        chunks = self._response.iter_bytes(amt) if decode_content else self._response.iter_raw(amt)
+        with _body_errors():
+            yield from chunks
+
+
+class Http2Response:
+    """requests-style view of a streamed httpx response (the parts the engines use)"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.http_version = response.http_version
+        self.raw = _Http2Raw(response)
+
+    @property
+    def encoding(self):
+        return self._response.charset_encoding
+
+    @property
+    def content(self):
+        with _body_errors():
+            return self._response.read()
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def iter_content(self, chunk_size=1):
+        with _body_errors():
+            yield from self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+@contextmanager
+def _request_errors():
+    """Re-raise httpx errors as the requests exceptions the engines handle"""
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests.Timeout(str(e))
+    except (httpx.NetworkError, httpx.RemoteProtocolError) as e:
+        raise requests.ConnectionError(str(e))
+    except httpx.TooManyRedirects as e:
+        raise requests.TooManyRedirects(str(e))
+    except httpx.HTTPError as e:
+        raise requests.RequestException(str(e))
+
+
+@contextmanager
+def _body_errors():
+    """Like _request_errors, but a body cut off mid-stream is a ChunkedEncodingError"""
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests.Timeout(str(e))
+    except (httpx.NetworkError, httpx.RemoteProtocolError) as e:
+        raise requests.exceptions.ChunkedEncodingError(str(e))
+    except httpx.HTTPError as e:
+        raise requests.RequestException(str(e))
+
+
+class Http2Transport:
+    """
+    httpx client multiplexing requests over one HTTP/2 connection per host.
+    HTTPS hosts negotiate h2 through ALPN and fall back to HTTP/1.1;
+    prior_knowledge=True speaks cleartext HTTP/2 to http:// URLs (mock servers).
+    """
+
+    name = "http2"
+
+    def __init__(self, pool_size=POOL_SIZE, prior_knowledge=False):
+        if httpx is None:
+            raise RuntimeError("The HTTP/2 transport needs httpx and h2 (pip install 'httpx[http2]')")
+        self.dns = _dns_cache
+        self.dns.install()
+        # httpx sets ALPN on the context it is given, so it gets its own
+        self.ssl_context = create_ssl_context()
+        self.tls = self.ssl_context.sessions
+        self.client = httpx.Client(
+            http1=not prior_knowledge,
+            http2=True,
+            verify=self.ssl_context,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            # requests has no default timeout either; callers pass their own
+            timeout=httpx.Timeout(None),
+        )
+
+    def request(self, method, url, headers=None, timeout=None, stream=False, allow_redirects=True):
+        kwargs = {'headers': headers}
+        if isinstance(timeout, tuple):
+            # requests-style (connect, read)
+            connect, read = timeout
+            kwargs['timeout'] = httpx.Timeout(read, connect=connect)
+        elif timeout is not None:
+            kwargs['timeout'] = timeout
+        request = self.client.build_request(method, url, **kwargs)
+        try:
+            with _request_errors():
+                response = self.client.send(request, stream=True, follow_redirects=allow_redirects)
+        except requests.ConnectionError:
+            self.dns.invalidate(request.url.host)
+            raise
+        if not stream:
+            with _body_errors():
+                response.read()
+        return Http2Response(response)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def stats(self):
+        return {'name': self.name, 'dns': self.dns.stats(), 'tls': self.tls.stats()}
+
+    def close(self):
+        self.client.close()
+
+
+def http2_available():
+    return httpx is not None
+
+
+_transports = {}
+_default_transport = "http1"
+_transport_lock = threading.Lock()
+
+
+def select_transport(name):
+    """
+    Make `name` ("http1" or "http2") the default for engines created from now
+    on. Returns the transport actually selected: http1 if HTTP/2 is unavailable.
+    """
+    global _default_transport
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown transport: {name}")
+    if name == "http2" and not http2_available():
+        name = "http1"
+    _default_transport = name
+    return name
+
+
+def get_transport(name=None):
+    """Return the process-wide transport of a kind (default: the selected one)"""
+    name = name or _default_transport
+    with _transport_lock:
+        if name not in _transports:
+            _transports[name] = Http2Transport() if name == "http2" else Transport()
+        return _transports[name]
@@ -0,0 +1,99 @@
+"""
+Cache of resolved (signed) media URLs
+TikTok CDN URLs carry their expiry in the query string, so an extracted
+VideoInfo can be reused for retries and resumes until shortly before the
+earliest of its URLs expires, instead of scraping the page again.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+# Query parameters holding an absolute expiry (unix seconds), lower-cased
+EXPIRY_PARAMS = ("x-expires", "expires", "expire", "x-expire", "deadline")
+
+
+class SignedUrlExpired(Exception):
+    """The CDN rejected a signed URL (403/410) or it has expired"""
+
+
+def parse_expiry(url):
+    """Absolute expiry time (unix seconds) encoded in a URL's query, or None"""
+    if not url:
+        return None
+    try:
+        query = parse_qs(urlparse(url).query)
+    except ValueError:
+        return None
+    params = {key.lower(): values for key, values in query.items()}
+    for name in EXPIRY_PARAMS:
+        for value in params.get(name, ()):
+            if value.isdigit():
+                expiry = int(value)
+                # Some hosts sign in milliseconds
+                return expiry // 1000 if expiry > 10 ** 11 else expiry
+    return None
+
+
+def is_expired(url, margin=0):
+    """True if a URL's signed expiry falls within margin seconds from now"""
+    expiry = parse_expiry(url)
+    return expiry is not None and expiry - margin <= time.time()
+
+
+class SignedUrlCache:
+    """In-memory LRU of VideoInfo records, valid until their URLs near expiry"""
+
+    def __init__(self, safety_margin=60, default_ttl=600, max_entries=1024):
+        # Entries are dropped this many seconds before the URL's own expiry
+        self.safety_margin = safety_margin
+        # Lifetime for URLs that carry no expiry parameter
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _valid_until(self, video_info):
+        urls = [video_info.url] + [v.get('url') for v in video_info.variants]
+        expiries = [e for e in (parse_expiry(u) for u in urls if u) if e is not None]
+        if expiries:
+            return min(expiries) - self.safety_margin
+        return time.time() + self.default_ttl
+
+    def get(self, key):
+        """Cached VideoInfo for key, or None if missing or about to expire"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            video_info, valid_until = entry
+            if valid_until <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return video_info
+
+    def put(self, key, video_info):
+        if not video_info or not video_info.url:
+            return
+        valid_until = self._valid_until(video_info)
+        if valid_until <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (video_info, valid_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,94 @@
+"""
+Compact video metadata records
+Every engine produces VideoInfo; the info cache, download archive and UI
+consume it. yt-dlp info dicts carry full format lists, thumbnails and
+headers, so batch workflows keep only these records and memory stays flat
+however many items flow through.
+"""
+
+from dataclasses import dataclass, field, fields
+
+
+@dataclass(slots=True)
+class VideoInfo:
+    """Slotted record holding only what a download needs"""
+    id: str
+    title: str | None = None
+    uploader: str | None = None
+    channel: str | None = None
+    # Media URL of the chosen format
+    url: str | None = None
+    ext: str = 'mp4'
+    http_headers: dict = field(default_factory=dict)
+    cookies: str | None = None
+    webpage_url: str | None = None
+    # Cover image URL for previews
+    thumbnail: str | None = None
+    # Alternative streams (url, width, height, bitrate, size, codec) for quality tiers
+    variants: list = field(default_factory=list)
+    # Seconds, when the page or extractor reports it
+    duration: float | None = None
+
+    @classmethod
+    def from_ytdlp(cls, info):
+        """Build a record from a processed yt-dlp info dict (format already selected)"""
+        return cls(
+            id=str(info.get('id')),
+            title=info.get('title'),
+            uploader=info.get('uploader'),
+            channel=info.get('channel'),
+            # Absent when the selection needs a video+audio merge
+            url=info.get('url'),
+            ext=info.get('ext') or 'mp4',
+            http_headers=dict(info.get('http_headers') or {}),
+            cookies=info.get('cookies'),
+            webpage_url=info.get('webpage_url') or info.get('original_url'),
+            thumbnail=info.get('thumbnail'),
+            duration=info.get('duration'),
+        )
+
+    def to_ytdlp_info(self):
+        """Minimal info dict that yt-dlp can download without re-extracting"""
+        info = {
+            'id': self.id,
+            'title': self.title,
+            'uploader': self.uploader,
+            'channel': self.channel,
+            'url': self.url,
+            'ext': self.ext,
+            'http_headers': dict(self.http_headers),
+            'webpage_url': self.webpage_url,
+            'duration': self.duration,
+            'extractor': 'TikTok',
+            'extractor_key': 'TikTok',
+        }
+        if self.cookies:
+            info['cookies'] = self.cookies
+        return info
+
+    def to_dict(self):
+        """Flat dict for the on-disk cache (no deep copy, unlike dataclasses.asdict)"""
+        return {name: getattr(self, name) for name in FIELD_NAMES}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict; unknown keys from other versions are ignored"""
+        return cls(**{name: data[name] for name in FIELD_NAMES if name in data})
+
+    def format_name(self, template, sanitize=None):
+        """
+        Fill a %(channel)s / %(uploader)s / %(title)s / %(id)s template.
+        sanitize, if given, is applied to each value (e.g. to strip illegal filename characters).
+        """
+        values = {
+            'channel': self.channel or self.uploader or 'UnknownChannel',
+            'uploader': self.uploader or 'UnknownUploader',
+            'title': self.title or 'UnknownTitle',
+            'id': self.id or 'unknown',
+        }
+        if sanitize:
+            values = {key: sanitize(value) for key, value in values.items()}
+        return template % values
+
+
+FIELD_NAMES = tuple(f.name for f in fields(VideoInfo))
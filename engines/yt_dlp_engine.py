@@ -9,10 +9,25 @@ import os
 from pathlib import Path
 import threading
 
+from engines.downloaders import get_downloader
+from engines.quality import ytdlp_format
+from engines.transport import get_transport
+from engines.url_cache import SignedUrlCache, is_expired
+from engines.video_info import VideoInfo
+from utils.control import TransferInterrupted
+from utils.fileio import sync_file
+from utils.governor import get_governor
+from utils.integrity import GrowingFileHasher, IntegrityError, verify_download
+from utils.layout import OutputLayout
+
 class YtDlpEngine:
     DEFAULT_FILENAME_TEMPLATE = '【%(channel)s | tt@%(uploader)s】%(title)s'
+    # Attempts per video when the finished file fails verification
+    MAX_ATTEMPTS = 3
+    # Canonical page URL for a bare video ID
+    VIDEO_URL = "https://www.tiktok.com/@_/video/{video_id}"
 
-    def __init__(self):
+    def __init__(self, governor=None, layout=None):
         self.name = "yt-dlp"
         self.description = "Advanced downloader with best compatibility"
         self.advantages = [
@@ -22,9 +37,96 @@ class YtDlpEngine:
             "Supports watermark removal"
         ]
         self.recommended = True
+        # Shared bandwidth/connection limits
+        self.governor = governor or get_governor()
+        # Subfolder scheme and ID -> path index for the output folder
+        self.layout = layout or OutputLayout()
+        # Extracted records reused until their signed media URLs near expiry
+        self.url_cache = SignedUrlCache()
+        # yt-dlp opens its own connections; the shared transport's DNS cache still covers them
+        self.transport = get_transport()
         
-    def download(self, url, output_path, quality="best", progress_callback=None, status_callback=None, custom_filename=None):
-        """Download TikTok content using yt-dlp"""
+    def download(self, url, output_path, quality="best", progress_callback=None, status_callback=None, custom_filename=None, control=None, downloader=None, info_callback=None):
+        """
+        Download TikTok content using yt-dlp.
+        info_callback, if given, receives the extracted VideoInfo before the download starts.
+        """
+        try:
+            if status_callback:
+                status_callback("Extracting video information...")
+            
+            # Extract once; the compact record is all the download step needs
+            errors = []
+            video_info = next(self.iter_video_info([url], quality, on_error=lambda u, e: errors.append(e)), None)
+            if video_info is None:
+                raise errors[0] if errors else Exception("Could not retrieve video information")
+            if info_callback:
+                info_callback(video_info)
+            
+            return self.download_info(video_info, output_path, quality, progress_callback, status_callback, custom_filename, control, downloader)
+                
+        except TransferInterrupted:
+            raise
+        except Exception as e:
+            error_msg = f"Download failed: {str(e)}"
+            if status_callback:
+                status_callback(error_msg)
+            return False, error_msg
+    
+    def iter_video_info(self, urls, quality="best", on_error=None):
+        """
+        Extract compact VideoInfo records for an iterable of URLs.
+        Works as a generator: one URL is extracted at a time and its full info
+        dict is dropped before the record is yielded, so memory stays flat for
+        arbitrarily long inputs. Failures are reported to on_error(url, exc).
+        """
+        ydl_opts = {
+            'format': self._get_format_selector(quality),
+            'noplaylist': True,
+            'quiet': True,
+            'no_warnings': True,
+        }
+        format_sort = self._get_format_sort(quality)
+        if format_sort:
+            ydl_opts['format_sort'] = format_sort
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            for url in urls:
+                # A video fetched moments ago (e.g. for the name preview) is not extracted again
+                key = self._cache_key(url, quality)
+                video_info = self.url_cache.get(key) if key else None
+                if video_info is not None:
+                    yield video_info
+                    continue
+                try:
+                    info = ydl.extract_info(url, download=False)
+                    video_info = VideoInfo.from_ytdlp(info)
+                except Exception as e:
+                    if on_error:
+                        on_error(url, e)
+                    continue
+                del info
+                self.url_cache.put(key or (video_info.id, quality), video_info)
+                yield video_info
+    
+    def get_video_info(self, url, quality="best"):
+        """Extract a single VideoInfo record, or None on failure"""
+        return next(self.iter_video_info([url], quality), None)
+    
+    def resolve_video_info(self, video_id, quality="best", refresh=False):
+        """VideoInfo for an ID, reusing a cached record while its signed URLs are still valid"""
+        if refresh:
+            self.url_cache.invalidate((video_id, quality))
+        # yt-dlp's TikTok extractor accepts a placeholder uploader in the video URL
+        return self.get_video_info(self.VIDEO_URL.format(video_id=video_id), quality)
+    
+    def download_info(self, video_info, output_path, quality="best", progress_callback=None, status_callback=None, custom_filename=None, control=None, downloader=None):
+        """
+        Download a previously extracted VideoInfo record.
+        control is an optional TransferControl; cancelling or pausing it raises
+        TransferCancelled/TransferPaused out of this call, leaving yt-dlp's .part file.
+        downloader names the transfer backend; external ones are handed to yt-dlp's
+        external_downloader and only report progress when they start and finish.
+        """
         try:
             # Configure quality format
             format_selector = self._get_format_selector(quality)
@@ -32,7 +134,7 @@ class YtDlpEngine:
             # Customize filename template
             if custom_filename and custom_filename.strip():
                 safe_filename = custom_filename.strip()
-                safe_filename = re.sub(r'[\\/*?:"<>]', "", safe_filename)
+                safe_filename = re.sub(r'[\\/*?:"<>\x00-\x1f\x7f]', "", safe_filename)
                 filename = safe_filename
             else:
                 filename = self.DEFAULT_FILENAME_TEMPLATE
@@ -40,55 +142,198 @@ class YtDlpEngine:
             # Setup yt-dlp options
             ydl_opts = {
                 'format': format_selector,
-                'outtmpl': os.path.join(output_path, f'{filename}.%(ext)s'),
+                'outtmpl': os.path.join(self.layout.directory_for(output_path, video_info), f'{filename}.%(ext)s'),
                 'noplaylist': True,
                 'extractaudio': False,
                 'writesubtitles': False,
                 'writeautomaticsub': False,
                 'ignoreerrors': False,
             }
+            format_sort = self._get_format_sort(quality)
+            if format_sort:
+                ydl_opts['format_sort'] = format_sort
+            ydl_opts.update(self.governor.ytdlp_options())
+            ydl_opts.update(get_downloader(downloader).ytdlp_options(self.governor))
+            display_name = custom_filename if custom_filename and custom_filename.strip() else video_info.format_name(self.DEFAULT_FILENAME_TEMPLATE)
             
-            # Add progress hook if provided
-            if progress_callback:
-                ydl_opts['progress_hooks'] = [self._progress_hook(progress_callback, status_callback)]
-            
-            # Download the content
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                if status_callback:
-                    status_callback("Extracting video information...")
+            for attempt in range(1, self.MAX_ATTEMPTS + 1):
+                integrity = {}
+                # The governor hook charges every block against the shared bandwidth budget;
+                # the integrity hook hashes the file as it grows
+                ydl_opts['progress_hooks'] = [self._governor_hook(), self._integrity_hook(integrity)]
+                if control:
+                    # First, so an interrupted block is neither charged nor hashed
+                    ydl_opts['progress_hooks'].insert(0, self._control_hook(control))
                 
-                # Extract info first to validate
-                info = ydl.extract_info(url, download=False)
-
-                display_name = custom_filename if custom_filename and custom_filename.strip() else self.DEFAULT_FILENAME_TEMPLATE % {
-                    'channel': info.get('channel', 'UnknownChannel'),
-                    'uploader': info.get('uploader', 'UnknownUploader'),
-                    'title': info.get('title', 'UnknownTitle')
-                }
-
-                if status_callback:
-                    status_callback(f"Downloading: {display_name}")
-                
-                # Perform actual download
-                ydl.download([url])
+                # Add progress hook if provided
+                if progress_callback:
+                    ydl_opts['progress_hooks'].append(self._progress_hook(progress_callback, status_callback))
                 
-                final_filename = ydl.prepare_filename(info)
-                if status_callback:
-                    status_callback("Download completed successfully!")
+                # Download the content
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    if status_callback:
+                        status_callback(f"Downloading: {display_name}")
+                    
+                    # Perform actual download
+                    with self.governor.connection():
+                        info = None
+                        if video_info.url and not is_expired(video_info.url, self.url_cache.safety_margin):
+                            # Reuse the extracted format instead of scraping the page again
+                            try:
+                                info = ydl.process_ie_result(video_info.to_ytdlp_info(), download=True)
+                            except yt_dlp.utils.DownloadError as e:
+                                if not self._is_forbidden(e):
+                                    raise
+                                # The CDN refused the signed URL; fall through to a fresh extraction
+                                self.url_cache.invalidate((video_info.id, quality))
+                        if info is None:
+                            # Merged formats have no single URL, and expired ones need re-signing
+                            info = ydl.extract_info(video_info.webpage_url, download=True)
+                    
+                    requested = info.get('requested_downloads') or [{}]
+                    final_filename = requested[-1].get('filepath') or ydl.prepare_filename(info)
                 
-                return True, f"Download completed successfully: {os.path.basename(final_filename)}"
+                try:
+                    if status_callback:
+                        status_callback("Verifying download...")
+                    digest = self._verify(final_filename, integrity)
+                    # yt-dlp already renamed its .part file; only the fsync policy is left to apply
+                    sync_file(final_filename)
+                    break
+                except IntegrityError as e:
+                    self._discard(final_filename)
+                    if attempt == self.MAX_ATTEMPTS:
+                        raise
+                    if status_callback:
+                        status_callback(f"{e} - retrying ({attempt + 1}/{self.MAX_ATTEMPTS})...")
+            
+            self.layout.record(output_path, video_info.id, final_filename, digest.hexdigest() if digest else None)
+            if status_callback:
+                status_callback("Download completed successfully!")
+            
+            return True, f"Download completed successfully: {os.path.basename(final_filename)}"
                 
+        except TransferInterrupted:
+            raise
         except Exception as e:
             error_msg = f"Download failed: {str(e)}"
             if status_callback:
                 status_callback(error_msg)
             return False, error_msg
     
+    def iter_profile_entries(self, profile_url):
+        """
+        Lazily enumerate the videos of a TikTok profile, newest first.
+        Yields (video_id, url) pairs; pages are only fetched as the caller advances.
+        """
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'lazy_playlist': True,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # process=False keeps 'entries' as the extractor's generator
+            playlist = ydl.extract_info(profile_url, download=False, process=False)
+            for entry in playlist.get('entries') or []:
+                if not entry or not entry.get('id'):
+                    continue
+                yield str(entry['id']), entry.get('url') or entry.get('webpage_url')
+    
+    def _cache_key(self, url, quality):
+        """URL cache key for a video URL, or None if the URL does not name a video ID"""
+        match = re.search(r'/video/(\d+)', url or "")
+        return (match.group(1), quality) if match else None
+    
+    def _is_forbidden(self, error):
+        """True if a yt-dlp download error was the CDN rejecting the URL"""
+        message = str(error)
+        return "HTTP Error 403" in message or "HTTP Error 410" in message
+    
     def _get_format_selector(self, quality):
-        """Get format selector for highest quality download"""
-        # Always return the best available quality format
-        # Prioritize mp4 format for compatibility, fallback to any best quality
-        return "best[ext=mp4]/best"
+        """Get format selector for a quality tier (mp4 preferred for compatibility)"""
+        return ytdlp_format(quality)[0]
+    
+    def _get_format_sort(self, quality):
+        """Get format sort order for a quality tier, or None for yt-dlp's default"""
+        return ytdlp_format(quality)[1]
+    
+    def _governor_hook(self):
+        """Create a progress hook that throttles yt-dlp through the shared governor"""
+        last = {'bytes': 0, 'file': None}
+
+        def hook(d):
+            if d['status'] != 'downloading':
+                return
+            # Byte counters restart for every file/fragment set yt-dlp downloads
+            filename = d.get('filename')
+            if filename != last['file']:
+                last['file'] = filename
+                last['bytes'] = 0
+            downloaded = d.get('downloaded_bytes') or 0
+            delta = downloaded - last['bytes']
+            last['bytes'] = downloaded
+            if delta > 0:
+                self.governor.throttle(delta)
+
+        return hook
+
+    def _control_hook(self, control):
+        """
+        Create a progress hook that aborts the transfer when the job is cancelled or paused.
+        yt-dlp lets hook exceptions propagate and keeps the .part file, which it resumes
+        with a Range request on the next attempt.
+        """
+        def hook(d):
+            if d['status'] != 'downloading':
+                return
+            if d.get('tmpfilename'):
+                control.track(os.path.abspath(d['tmpfilename']))
+            control.checkpoint()
+
+        return hook
+
+    def _integrity_hook(self, state):
+        """
+        Create a progress hook that hashes each file while yt-dlp writes it.
+        Only newly appended bytes are read on every call, so no second full read is needed.
+        """
+        def hook(d):
+            if d['status'] not in ('downloading', 'finished'):
+                return
+            filename = os.path.abspath(d['filename'])
+            # 'downloading' reports the .part file; 'finished' comes after the rename
+            path = d.get('tmpfilename') if d['status'] == 'downloading' else None
+            try:
+                if state.get('hasher') is None or state.get('file') != filename:
+                    state['hasher'] = GrowingFileHasher(path or filename)
+                    state['file'] = filename
+                state['hasher'].catch_up(path or filename)
+                if d.get('total_bytes'):
+                    state['total'] = d['total_bytes']
+            except OSError:
+                # Start over from byte 0 on the next call
+                state['hasher'] = None
+        
+        return hook
+    
+    def _verify(self, filepath, integrity):
+        """Check a finished file; returns its StreamingDigest when it is the file that was hashed"""
+        hasher = integrity.get('hasher')
+        if hasher and integrity.get('file') == os.path.abspath(filepath):
+            digest = hasher.catch_up(filepath)
+            verify_download(filepath, integrity.get('total'), digest)
+            return digest
+        # Merged or post-processed output differs from the streams that were hashed
+        verify_download(filepath)
+        return None
+    
+    def _discard(self, filepath):
+        """Remove a corrupt file so the next attempt downloads it again"""
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
     
     def _progress_hook(self, progress_callback, status_callback):
         """Create progress hook for yt-dlp"""
@@ -11,6 +11,8 @@ from tkinter import ttk, filedialog, messagebox
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import threading
+import itertools
+import multiprocessing
 import os
 import sys
 import json
@@ -18,16 +20,21 @@ from pathlib import Path
 import webbrowser
 from datetime import datetime
 
-# Import downloader engines
-import yt_dlp
-from engines.yt_dlp_engine import YtDlpEngine
-from engines.tiktok_api_engine import TikTokApiEngine
-from ui.components import ModernButton, InfoTooltip, ProgressBar
+# Import the download core (engines, caches, workers)
+from core.api import DownloadCore
+from utils.thumbnails import ThumbnailCache
+from ui.components import ModernButton, InfoTooltip, ProgressBar, JobListModel, JobListView
 from ui.styles import ModernStyle
 from utils.validator import URLValidator
 from ui.styles import ModernStyle
 from utils.validator import URLValidator
 from utils.logger import Logger
+from utils.profiler import get_profiler
+from engines.quality import QUALITY_TIERS, QUALITY_DESCRIPTIONS
+from engines.page_fetch import get_page_stats
+from engines.downloaders import get_downloader
+from engines.transport import get_transport
+from core.client import DaemonClient, DaemonError
 try:
     from version import __version__
 except ImportError:
@@ -110,9 +117,14 @@ class HikariTikTokDownloader:
         self.output_dir = tk.StringVar(value=last_output_dir)
         self.engine_var = tk.StringVar(value=settings.get("engine", "yt-dlp"))
         self.video_name_var = tk.StringVar(value="")
-        self.quality_var = tk.StringVar(value="best")
+        self.quality_var = tk.StringVar(value=settings.get("quality", "best"))
         self.progress_var = tk.DoubleVar()
         self.status_var = tk.StringVar(value="Ready")
+        # Every download gets a row here; workers update it, the job list repaints on a timer
+        self.job_model = JobListModel()
+        self._job_ids = itertools.count(1)
+        # GUI job id -> (DownloadCore or DaemonClient, job id there), for pause/resume/cancel
+        self._job_backends = {}
         
         self.last_clipboard_content = ""
         self.clipboard_monitor_enabled = True
@@ -125,11 +137,42 @@ class HikariTikTokDownloader:
         self.validator = URLValidator()
         
     def setup_engines(self):
-        """Initialize download engines"""
-        self.engines = {
-            "yt-dlp": YtDlpEngine(),
-            "tiktok-api": TikTokApiEngine()
-        }
+        """Initialize the download core and the UI-only caches"""
+        settings = self.load_settings()
+        # Engines, caches, post-processing and workers live in the Tk-free core;
+        # bandwidth limits, layout and post-processing come from the same settings
+        self.max_jobs = max(1, int(settings.get("max_jobs", 2)))
+        # "http1" or "http2"; kept as requested even if HTTP/2 is not installed yet
+        self.transport_setting = settings.get("transport", "http1")
+        # "python", "aria2c", "curl" or "auto"; a binary missing from PATH falls back to python
+        self.downloader_setting = settings.get("downloader", "python")
+        # "none", "at-end" or "periodic"; see utils.fileio
+        self.fsync_setting = settings.get("fsync_policy", "none")
+        # Kept as requested even if ffmpeg is missing, so installing it later just works
+        self.postprocess_setting = bool(settings.get("postprocess", False))
+        self.core = DownloadCore.from_settings(
+            settings,
+            output_path=self.output_dir.get(),
+            max_workers=self.max_jobs,
+            logger=self.logger
+        )
+        self.governor = self.core.governor
+        self.layout = self.core.layout
+        self.engines = self.core.engines
+        self.info_cache = self.core.info_cache
+        self.postprocessor = self.core.postprocessor
+        self.thumbnail_cache = ThumbnailCache()
+        # Video whose cover the preview should currently show
+        self.preview_video_id = None
+        
+        # Optionally hand single downloads to a running `ttd daemon`
+        self.use_daemon = bool(settings.get("use_daemon", False))
+        self.daemon_client = DaemonClient()
+        
+        # TTD_PROFILE=1 profiles every download and samples the Tk thread from the start
+        if get_profiler().enabled:
+            get_profiler().start_ui_sampling()
+            self.logger.info(f"Profiling enabled, writing to {get_profiler().output_dir}")
         
     def create_ui(self):
         """Create the main user interface"""
@@ -376,7 +419,7 @@ class HikariTikTokDownloader:
         self.quality_combo = ctk.CTkComboBox(
             quality_control_frame,
             variable=self.quality_var,
-            values=["best"],
+            values=list(QUALITY_TIERS),
             height=30,
             corner_radius=8,
             state="readonly"
@@ -489,10 +532,13 @@ class HikariTikTokDownloader:
         )
         detector_label.pack(pady=(15, 5))
         
-        from ui.components import StatusIndicator
+        from ui.components import StatusIndicator, ThumbnailPreview
         self.status_indicator = StatusIndicator(detector_frame, fg_color="transparent")
         self.status_indicator.pack(pady=(0, 15))
         
+        # Cover preview, packed below the status once a cover is loaded
+        self.thumbnail_preview = ThumbnailPreview(detector_frame, pack_options={'pady': (0, 15)})
+        
     def create_progress_section(self, parent):
         """Create progress section"""
         progress_frame = ctk.CTkFrame(parent, corner_radius=10, fg_color="white")
@@ -515,7 +561,23 @@ class HikariTikTokDownloader:
             font=ctk.CTkFont(size=11),
             text_color="#666666"
         )
-        self.status_label.pack(pady=(0, 15))
+        self.status_label.pack(pady=(0, 8))
+        
+        # Right-click a row to pause, resume or cancel it
+        self.job_list = JobListView(progress_frame, self.job_model, visible_rows=5, on_action=self._job_action)
+        self.job_list.pack(fill="x", padx=15, pady=(0, 5))
+        
+        clear_jobs_btn = ctk.CTkButton(
+            progress_frame,
+            text="Clear Finished",
+            width=110,
+            height=26,
+            corner_radius=8,
+            fg_color="#6C757D",
+            hover_color="#5A6268",
+            command=self.job_model.clear_finished
+        )
+        clear_jobs_btn.pack(pady=(0, 15))
         
     def create_support_section(self, parent):
         """Create support development section"""
@@ -590,7 +652,19 @@ class HikariTikTokDownloader:
             corner_radius=8,
             command=self.show_credits
         )
-        credits_btn.pack(pady=(0, 18))
+        credits_btn.pack(pady=(0, 8))
+        
+        diagnostics_btn = ctk.CTkButton(
+            credits_frame,
+            text="Diagnostics",
+            width=120,
+            height=32,
+            corner_radius=8,
+            fg_color="#6C757D",
+            hover_color="#5A6268",
+            command=self.show_diagnostics
+        )
+        diagnostics_btn.pack(pady=(0, 18))
         
     # Event handlers and utility methods
     def on_url_change(self, event=None):
@@ -599,9 +673,22 @@ class HikariTikTokDownloader:
 
         # Clear the previous video name
         self.video_name_var.set("")
+        
+        # Show a cover already in memory right away; otherwise clear the old one
+        video_id = self.validator.extract_video_id(url) if url else None
+        self.preview_video_id = video_id
+        cached_cover = self.thumbnail_cache.get_cached(video_id) if video_id else None
+        if cached_cover is not None:
+            self.thumbnail_preview.show(cached_cover)
+        else:
+            self.thumbnail_preview.clear()
 
         if url:
-            if self.is_tiktok_url(url):
+            if self.validator.is_profile_url(url):
+                username = self.validator.extract_username(url)
+                self.status_indicator.set_status("info", f"Profile @{username} detected")
+                self.logger.info(f"Profile URL detected: {url}")
+            elif self.is_tiktok_url(url):
                 self.status_indicator.set_status("success", "Content detected")
                 self.logger.info(f"Valid URL detected: {url}")
 
@@ -621,7 +708,7 @@ class HikariTikTokDownloader:
     # Fetch video metadata
     def _fetch_video_info(self, url):
         """
-        Fetch video metadata using yt-dlp to auto-fill the video name.
+        Fetch video metadata with the selected engine to auto-fill the video name.
         This method should be called from a thread to avoid freezing the UI.
         """
         if not url:
@@ -632,35 +719,29 @@ class HikariTikTokDownloader:
         current_engine_name = self.engine_var.get()
         current_engine = self.engines.get(current_engine_name)
 
-        if current_engine_name != 'yt-dlp' or not hasattr(current_engine, 'DEFAULT_FILENAME_TEMPLATE'):
+        if not hasattr(current_engine, 'DEFAULT_FILENAME_TEMPLATE'):
             self.logger.warning(f"Cannot fetch custom filename template for engine: {current_engine_name}")
             self.root.after(0, lambda: self._update_video_name_ui(""))
             return
         
         filename_template = current_engine.DEFAULT_FILENAME_TEMPLATE
-
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'skip_download': True,
-        }
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-
-                channel = info.get('channel', 'UnknownChannel')
-                uploader = info.get('uploader', 'UnknownUploader')
-                title = info.get('title', 'UnknownTitle')
+            # Revisited videos are served from the core's on-disk cache
+            video_id = self.validator.extract_video_id(url)
+            video_info = self.core.video_info(url, current_engine_name)
+            if video_info is None:
+                raise Exception("No video information returned")
 
-                video_name = filename_template % {
-                    'channel': channel,
-                    'uploader': uploader,
-                    'title': title
-                }
+            video_name = video_info.format_name(filename_template)
 
-                safe_video_name_for_ui = re.sub(r'[\\/*?:"<>]', "", video_name)
-                self.root.after(0, lambda: self._update_video_name_ui(safe_video_name_for_ui))
+            safe_video_name_for_ui = re.sub(r'[\\/*?:"<>]', "", video_name)
+            self.root.after(0, lambda: self._update_video_name_ui(safe_video_name_for_ui))
+            
+            # Download/decode/downscale happen here on the worker; Tk only gets the finished image
+            cover = self.thumbnail_cache.load(video_info.id, video_info.thumbnail, video_info.http_headers)
+            if cover is not None:
+                self.root.after(0, lambda: self._update_thumbnail_ui(video_id or video_info.id, cover))
                 
         except Exception as e:
             error_msg = f"Failed to fetch video info: {e}"
@@ -668,6 +749,11 @@ class HikariTikTokDownloader:
             self.root.after(0, lambda: self._update_video_name_ui(""))
             self.root.after(0, lambda: self.status_indicator.set_status("error", "Failed to load video info"))
 
+    def _update_thumbnail_ui(self, video_id, cover):
+        """Show a decoded cover if its URL is still the one in the input box"""
+        if video_id == self.preview_video_id:
+            self.thumbnail_preview.show(cover)
+    
     def _update_video_name_ui(self, video_name):
         """
         Safely update the video name input field from any thread.
@@ -697,7 +783,8 @@ class HikariTikTokDownloader:
     
     def show_quality_info(self):
         """Show quality information"""
-        message = "Downloads in the highest available quality (up to 1080p)\n\nThis ensures you get the best possible video quality with optimal file size."
+        tiers = "\n".join(f"• {tier}: {QUALITY_DESCRIPTIONS[tier]}" for tier in QUALITY_TIERS)
+        message = f"{tiers}\n\nLower tiers cut the bytes transferred; 'lite' keeps at least 540p for archiving."
         messagebox.showinfo("Quality Information", message)
     
     def browse_output_folder(self):
@@ -733,7 +820,17 @@ class HikariTikTokDownloader:
             settings = {
                 "last_output_dir": self.output_dir.get(),
                 "engine": self.engine_var.get(),
-                "quality": self.quality_var.get()
+                "quality": self.quality_var.get(),
+                "bandwidth_limit_kbps": int(self.governor.max_bytes_per_sec or 0) // 1024,
+                "max_connections": self.governor.max_connections,
+                "fragment_concurrency": self.governor.fragment_concurrency,
+                "use_daemon": self.use_daemon,
+                "postprocess": self.postprocess_setting,
+                "layout": self.layout.scheme,
+                "max_jobs": self.max_jobs,
+                "transport": self.transport_setting,
+                "downloader": self.downloader_setting,
+                "fsync_policy": self.fsync_setting
             }
             with open(self.settings_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, indent=2)
@@ -761,11 +858,15 @@ class HikariTikTokDownloader:
             messagebox.showerror("Error", "Please enter a TikTok URL")
             return
         
+        # Profile URLs are synced incrementally instead of downloaded once
+        is_profile = self.validator.is_profile_url(url)
+        
         # Validate URL
-        is_valid, message = self.validator.is_valid_tiktok_url(url)
-        if not is_valid:
-            messagebox.showerror("Invalid URL", message)
-            return
+        if not is_profile:
+            is_valid, message = self.validator.is_valid_tiktok_url(url)
+            if not is_valid:
+                messagebox.showerror("Invalid URL", message)
+                return
         
         # Check output directory
         output_path = self.output_dir.get()
@@ -776,63 +877,129 @@ class HikariTikTokDownloader:
                 messagebox.showerror("Error", f"Could not create output directory: {e}")
                 return
         
-        # Disable download button
-        self.download_btn.configure(state="disabled", text="Downloading...")
+        job_id = self._add_job(url)
+        custom_video_name = "" if is_profile else self.video_name_textbox.get("1.0", "end-1c").strip()
         
-        # Download logic
-        custom_video_name = self.video_name_textbox.get("1.0", "end-1c").strip()
-        
-        # Start download in separate thread
+        # The worker only follows the job; the core's pool does the downloading,
+        # so more URLs can be queued while this one runs
         download_thread = threading.Thread(
             target=self._download_worker,
-            args=(url, output_path, custom_video_name),
+            args=(url, output_path, custom_video_name, job_id),
             daemon=True
         )
         download_thread.start()
     
-    def _download_worker(self, url, output_path, custom_name):
-        """Download worker thread"""
+    def _add_job(self, url):
+        """Add a row for a new download to the job list"""
+        job_id = f"gui-{next(self._job_ids)}"
+        video_id = self.validator.extract_video_id(url)
+        video_info = self.info_cache.get(video_id) if video_id else None
+        self.job_model.add(job_id, video_info.title if video_info and video_info.title else url)
+        return job_id
+    
+    def _job_callbacks(self, job_id):
+        """Progress, status and state callbacks feeding both the progress bar and the job list"""
+        def progress_callback(percent):
+            self.job_model.update(job_id, progress=percent)
+            self.root.after(0, lambda: self.progress_bar.set(percent / 100))
+        
+        def status_callback(status):
+            self.job_model.update(job_id, status=status)
+            self.root.after(0, lambda: self.status_var.set(status))
+        
+        def state_callback(state):
+            if state == "paused":
+                self.job_model.update(job_id, state=state, status="Paused")
+            elif state in ("queued", "running"):
+                self.job_model.update(job_id, state=state)
+        
+        return progress_callback, status_callback, state_callback
+    
+    def _job_action(self, job_id, action):
+        """Pause, resume or cancel a job from the job list"""
+        backend = self._job_backends.get(job_id)
+        if backend is None:
+            return
+        
+        def run():
+            client, backend_id = backend
+            try:
+                if getattr(client, action)(backend_id) is False:
+                    self.logger.warning(f"Could not {action} job {job_id}")
+            except Exception as e:
+                self.logger.error(f"Could not {action} job {job_id}: {e}")
+        
+        # Daemon requests and partial-file cleanup stay off the Tk thread
+        threading.Thread(target=run, daemon=True).start()
+    
+    def _finish_job(self, job_id, success, message):
+        self._job_backends.pop(job_id, None)
+        if success:
+            self.job_model.update(job_id, state="completed", progress=100, status="Completed")
+        else:
+            self.job_model.update(job_id, state="failed", status=message)
+    
+    def _download_worker(self, url, output_path, custom_name, job_id):
+        """Follow one download (video or profile) until it finishes"""
         try:
             engine_name = self.engine_var.get()
-            engine = self.engines.get(engine_name)
             quality = self.quality_var.get()
             
-            # Use the custom name passed from UI thread
-            # custom_name = self.video_name_var.get().strip()
-            
             self.logger.info(f"Starting download with {engine_name} engine")
             self.logger.info(f"URL: {url}")
             self.logger.info(f"Quality: {quality}")
             self.logger.info(f"Output: {output_path}")
             
-            # Progress callback
-            def progress_callback(percent):
-                self.root.after(0, lambda: self.progress_bar.set(percent / 100))
-            
-            # Status callback
-            def status_callback(status):
-                self.root.after(0, lambda: self.status_var.set(status))
+            callbacks = self._job_callbacks(job_id)
             
-            # Perform download
-            success, message = engine.download(
-                url, output_path, quality, 
-                progress_callback, status_callback,
-                custom_filename=custom_name
-            )
+            # Perform download, through the daemon when enabled and running
+            result = None
+            if self.use_daemon:
+                result = self._download_via_daemon(url, output_path, quality, custom_name, job_id, callbacks)
+            if result is None:
+                core_job = self.core.submit(
+                    url, engine=engine_name, output_path=output_path,
+                    quality=quality, filename=custom_name or None
+                )
+                self._job_backends[job_id] = (self.core, core_job)
+                result = self.core.wait(core_job, *callbacks)
+            success, message = result
+            if not success and message == "Cancelled":
+                self.job_model.update(job_id, state="cancelled", status="Cancelled")
+                self._job_backends.pop(job_id, None)
+                self.root.after(0, lambda: self.status_var.set("Cancelled"))
+                return
             
             # Update UI on main thread
+            self._finish_job(job_id, success, message)
             self.root.after(0, lambda: self._download_complete(success, message))
             
         except Exception as e:
             error_msg = f"Download failed: {str(e)}"
             self.logger.error(error_msg)
+            self._finish_job(job_id, False, error_msg)
             self.root.after(0, lambda: self._download_complete(False, error_msg))
     
+    def _download_via_daemon(self, url, output_path, quality, custom_name, job_id, callbacks):
+        """Submit a download to the local daemon; returns None if no daemon is reachable"""
+        try:
+            job = self.daemon_client.submit(
+                url, engine=self.engine_var.get(), output_path=output_path,
+                quality=quality, filename=custom_name or None
+            )
+        except DaemonError as e:
+            self.logger.warning(f"Daemon unavailable, downloading locally: {e}")
+            return None
+        
+        self.logger.info(f"Submitted to daemon as job {job['id']}")
+        self._job_backends[job_id] = (self.daemon_client, job['id'])
+        try:
+            return self.daemon_client.wait(job['id'], *callbacks)
+        except DaemonError as e:
+            return False, f"Daemon job {job['id']} lost: {e}"
+    
     def _download_complete(self, success, message):
         """Handle download completion"""
-        # Re-enable download button
-        self.download_btn.configure(state="normal", text="Download Content")
-        
         if success:
             self.progress_bar.set(1.0)
             self.status_var.set("Download completed!")
@@ -848,7 +1015,7 @@ class HikariTikTokDownloader:
         """Show diagnostics window"""
         diag_window = ctk.CTkToplevel(self.root)
         diag_window.title("Diagnostics - TTD")
-        diag_window.geometry("600x400")
+        diag_window.geometry("640x780")
         
         # Log display
         log_frame = ctk.CTkFrame(diag_window)
@@ -872,6 +1039,61 @@ class HikariTikTokDownloader:
         else:
             log_text.insert("1.0", "No logs available")
         
+        # Page fetch accounting (bytes on the wire vs decoded)
+        page_label = ctk.CTkLabel(
+            log_frame,
+            text="Page Fetches",
+            font=ctk.CTkFont(size=16, weight="bold")
+        )
+        page_label.pack(pady=(0, 5))
+        
+        page_text = ctk.CTkTextbox(log_frame, wrap="none", height=120)
+        page_text.pack(fill="x", padx=10, pady=(0, 10))
+        page_text.insert("1.0", self._format_page_stats())
+        
+        # Profiling hotspots (per job, plus the Tk thread while profiling is on)
+        profile_label = ctk.CTkLabel(
+            log_frame,
+            text="Profiling",
+            font=ctk.CTkFont(size=16, weight="bold")
+        )
+        profile_label.pack(pady=(0, 5))
+        
+        profile_text = ctk.CTkTextbox(log_frame, wrap="none", height=140)
+        profile_text.pack(fill="x", padx=10, pady=(0, 10))
+        profile_text.insert("1.0", self._format_profiles())
+        
+        # Download catalog totals and latest entries
+        catalog_label = ctk.CTkLabel(
+            log_frame,
+            text="Download Catalog",
+            font=ctk.CTkFont(size=16, weight="bold")
+        )
+        catalog_label.pack(pady=(0, 5))
+        
+        catalog_text = ctk.CTkTextbox(log_frame, wrap="none", height=120)
+        catalog_text.pack(fill="x", padx=10, pady=(0, 10))
+        catalog_text.insert("1.0", self._format_catalog())
+        
+        # Shared bandwidth and connection limits, applied to running transfers
+        limits_frame = ctk.CTkFrame(log_frame, fg_color="transparent")
+        limits_frame.pack(fill="x", padx=10, pady=(0, 10))
+        
+        ctk.CTkLabel(limits_frame, text="Bandwidth (KB/s, 0 = unlimited):").pack(side="left")
+        bandwidth_var = tk.StringVar(value=str(int(self.governor.max_bytes_per_sec or 0) // 1024))
+        ctk.CTkEntry(limits_frame, textvariable=bandwidth_var, width=80, height=30).pack(side="left", padx=(5, 10))
+        
+        ctk.CTkLabel(limits_frame, text="Connections:").pack(side="left")
+        connections_var = tk.StringVar(value=str(self.governor.max_connections))
+        ctk.CTkEntry(limits_frame, textvariable=connections_var, width=50, height=30).pack(side="left", padx=(5, 10))
+        
+        ctk.CTkButton(
+            limits_frame,
+            text="Apply Limits",
+            width=110,
+            command=lambda: self._apply_limits(bandwidth_var, connections_var)
+        ).pack(side="left")
+        
         # Buttons
         button_frame = ctk.CTkFrame(log_frame, fg_color="transparent")
         button_frame.pack(fill="x", padx=10, pady=(0, 10))
@@ -879,7 +1101,7 @@ class HikariTikTokDownloader:
         refresh_btn = ctk.CTkButton(
             button_frame,
             text="Refresh",
-            command=lambda: self._refresh_logs(log_text)
+            command=lambda: self._refresh_logs(log_text, page_text, profile_text, catalog_text)
         )
         refresh_btn.pack(side="left", padx=(0, 5))
         
@@ -888,9 +1110,41 @@ class HikariTikTokDownloader:
             text="Clear Logs",
             command=lambda: self._clear_logs(log_text)
         )
-        clear_btn.pack(side="left")
+        clear_btn.pack(side="left", padx=(0, 5))
+        
+        profile_btn = ctk.CTkButton(
+            button_frame,
+            text="Stop Profiling" if get_profiler().enabled else "Start Profiling",
+            command=lambda: self._toggle_profiling(profile_btn, profile_text)
+        )
+        profile_btn.pack(side="left")
     
-    def _refresh_logs(self, log_text):
+    def _apply_limits(self, bandwidth_var, connections_var):
+        """Change the governor's limits, here and in the daemon when downloads go there"""
+        try:
+            kbps = int(bandwidth_var.get().strip() or 0)
+            connections = int(connections_var.get().strip())
+            if kbps < 0 or connections < 1:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid Limits", "Enter a bandwidth of 0 or more KB/s and at least 1 connection.")
+            return
+        
+        self.governor.set_bandwidth_limit(kbps * 1024 if kbps else None)
+        self.governor.set_max_connections(connections)
+        self.save_settings()
+        self.logger.info(f"Limits set to {f'{kbps} KB/s' if kbps else 'unlimited bandwidth'}, {connections} connections")
+        
+        if self.use_daemon:
+            def push():
+                try:
+                    self.daemon_client.set_limits(kbps, connections)
+                except DaemonError as e:
+                    self.logger.warning(f"Could not update daemon limits: {e}")
+            
+            threading.Thread(target=push, daemon=True).start()
+    
+    def _refresh_logs(self, log_text, page_text=None, profile_text=None, catalog_text=None):
         """Refresh log display"""
         log_text.delete("1.0", "end")
         recent_logs = self.logger.get_recent_logs()
@@ -898,6 +1152,91 @@ class HikariTikTokDownloader:
             log_text.insert("1.0", "\n".join(recent_logs))
         else:
             log_text.insert("1.0", "No logs available")
+        if page_text is not None:
+            page_text.delete("1.0", "end")
+            page_text.insert("1.0", self._format_page_stats())
+        if profile_text is not None:
+            profile_text.delete("1.0", "end")
+            profile_text.insert("1.0", self._format_profiles())
+        if catalog_text is not None:
+            catalog_text.delete("1.0", "end")
+            catalog_text.insert("1.0", self._format_catalog())
+    
+    def _toggle_profiling(self, button, profile_text):
+        """Turn per-download profiling (and Tk thread sampling) on or off"""
+        profiler = get_profiler()
+        if profiler.enabled:
+            profiler.configure(False)
+            profiler.stop_ui_sampling()
+            button.configure(text="Start Profiling")
+            self.logger.info("Profiling stopped")
+        else:
+            profiler.configure(True)
+            profiler.start_ui_sampling()
+            button.configure(text="Stop Profiling")
+            self.logger.info(f"Profiling started, writing to {profiler.output_dir}")
+        profile_text.delete("1.0", "end")
+        profile_text.insert("1.0", self._format_profiles())
+    
+    def _format_profiles(self):
+        """Top hotspots of the most recent profiles"""
+        profiler = get_profiler()
+        profiles = profiler.recent_profiles()
+        if not profiles:
+            state = "on" if profiler.enabled else "off"
+            return f"Profiling is {state}. No profiles recorded yet (output: {profiler.output_dir})"
+        lines = []
+        for entry in reversed(profiles[-5:]):
+            lines.append(f"{entry['name']}  {entry['elapsed']:.2f}s  {entry['path'] or '(not saved)'}")
+            for label, own, total in entry['hotspots'][:5]:
+                lines.append(f"    {own:>7.3f}s self {total:>8.3f}s total  {label}")
+        return "\n".join(lines)
+    
+    def _format_page_stats(self):
+        """Summary line plus one line per recent page fetch"""
+        stats = get_page_stats()
+        summary = stats.summary()
+        if not summary['requests']:
+            return "No pages fetched yet"
+        transport = get_transport().stats()
+        lines = [
+            f"{summary['requests']} pages: {summary['wire_bytes'] / 1024:.1f} KB on the wire, "
+            f"{summary['decoded_bytes'] / 1024:.1f} KB decoded ({summary['saved_ratio']:.0%} saved), "
+            f"{summary['early_stops']} stopped early",
+            f"Transport: {transport['name']}; DNS cache: {transport['dns']['hits']} hits, {transport['dns']['misses']} lookups; "
+            f"TLS: {transport['tls']['resumed']} resumed, {transport['tls']['full']} full handshakes; "
+            f"downloader: {get_downloader().name}"
+        ]
+        for entry in reversed(stats.recent_entries()):
+            lines.append(
+                f"{datetime.fromtimestamp(entry['time']).strftime('%H:%M:%S')}  {entry['encoding']:<8} "
+                f"{entry['wire_bytes'] / 1024:>8.1f} KB -> {entry['decoded_bytes'] / 1024:>8.1f} KB"
+                f"{'  (early stop)' if entry['early_stop'] else ''}  {entry['elapsed'] * 1000:.0f} ms  {entry['url']}"
+            )
+        return "\n".join(lines)
+    
+    def _format_catalog(self):
+        """Catalog totals plus the most recent downloads"""
+        catalog = self.core.catalog
+        try:
+            summary = catalog.summary()
+            recent = catalog.search(limit=10)
+        except Exception as e:
+            return f"Catalog unavailable: {e}"
+        if not summary['count']:
+            return f"No downloads cataloged yet ({catalog.path})"
+        lines = [
+            f"{summary['count']} downloads, {summary['bytes'] / (1024 ** 3):.2f} GB, "
+            f"{summary['duration'] / 3600:.1f} h of video ({catalog.path})",
+            "Top uploaders: " + ", ".join(f"@{name or 'unknown'} {count}" for name, count in summary['top_uploaders'])
+        ]
+        for entry in recent:
+            size = f"{entry['size'] / (1024 * 1024):.1f} MB" if entry['size'] else "?"
+            lines.append(
+                f"{datetime.fromtimestamp(entry['finished']).strftime('%Y-%m-%d %H:%M')}  {entry['video_id']}  "
+                f"@{entry['uploader'] or 'unknown'}  {size}  {entry['engine'] or ''}  {entry['title'] or ''}"
+            )
+        return "\n".join(lines)
     
     def _clear_logs(self, log_text):
         """Clear logs"""
@@ -1125,9 +1464,26 @@ Foundation of this entire application"""
         """Handle application closing"""
         self.clipboard_monitor_enabled = False
         self.save_settings()
+        get_profiler().stop_ui_sampling()
+        # Queued jobs are dropped and running ones paused at their next chunk, so their
+        # partial files resume on the next download; post-processing is not waited for.
+        # Pausing can take a few seconds, so it runs off the Tk thread behind a hidden window.
+        self.root.withdraw()
+        shutdown = threading.Thread(target=self.core.shutdown, kwargs={'wait': False},
+                                    name="ttd-shutdown", daemon=True)
+        shutdown.start()
+        self._finish_closing(shutdown)
+
+    def _finish_closing(self, shutdown):
+        """Destroy the window once the core has stopped"""
+        if shutdown.is_alive():
+            self.root.after(100, lambda: self._finish_closing(shutdown))
+            return
         self.logger.info("TTD closed")
         self.root.destroy()
 
 if __name__ == "__main__":
+    # Post-processing workers are separate processes, also in frozen builds
+    multiprocessing.freeze_support()
     app = HikariTikTokDownloader()
     app.run()
\ No newline at end of file
@@ -81,8 +81,8 @@ def main():
     colored_print("=" * 40)
     
     # Check Python version
-    if sys.version_info < (3, 7):
-        print("❌ Python 3.7 or higher is required")
+    if sys.version_info < (3, 10):
+        print("❌ Python 3.10 or higher is required")
         print(f"   Current version: {sys.version}")
         input("Press Enter to exit...")
         sys.exit(1)
@@ -53,8 +53,8 @@ def install_requirements():
 
 def check_python_version():
     """Check if Python version is compatible"""
-    if sys.version_info < (3, 7):
-        print("❌ Python 3.7 or higher is required")
+    if sys.version_info < (3, 10):
+        print("❌ Python 3.10 or higher is required")
         print(f"   Current version: {sys.version}")
         return False
     return True
@@ -2,6 +2,7 @@
 Custom UI components with modern design
 """
 
+import threading
 import tkinter as tk
 from tkinter import ttk
 import customtkinter as ctk
@@ -70,6 +71,27 @@ class ProgressBar(ctk.CTkProgressBar):
         default_kwargs.update(kwargs)
         super().__init__(parent, **default_kwargs)
 
+class ThumbnailPreview(ctk.CTkLabel):
+    """Cover preview that stays hidden until an image is shown"""
+    def __init__(self, parent, pack_options=None, **kwargs):
+        super().__init__(parent, text="", **kwargs)
+        self.pack_options = pack_options or {}
+        self._image = None
+    
+    def show(self, pil_image):
+        """Display an already decoded and downscaled PIL image (Tk thread only)"""
+        self._image = ctk.CTkImage(light_image=pil_image, size=pil_image.size)
+        self.configure(image=self._image)
+        if not self.winfo_ismapped():
+            self.pack(**self.pack_options)
+    
+    def clear(self):
+        """Hide the preview"""
+        self.configure(image=None)
+        self._image = None
+        self.pack_forget()
+
+
 class StatusIndicator(ctk.CTkFrame):
     """Status indicator with colored dot"""
     def __init__(self, parent, **kwargs):
@@ -100,4 +122,206 @@ class StatusIndicator(ctk.CTkFrame):
         }
         
         self.status_dot.configure(text_color=colors.get(status, "#FF6B6B"))
-        self.status_text.configure(text=text)
\ No newline at end of file
+        self.status_text.configure(text=text)
+
+class JobListModel:
+    """Thread-safe job table; workers write fields, the view reads coalesced snapshots"""
+    def __init__(self):
+        self._jobs = {}
+        self._order = []
+        self._lock = threading.Lock()
+        # Bumped on every change so the view can skip redraws when nothing moved
+        self.version = 0
+    
+    def add(self, job_id, title, state="queued", status="Queued"):
+        with self._lock:
+            if job_id not in self._jobs:
+                self._order.append(job_id)
+            self._jobs[job_id] = {'id': job_id, 'title': title, 'state': state, 'status': status, 'progress': 0.0}
+            self.version += 1
+    
+    def update(self, job_id, **fields):
+        """Set any of title, state, status, progress (0-100) for a job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            self.version += 1
+    
+    def clear_finished(self):
+        """Drop completed and failed jobs"""
+        with self._lock:
+            self._order = [i for i in self._order if self._jobs[i]['state'] not in ("completed", "failed", "cancelled")]
+            self._jobs = {i: self._jobs[i] for i in self._order}
+            self.version += 1
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._order)
+    
+    def snapshot(self, start, count):
+        """(version, total, copies of the rows in [start, start + count))"""
+        with self._lock:
+            rows = [dict(self._jobs[i]) for i in self._order[start:start + count]]
+            return self.version, len(self._order), rows
+
+
+class JobListView(ctk.CTkFrame):
+    """Job list that draws only the visible rows on a canvas and refreshes on a timer"""
+    STATE_COLORS = {
+        "queued": "#BBBBBB",
+        "running": "#FF0050",
+        "completed": "#4CAF50",
+        "failed": "#FF6B6B",
+        "cancelled": "#FF9800",
+        "paused": "#2196F3",
+    }
+    # Right-click menu entries offered per job state
+    STATE_ACTIONS = {
+        "queued": ("pause", "cancel"),
+        "running": ("pause", "cancel"),
+        "paused": ("resume", "cancel"),
+    }
+    
+    def __init__(self, parent, model, row_height=34, visible_rows=6, refresh_ms=100, on_action=None, **kwargs):
+        kwargs.setdefault('fg_color', "transparent")
+        super().__init__(parent, **kwargs)
+        self.model = model
+        # Called as on_action(job_id, "pause" | "resume" | "cancel") from the row menu
+        self.on_action = on_action
+        self.row_height = row_height
+        self.refresh_ms = refresh_ms
+        self._top = 0
+        self._slots = []
+        self._drawn = None
+        self._width = 1
+        self._after_id = None
+        
+        self.canvas = tk.Canvas(
+            self,
+            height=row_height * visible_rows,
+            background="white",
+            highlightthickness=0
+        )
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        
+        self.canvas.bind("<Configure>", self._on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(sequence, self._on_wheel)
+        if on_action is not None:
+            for sequence in ("<Button-3>", "<Button-2>"):
+                self.canvas.bind(sequence, self._on_menu)
+        self._tick()
+    
+    @property
+    def visible_rows(self):
+        return max(1, self.canvas.winfo_height() // self.row_height)
+    
+    def _make_slot(self, index):
+        """Canvas items for one on-screen row, reused for whichever job scrolls into it"""
+        y = index * self.row_height
+        return {
+            'title': self.canvas.create_text(8, y + 10, anchor="w", font=("Arial", 10), fill="#333333"),
+            'status': self.canvas.create_text(0, y + 10, anchor="e", font=("Arial", 9), fill="#666666"),
+            'track': self.canvas.create_rectangle(8, y + 22, 8, y + 26, fill="#EEEEEE", width=0),
+            'bar': self.canvas.create_rectangle(8, y + 22, 8, y + 26, fill="#FF0050", width=0),
+        }
+    
+    def _on_resize(self, event):
+        self._width = event.width
+        needed = event.height // self.row_height + 1
+        while len(self._slots) < needed:
+            self._slots.append(self._make_slot(len(self._slots)))
+        self._drawn = None
+    
+    def _scroll_to(self, top):
+        top = max(0, min(int(top), len(self.model) - self.visible_rows))
+        if top != self._top:
+            self._top = top
+            self._drawn = None
+            self._redraw()
+    
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._scroll_to(float(args[1]) * len(self.model))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self._scroll_to(self._top + int(args[1]) * step)
+    
+    def _on_wheel(self, event):
+        if event.num == 4:
+            delta = -1
+        elif event.num == 5:
+            delta = 1
+        else:
+            delta = -1 if event.delta > 0 else 1
+        self._scroll_to(self._top + delta * 3)
+    
+    def _on_menu(self, event):
+        """Offer pause/resume/cancel for the row under the pointer"""
+        _, _, rows = self.model.snapshot(self._top + event.y // self.row_height, 1)
+        if not rows:
+            return
+        job_id = rows[0]['id']
+        actions = self.STATE_ACTIONS.get(rows[0]['state'], ())
+        if not actions:
+            return
+        menu = tk.Menu(self.canvas, tearoff=0)
+        for action in actions:
+            menu.add_command(label=action.capitalize(), command=lambda a=action: self.on_action(job_id, a))
+        try:
+            menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            menu.grab_release()
+    
+    def _tick(self):
+        self._redraw()
+        self._after_id = self.after(self.refresh_ms, self._tick)
+    
+    def _redraw(self):
+        """Repaint the visible rows if the model changed since the last paint"""
+        # Clearing finished jobs can leave the view scrolled past the end
+        self._top = max(0, min(self._top, len(self.model) - self.visible_rows))
+        version, total, rows = self.model.snapshot(self._top, len(self._slots))
+        if self._drawn == (version, self._top, self._width):
+            return
+        self._drawn = (version, self._top, self._width)
+        
+        width = self._width
+        max_chars = max(8, (width - 180) // 7)
+        for index, slot in enumerate(self._slots):
+            if index >= len(rows):
+                for item in slot.values():
+                    self.canvas.itemconfigure(item, state="hidden")
+                continue
+            row = rows[index]
+            y = index * self.row_height
+            title = row['title'] or row['id']
+            if len(title) > max_chars:
+                title = title[:max_chars - 1] + "…"
+            color = self.STATE_COLORS.get(row['state'], "#BBBBBB")
+            fill = 8 + (width - 16) * max(0.0, min(row['progress'], 100.0)) / 100
+            self.canvas.itemconfigure(slot['title'], text=title, state="normal")
+            status = row['status'] or row['state']
+            if len(status) > 24:
+                status = status[:23] + "…"
+            self.canvas.itemconfigure(slot['status'], text=status, state="normal")
+            self.canvas.coords(slot['status'], width - 8, y + 10)
+            self.canvas.coords(slot['track'], 8, y + 22, width - 8, y + 26)
+            self.canvas.itemconfigure(slot['track'], state="normal")
+            self.canvas.coords(slot['bar'], 8, y + 22, fill, y + 26)
+            self.canvas.itemconfigure(slot['bar'], fill=color, state="normal")
+        
+        if total:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def destroy(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
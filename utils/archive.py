@@ -0,0 +1,57 @@
+"""
+Download archive shared by all engines
+Uses yt-dlp's archive format ("<extractor> <id>" per line) so the same file
+can also be handed to yt-dlp via --download-archive.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+
+class DownloadArchive:
+    """Append-only record of downloaded video IDs"""
+
+    EXTRACTOR = "tiktok"
+
+    def __init__(self, path=None):
+        self.path = str(path or Path.home() / ".ttd" / "archive.txt")
+        self._ids = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Read the archive file into memory on first use"""
+        if self._ids is not None:
+            return
+        self._ids = set()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        self._ids.add(parts[1])
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, video_id):
+        with self._lock:
+            self._load()
+            return str(video_id) in self._ids
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._ids)
+
+    def add(self, video):
+        """Record a video ID or VideoInfo; returns False if it was already archived"""
+        video_id = str(getattr(video, 'id', video))
+        with self._lock:
+            self._load()
+            if video_id in self._ids:
+                return False
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(f"{self.EXTRACTOR} {video_id}\n")
+            self._ids.add(video_id)
+            return True
@@ -0,0 +1,259 @@
+"""
+Download catalog
+A SQLite record of every finished download: video ID, uploader, channel,
+title, file path, size, duration, engine, stage timings and SHA-256.
+Entries are buffered and written by a background flusher in batched
+transactions, so a pipeline finishing many items a second pays for one
+commit per batch. Lookups by ID and uploader use indexes, so dedup,
+skip-existing checks and reports stay fast at millions of rows without
+scanning the output folders.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Entries written per transaction
+BATCH_SIZE = 500
+# Seconds an entry may wait in the buffer before it is written
+FLUSH_INTERVAL = 2.0
+
+COLUMNS = (
+    'video_id', 'uploader', 'channel', 'title', 'path', 'size', 'duration',
+    'engine', 'quality', 'sha256', 'started', 'finished',
+    'extract_seconds', 'transfer_seconds',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    video_id TEXT PRIMARY KEY,
+    uploader TEXT,
+    channel TEXT,
+    title TEXT,
+    path TEXT,
+    size INTEGER,
+    duration REAL,
+    engine TEXT,
+    quality TEXT,
+    sha256 TEXT,
+    started REAL,
+    finished REAL NOT NULL,
+    extract_seconds REAL,
+    transfer_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS downloads_uploader ON downloads (uploader, finished);
+CREATE INDEX IF NOT EXISTS downloads_finished ON downloads (finished);
+"""
+
+_INSERT = (f"INSERT OR REPLACE INTO downloads ({', '.join(COLUMNS)}) "
+           f"VALUES ({', '.join('?' for _ in COLUMNS)})")
+
+
+def default_catalog_path():
+    return Path.home() / ".ttd" / "catalog.db"
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return None
+
+
+def catalog_entry(video_info, path, engine, quality=None, sha256=None, started=None, timings=None):
+    """Catalog row for a finished download; timings maps stage names to seconds"""
+    timings = timings or {}
+    return {
+        'video_id': str(video_info.id),
+        'uploader': video_info.uploader,
+        'channel': video_info.channel,
+        'title': video_info.title,
+        'path': os.path.abspath(path) if path else None,
+        'size': _file_size(path),
+        'duration': video_info.duration,
+        'engine': engine,
+        'quality': quality,
+        'sha256': sha256,
+        'started': started,
+        'finished': time.time(),
+        'extract_seconds': timings.get('extract'),
+        'transfer_seconds': timings.get('transfer'),
+    }
+
+
+class DownloadCatalog:
+    """Indexed SQLite catalog of finished downloads, written in batches"""
+
+    def __init__(self, path=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, logger=None):
+        self.path = str(path or default_catalog_path())
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.logger = logger
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Autocommit; each batch opens its own BEGIN IMMEDIATE
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            # Readers (CLI queries, other processes) do not block the writer
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        # video_id -> entry; a later entry for the same video replaces the buffered one
+        self._pending = {}
+        self._changed = threading.Condition()
+        self._flusher = None
+        self._closed = False
+
+    # Writing
+
+    def add(self, entry):
+        """
+        Buffer an entry from catalog_entry(); it is written within flush_interval.
+        Entries arriving after close() (e.g. from late post-processing) are dropped.
+        """
+        with self._changed:
+            if self._closed:
+                return
+            self._pending[entry['video_id']] = entry
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="ttd-catalog", daemon=True)
+                self._flusher.start()
+            if len(self._pending) >= self.batch_size:
+                self._changed.notify_all()
+
+    def record_file(self, entry, path, sha256):
+        """Re-add an entry whose file was replaced (e.g. by post-processing)"""
+        self.add(dict(entry, path=os.path.abspath(path), size=_file_size(path), sha256=sha256))
+
+    def flush(self):
+        """Write every buffered entry in one transaction; returns how many were written"""
+        with self._changed:
+            entries, self._pending = list(self._pending.values()), {}
+        if not entries:
+            return 0
+        rows = [tuple(entry.get(column) for column in COLUMNS) for entry in entries]
+        try:
+            with self._lock:
+                cursor = self._db.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor.executemany(_INSERT, rows)
+                except BaseException:
+                    cursor.execute("ROLLBACK")
+                    raise
+                cursor.execute("COMMIT")
+        except sqlite3.Error:
+            # Keep the batch for the next flush, unless a newer entry arrived meanwhile
+            with self._changed:
+                for entry in entries:
+                    self._pending.setdefault(entry['video_id'], entry)
+            raise
+        return len(rows)
+
+    def _flush_loop(self):
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._closed or len(self._pending) >= self.batch_size,
+                                       self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                if self.logger:
+                    self.logger.warning(f"Could not write download catalog: {e}")
+            if closed:
+                return
+
+    def close(self):
+        """Write what is buffered and close the database"""
+        with self._changed:
+            if self._closed:
+                return
+            self._closed = True
+            self._changed.notify_all()
+            flusher = self._flusher
+        if flusher is not None:
+            flusher.join()
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Queries. Lookups by ID check the buffer first; listings and totals write
+    # it out, so they include entries that are not yet flushed.
+
+    def _query(self, sql, params=(), flush=True):
+        if flush and self._pending:
+            self.flush()
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def get(self, video_id):
+        """Entry dict for a video ID, or None"""
+        with self._changed:
+            entry = self._pending.get(str(video_id))
+        if entry is not None:
+            return dict(entry)
+        rows = self._query("SELECT * FROM downloads WHERE video_id = ?", (str(video_id),), flush=False)
+        return dict(rows[0]) if rows else None
+
+    def __contains__(self, video_id):
+        return self.get(video_id) is not None
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM downloads")[0][0]
+
+    def find(self, video_id):
+        """Path of a cataloged video if its file is still there (one stat, no folder scan)"""
+        entry = self.get(video_id)
+        path = entry['path'] if entry else None
+        return path if path and os.path.exists(path) else None
+
+    def search(self, uploader=None, text=None, engine=None, since=None, limit=50):
+        """Newest entries first, filtered by uploader, title/channel text, engine and finish time"""
+        clauses, params = [], []
+        if uploader:
+            clauses.append("uploader = ?")
+            params.append(uploader.lstrip('@'))
+        if text:
+            clauses.append("(title LIKE ? OR channel LIKE ?)")
+            params += [f"%{text}%"] * 2
+        if engine:
+            clauses.append("engine = ?")
+            params.append(engine)
+        if since:
+            clauses.append("finished >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(f"SELECT * FROM downloads {where} ORDER BY finished DESC LIMIT ?", params + [int(limit)])
+        return [dict(row) for row in rows]
+
+    def summary(self, top=5):
+        """Totals, per-engine counts and average timings, plus the top uploaders"""
+        totals = self._query(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(duration), 0), "
+            "AVG(extract_seconds), AVG(transfer_seconds), MAX(finished) FROM downloads"
+        )[0]
+        engines = self._query("SELECT engine, COUNT(*) FROM downloads GROUP BY engine ORDER BY 2 DESC")
+        uploaders = self._query(
+            "SELECT uploader, COUNT(*) FROM downloads GROUP BY uploader ORDER BY 2 DESC LIMIT ?", (int(top),)
+        )
+        return {
+            'count': totals[0],
+            'bytes': totals[1],
+            'duration': totals[2],
+            'avg_extract_seconds': totals[3],
+            'avg_transfer_seconds': totals[4],
+            'last_finished': totals[5],
+            'engines': {row[0] or 'unknown': row[1] for row in engines},
+            'top_uploaders': [(row[0], row[1]) for row in uploaders],
+        }
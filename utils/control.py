@@ -0,0 +1,78 @@
+"""
+Cooperative cancel/pause tokens for in-flight transfers
+Engines call checkpoint() between chunks (and from yt-dlp progress hooks);
+it raises to unwind the transfer at once, freeing the worker thread and the
+governor's connection slot. A cancelled transfer removes its partial file,
+a paused one keeps it so the next attempt resumes with a Range request.
+"""
+
+import os
+import threading
+
+
+class TransferInterrupted(Exception):
+    """Base for a transfer stopped on request"""
+
+
+class TransferCancelled(TransferInterrupted):
+    """The job was cancelled; partial files are removed"""
+
+
+class TransferPaused(TransferInterrupted):
+    """The job was paused; partial files are kept for resuming"""
+
+
+class TransferControl:
+    """Thread-safe cancel/pause flags for one job"""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._paused = threading.Event()
+        self._partials = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return self._paused.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def pause(self):
+        self._paused.set()
+
+    def resume(self):
+        self._paused.clear()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise TransferCancelled("Cancelled")
+
+    def checkpoint(self):
+        """Raise if the job was cancelled or paused since the last check"""
+        self.check_cancelled()
+        if self._paused.is_set():
+            raise TransferPaused("Paused")
+
+    def track(self, path):
+        """Remember a partial file, so cancelling a paused job can clean it up"""
+        with self._lock:
+            self._partials.add(path)
+
+    def untrack(self, path):
+        with self._lock:
+            self._partials.discard(path)
+
+    def discard_partials(self):
+        """Delete every tracked partial file"""
+        with self._lock:
+            partials, self._partials = self._partials, set()
+        for path in partials:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,133 @@
+"""
+Global bandwidth and connection governor
+Shared by every engine so concurrent downloads stay within host-wide limits
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TokenBucket:
+    """Thread-safe token bucket measured in bytes"""
+    def __init__(self, rate=None, burst=None):
+        self._lock = threading.Lock()
+        self.rate = None
+        self.burst = None
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        """Change the rate in bytes per second (None or 0 disables limiting)"""
+        with self._lock:
+            self.rate = float(rate) if rate else None
+            # Default burst: a quarter second of traffic, at least one 64 KB block
+            self.burst = float(burst) if burst else (max(self.rate / 4, 65536) if self.rate else None)
+            self.tokens = min(self.tokens, self.burst) if self.burst else 0.0
+            self.updated = time.monotonic()
+
+    def consume(self, nbytes):
+        """Take nbytes from the bucket, sleeping if the caller is ahead of the rate"""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Allow debt so large chunks are not starved; the debt is paid by sleeping
+            self.tokens -= nbytes
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class TransferGovernor:
+    """Caps aggregate bandwidth and simultaneous connections across all engines"""
+    def __init__(self, max_bytes_per_sec=None, max_connections=4, fragment_concurrency=1):
+        self.bucket = TokenBucket(max_bytes_per_sec)
+        self.max_bytes_per_sec = max_bytes_per_sec or None
+        self.max_connections = max(1, int(max_connections))
+        self.fragment_concurrency = max(1, int(fragment_concurrency))
+        self.active_connections = 0
+        self._slots = threading.Condition()
+
+    def set_bandwidth_limit(self, max_bytes_per_sec):
+        """Set the shared byte rate (None or 0 for unlimited)"""
+        self.max_bytes_per_sec = max_bytes_per_sec or None
+        self.bucket.set_rate(self.max_bytes_per_sec)
+
+    def set_max_connections(self, max_connections):
+        """Resize the connection pool; waiting transfers are woken if it grows"""
+        with self._slots:
+            self.max_connections = max(1, int(max_connections))
+            self._slots.notify_all()
+
+    def set_fragment_concurrency(self, fragment_concurrency):
+        """Set how many fragments yt-dlp may fetch in parallel per download"""
+        self.fragment_concurrency = max(1, int(fragment_concurrency))
+
+    def configure(self, settings):
+        """Apply limits from the settings dict"""
+        kbps = settings.get("bandwidth_limit_kbps") or 0
+        self.set_bandwidth_limit(int(kbps) * 1024 if kbps else None)
+        self.set_max_connections(settings.get("max_connections", self.max_connections))
+        self.set_fragment_concurrency(settings.get("fragment_concurrency", self.fragment_concurrency))
+
+    def acquire(self):
+        """Block until a connection slot is free"""
+        with self._slots:
+            while self.active_connections >= self.max_connections:
+                self._slots.wait()
+            self.active_connections += 1
+
+    def release(self):
+        """Give a connection slot back"""
+        with self._slots:
+            self.active_connections = max(0, self.active_connections - 1)
+            self._slots.notify()
+
+    @contextmanager
+    def connection(self):
+        """Hold a connection slot for the duration of a transfer"""
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def throttle(self, nbytes):
+        """Account nbytes against the shared bandwidth budget"""
+        return self.bucket.consume(nbytes)
+
+    def ytdlp_options(self):
+        """
+        yt-dlp options matching the current limits.
+        yt-dlp's own 'ratelimit' is per download and fixed when YoutubeDL is built,
+        so the aggregate byte rate is enforced from a progress hook instead.
+        """
+        return {'concurrent_fragment_downloads': self.fragment_concurrency}
+
+    def get_status(self):
+        """Snapshot of the current limits and usage"""
+        return {
+            'max_bytes_per_sec': self.max_bytes_per_sec,
+            'max_connections': self.max_connections,
+            'active_connections': self.active_connections,
+            'fragment_concurrency': self.fragment_concurrency,
+        }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """Return the process-wide governor, creating it on first use"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = TransferGovernor()
+        return _governor
@@ -0,0 +1,111 @@
+"""
+Download integrity checks
+Hashes bytes as they are written (so verification never re-reads a finished
+file from disk) and checks MP4 box structure through an mmap, touching only
+the box headers.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+
+# Extensions whose container layout verify_mp4 understands
+MP4_EXTENSIONS = ('.mp4', '.m4a', '.m4v', '.mov')
+
+
+class IntegrityError(Exception):
+    """A downloaded file failed verification"""
+
+
+class StreamingDigest:
+    """SHA-256 and byte count of a stream, fed chunk by chunk"""
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def update(self, chunk):
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class GrowingFileHasher:
+    """
+    Hashes a file while another writer appends to it.
+    catch_up() reads only the bytes added since the last call, which are still
+    in the page cache, so the finished file is never read a second time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.digest = StreamingDigest()
+
+    def catch_up(self, path=None):
+        """Hash newly appended bytes; path follows the file across a rename (.part -> final)"""
+        if path:
+            self.path = path
+        with open(self.path, 'rb') as f:
+            f.seek(self.digest.size)
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                self.digest.update(chunk)
+        return self.digest
+
+
+def verify_mp4(path):
+    """
+    Check that a file is a structurally complete MP4: it starts with an ftyp
+    box, contains a moov box, and no top-level box runs past the end of the
+    file (the usual sign of truncation). Raises IntegrityError.
+    """
+    size = os.path.getsize(path)
+    if size < 8:
+        raise IntegrityError(f"File too small to be an MP4 ({size} bytes)")
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        offset = 0
+        boxes = []
+        while offset + 8 <= size:
+            box_size, box_type = struct.unpack_from('>I4s', data, offset)
+            header = 8
+            if box_size == 1:
+                if offset + 16 > size:
+                    raise IntegrityError("Truncated 64-bit box header")
+                box_size = struct.unpack_from('>Q', data, offset + 8)[0]
+                header = 16
+            elif box_size == 0:
+                # Box extends to the end of the file
+                box_size = size - offset
+            if box_size < header:
+                raise IntegrityError(f"Invalid size {box_size} for box at offset {offset}")
+            if offset + box_size > size:
+                raise IntegrityError(
+                    f"'{box_type.decode('latin-1')}' box needs {offset + box_size} bytes, file has {size}"
+                )
+            boxes.append(box_type)
+            offset += box_size
+
+    if not boxes or boxes[0] != b'ftyp':
+        raise IntegrityError("Missing ftyp box (not an MP4 file)")
+    if b'moov' not in boxes:
+        raise IntegrityError("Missing moov box (incomplete MP4)")
+
+
+def verify_download(path, expected_size=None, digest=None):
+    """
+    Verify a finished download. expected_size is the advertised length (if any);
+    digest is the StreamingDigest computed while writing. Raises IntegrityError.
+    """
+    actual_size = os.path.getsize(path)
+    if expected_size and actual_size != expected_size:
+        raise IntegrityError(f"Size mismatch: expected {expected_size} bytes, got {actual_size}")
+    if digest is not None and digest.size != actual_size:
+        raise IntegrityError(f"Wrote {digest.size} bytes but file has {actual_size}")
+    if path.lower().endswith(MP4_EXTENSIONS):
+        verify_mp4(path)
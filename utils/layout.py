@@ -0,0 +1,167 @@
+"""
+Output directory layouts for large libraries
+Shards downloads into subfolders (by uploader, upload date or video ID) so no
+single directory grows to hundreds of thousands of entries, and keeps an
+index in the library root mapping each video ID to its file.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+LAYOUTS = ("flat", "uploader", "date", "id")
+
+# Lives in the output folder so the index moves with the library
+INDEX_FILENAME = ".ttd-index.jsonl"
+# Tab-separated index written by earlier versions; still read, never written
+LEGACY_INDEX_FILENAME = ".ttd-index.tsv"
+
+
+class LibraryIndex:
+    """
+    Append-only video ID -> relative path (and SHA-256) index for one output folder.
+    One JSON object per line, so no file name can split a record.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.path = os.path.join(self.root, INDEX_FILENAME)
+        self._paths = None
+        self._checksums = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Read the index into memory on first use; later lines win"""
+        if self._paths is not None:
+            return
+        self._paths = {}
+        self._checksums = {}
+        try:
+            with open(os.path.join(self.root, LEGACY_INDEX_FILENAME), 'r', encoding='utf-8') as f:
+                for line in f:
+                    # id <TAB> relative path [<TAB> sha256]
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) >= 2 and parts[1]:
+                        self._set(parts[0], parts[1], parts[2] if len(parts) > 2 else None)
+        except FileNotFoundError:
+            pass
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                    if isinstance(record, dict) and record.get('id') and record.get('path'):
+                        self._set(str(record['id']), record['path'], record.get('sha256'))
+        except FileNotFoundError:
+            pass
+
+    def _set(self, video_id, relpath, checksum):
+        self._paths[video_id] = relpath
+        self._checksums[video_id] = checksum
+
+    def __contains__(self, video_id):
+        with self._lock:
+            self._load()
+            return str(video_id) in self._paths
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._paths)
+
+    def get(self, video_id):
+        """Absolute path recorded for a video ID, or None"""
+        with self._lock:
+            self._load()
+            relpath = self._paths.get(str(video_id))
+        return os.path.join(self.root, relpath) if relpath else None
+
+    def checksum(self, video_id):
+        """SHA-256 recorded when the file was downloaded, or None"""
+        with self._lock:
+            self._load()
+            return self._checksums.get(str(video_id))
+
+    def add(self, video_id, filepath, checksum=None):
+        """Record where a video was saved"""
+        video_id = str(video_id)
+        relpath = os.path.relpath(os.path.abspath(filepath), self.root)
+        with self._lock:
+            self._load()
+            if self._paths.get(video_id) == relpath and self._checksums.get(video_id) == checksum:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            record = {'id': video_id, 'path': relpath}
+            if checksum:
+                record['sha256'] = checksum
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._set(video_id, relpath, checksum)
+
+
+class OutputLayout:
+    """Maps a video to its folder under an output directory"""
+
+    def __init__(self, scheme="flat"):
+        if scheme not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {scheme} (expected one of {', '.join(LAYOUTS)})")
+        self.scheme = scheme
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def directory_for(self, output_path, video_info):
+        """Folder a video belongs in, created if needed"""
+        parts = self._shard(video_info)
+        directory = os.path.join(output_path, *parts)
+        if parts:
+            os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def _shard(self, video_info):
+        video_id = str(video_info.id or "")
+        if self.scheme == "uploader":
+            name = video_info.uploader or video_info.channel or "UnknownUploader"
+            return [re.sub(r'[<>:"/\\|?*\x00-\x1f\x7f]', '_', name).strip('. ') or "UnknownUploader"]
+        if self.scheme == "date":
+            created = self._upload_time(video_id)
+            return [f"{created:%Y}", f"{created:%m}"] if created else ["unknown-date"]
+        if self.scheme == "id":
+            # Trailing digits are evenly spread; leading ones encode time and bunch together
+            digits = video_id.zfill(4)
+            return [digits[-2:], digits[-4:-2]]
+        return []
+
+    @staticmethod
+    def _upload_time(video_id):
+        """TikTok video IDs carry their creation time (seconds) in the top 32 bits"""
+        if not video_id.isdigit():
+            return None
+        try:
+            return datetime.fromtimestamp(int(video_id) >> 32, tz=timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+
+    def index(self, output_path):
+        """LibraryIndex for an output folder (one shared instance per folder)"""
+        root = os.path.abspath(output_path)
+        with self._lock:
+            if root not in self._indexes:
+                self._indexes[root] = LibraryIndex(root)
+            return self._indexes[root]
+
+    def record(self, output_path, video_id, filepath, checksum=None):
+        """Remember where a finished download was written; failures are ignored"""
+        try:
+            self.index(output_path).add(video_id, filepath, checksum)
+        except OSError:
+            pass
+
+    def find(self, output_path, video_id):
+        """Path of a previously downloaded video if it is still on disk, without scanning folders"""
+        path = self.index(output_path).get(video_id)
+        return path if path and os.path.exists(path) else None
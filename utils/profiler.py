@@ -0,0 +1,214 @@
+"""
+Opt-in per-job profiling
+Wraps a job in cProfile (dumped as .pstats) or in a stack sampler (dumped as
+collapsed stacks, the input format of flamegraph.pl and speedscope), writes
+the result under ~/.ttd/profiles and keeps a short hotspot summary for the
+diagnostics window. Enabled by TTD_PROFILE=1|cprofile|sample, the CLI
+--profile flag or the diagnostics window.
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_ENV = "TTD_PROFILE"
+PROFILE_MODES = ("cprofile", "sample")
+DEFAULT_PROFILE_DIR = Path.home() / ".ttd" / "profiles"
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+# Hotspots kept per profile
+TOP_HOTSPOTS = 10
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _safe_name(name):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name)[:80] or "job"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a background thread"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="ttd-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_folded(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def hotspots(self, limit=TOP_HOTSPOTS):
+        """(label, self seconds, total seconds) of the busiest leaf frames"""
+        # Samples drift behind the nominal interval under load, so weight by wall time
+        per_sample = self.elapsed / self.samples if self.samples else self.interval
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        return [(label, count * per_sample, total[label] * per_sample)
+                for label, count in own.most_common(limit)]
+
+
+class Profiler:
+    """Process-wide profiling switch and recent profile summaries"""
+
+    def __init__(self, enabled=False, mode="cprofile", output_dir=None):
+        self.enabled = enabled
+        self.mode = mode if mode in PROFILE_MODES else "cprofile"
+        self.output_dir = str(output_dir or DEFAULT_PROFILE_DIR)
+        self.recent = deque(maxlen=20)
+        self._lock = threading.Lock()
+        self._ui_sampler = None
+
+    def configure(self, enabled, mode=None):
+        self.enabled = bool(enabled)
+        if mode in PROFILE_MODES:
+            self.mode = mode
+
+    def _output_path(self, name, suffix):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.output_dir, f"{stamp}-{_safe_name(name)}-{os.getpid()}-{threading.get_ident()}{suffix}")
+
+    @contextmanager
+    def profile(self, name):
+        """Profile the enclosed block when profiling is enabled; a no-op otherwise"""
+        if not self.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+        profile = None
+        sampler = None
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile at a time; concurrent jobs get sampled
+                profile = None
+        if profile is None:
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            else:
+                sampler.stop()
+            self._save(name, time.perf_counter() - started, profile, sampler)
+
+    def _save(self, name, elapsed, profile, sampler):
+        try:
+            if profile is not None:
+                path = self._output_path(name, ".pstats")
+                profile.dump_stats(path)
+                hotspots = self._pstats_hotspots(profile)
+            else:
+                path = self._output_path(name, ".folded")
+                sampler.write_folded(path)
+                hotspots = sampler.hotspots()
+        except OSError:
+            path, hotspots = None, []
+        with self._lock:
+            self.recent.append({
+                'name': name,
+                'path': path,
+                'elapsed': elapsed,
+                'hotspots': hotspots,
+                'time': time.time(),
+            })
+
+    def _pstats_hotspots(self, profile, limit=TOP_HOTSPOTS):
+        stats = pstats.Stats(profile)
+        rows = []
+        for (filename, lineno, funcname), (cc, nc, tottime, cumtime, callers) in stats.stats.items():
+            # Built-ins are reported with a '~' filename
+            label = funcname if filename == "~" else f"{funcname} ({os.path.basename(filename)}:{lineno})"
+            rows.append((label, tottime, cumtime))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:limit]
+
+    def start_ui_sampling(self, thread_id=None):
+        """Sample the Tk thread until stop_ui_sampling(), to catch slow callbacks"""
+        with self._lock:
+            if self._ui_sampler is not None:
+                return
+            self._ui_sampler = StackSampler(thread_id or threading.main_thread().ident)
+            self._ui_sampler.start()
+
+    def stop_ui_sampling(self):
+        with self._lock:
+            sampler, self._ui_sampler = self._ui_sampler, None
+        if sampler is None:
+            return
+        sampler.stop()
+        self._save("ui", sampler.elapsed, None, sampler)
+
+    def recent_profiles(self):
+        with self._lock:
+            return list(self.recent)
+
+
+def _from_env():
+    value = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return Profiler()
+    return Profiler(enabled=True, mode=value if value in PROFILE_MODES else "cprofile")
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """Return the process-wide profiler, configured from TTD_PROFILE"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = _from_env()
+        return _profiler
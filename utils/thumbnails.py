@@ -0,0 +1,113 @@
+"""
+Cover thumbnail cache
+Downloads, decodes and downscales video covers off the Tk thread, keeping a
+small LRU of decoded images in memory and the downscaled JPEGs on disk, so a
+revisited video shows its preview without any network request.
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import requests
+from PIL import Image
+
+
+class ThumbnailCache:
+    """Two-level (memory LRU + disk) cache of downscaled covers keyed by video ID"""
+
+    # Bounding box for previews; covers are portrait, so this keeps 9:16 intact
+    DEFAULT_SIZE = (90, 160)
+
+    def __init__(self, cache_dir=None, max_items=64, size=None):
+        self.cache_dir = str(cache_dir or Path.home() / ".ttd" / "cache" / "thumbs")
+        self.max_items = max_items
+        self.size = size or self.DEFAULT_SIZE
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # One in-flight fetch per video ID; later callers wait for it
+        self._inflight = {}
+
+    def _path(self, video_id):
+        return os.path.join(self.cache_dir, f"{video_id}.jpg")
+
+    def get_cached(self, video_id):
+        """Decoded image from memory only (safe to call on the Tk thread), or None"""
+        with self._lock:
+            image = self._memory.get(video_id)
+            if image is not None:
+                self._memory.move_to_end(video_id)
+            return image
+
+    def _remember(self, video_id, image):
+        with self._lock:
+            self._memory[video_id] = image
+            self._memory.move_to_end(video_id)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def load(self, video_id, url=None, headers=None):
+        """
+        Return the downscaled cover as a PIL image, or None.
+        Blocks on disk and network I/O, so call it from a worker thread.
+        """
+        if not video_id:
+            return None
+        image = self.get_cached(video_id)
+        if image is not None:
+            return image
+
+        with self._lock:
+            event = self._inflight.get(video_id)
+            owner = event is None
+            if owner:
+                event = self._inflight[video_id] = threading.Event()
+        if not owner:
+            event.wait(30)
+            return self.get_cached(video_id)
+
+        try:
+            image = self._load_from_disk(video_id)
+            if image is None and url:
+                image = self._download(video_id, url, headers)
+            if image is not None:
+                self._remember(video_id, image)
+            return image
+        finally:
+            with self._lock:
+                self._inflight.pop(video_id, None)
+            event.set()
+
+    def _load_from_disk(self, video_id):
+        try:
+            with Image.open(self._path(video_id)) as image:
+                image.load()
+                return image.copy()
+        except (OSError, ValueError):
+            return None
+
+    def _download(self, video_id, url, headers=None):
+        """Fetch, decode and downscale a cover, then store the small JPEG"""
+        try:
+            response = requests.get(url, headers=headers, timeout=15)
+            response.raise_for_status()
+            with Image.open(io.BytesIO(response.content)) as image:
+                # draft() lets JPEG decoding skip straight to a reduced scale
+                image.draft('RGB', self.size)
+                image = image.convert('RGB')
+            image.thumbnail(self.size, Image.LANCZOS)
+        except (requests.RequestException, OSError, ValueError):
+            return None
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(video_id)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            image.save(tmp_path, 'JPEG', quality=85)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk cache is only an optimization
+            pass
+        return image
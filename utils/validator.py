@@ -16,6 +16,11 @@ class URLValidator:
         r'https?://m\.tiktok\.com/.*',
     ]
     
+    PROFILE_PATTERNS = [
+        r'^https?://(?:www\.|m\.)?tiktok\.com/@([\w\.-]+)/?(?:[?#].*)?$',
+        r'^@([\w\.-]+)$',
+    ]
+    
     def is_valid_tiktok_url(self, url):
         """Check if URL is a valid TikTok URL"""
         if not url or not isinstance(url, str):
@@ -55,6 +60,28 @@ class URLValidator:
                 return match.group(1)
         return None
     
+    def is_profile_url(self, url):
+        """Check if URL points to a TikTok profile (@username)"""
+        return self.extract_username(url) is not None
+    
+    def extract_username(self, url):
+        """Extract the username from a profile URL or bare @username"""
+        if not url or not isinstance(url, str):
+            return None
+        
+        for pattern in self.PROFILE_PATTERNS:
+            match = re.match(pattern, url.strip(), re.IGNORECASE)
+            if match:
+                return match.group(1)
+        return None
+    
+    def normalize_profile_url(self, url):
+        """Normalize a profile reference to https://www.tiktok.com/@username"""
+        username = self.extract_username(url)
+        if not username:
+            return url
+        return f"https://www.tiktok.com/@{username}"
+    
     def normalize_url(self, url):
         """Normalize TikTok URL to standard format"""
         if not url: